@@ -0,0 +1,47 @@
+"""
+Per-owner cache for dashboard stats.
+
+Each owner gets its own cached payload and superusers share a platform-wide
+one. Keys include the current date, since expiring-soon and monthly revenue
+depend on it.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from .stats import aget_dashboard_stats, get_dashboard_stats
+
+
+PLATFORM_SCOPE = 'platform'
+
+
+def _stats_key(scope):
+    return f'dashboard:stats:{scope}:{timezone.now().date().isoformat()}'
+
+
+def get_cached_dashboard_stats(owner=None):
+    """Return dashboard stats for ``owner`` (or platform-wide), computing them on a miss"""
+    key = _stats_key(PLATFORM_SCOPE if owner is None else owner.pk)
+    stats = cache.get(key)
+    if stats is None:
+        stats = get_dashboard_stats(owner)
+        cache.set(key, stats, settings.DASHBOARD_CACHE_TIMEOUT)
+    return stats
+
+
+async def aget_cached_dashboard_stats(owner=None):
+    """Async :func:`get_cached_dashboard_stats`; a miss runs the stats queries concurrently"""
+    key = _stats_key(PLATFORM_SCOPE if owner is None else owner.pk)
+    stats = await cache.aget(key)
+    if stats is None:
+        stats = await aget_dashboard_stats(owner)
+        await cache.aset(key, stats, settings.DASHBOARD_CACHE_TIMEOUT)
+    return stats
+
+
+def invalidate_dashboard_stats(owner_id=None):
+    """Drop the cached stats for an owner together with the platform-wide entry"""
+    keys = [_stats_key(PLATFORM_SCOPE)]
+    if owner_id is not None:
+        keys.append(_stats_key(owner_id))
+    cache.delete_many(keys)
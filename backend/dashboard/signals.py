@@ -0,0 +1,34 @@
+"""
+Keep the dashboard cache in sync with Member and Payment writes
+"""
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from members.models import Member
+from members.signals import previous_owner_id
+from payments.models import Payment
+from .cache import invalidate_dashboard_stats
+
+
+def invalidate_on_commit(owner_id):
+    # After commit, so a concurrent request cannot refill the cache from the old rows
+    transaction.on_commit(partial(invalidate_dashboard_stats, owner_id))
+
+
+@receiver(post_save, sender=Member, dispatch_uid='dashboard_member_saved')
+@receiver(post_delete, sender=Member, dispatch_uid='dashboard_member_deleted')
+def invalidate_on_member_change(sender, instance, **kwargs):
+    invalidate_on_commit(instance.owner_id)
+    previous = previous_owner_id(instance)
+    if previous is not None:
+        # Moved to another owner: the previous owner's stats lose the member
+        invalidate_on_commit(previous)
+
+
+@receiver(post_save, sender=Payment, dispatch_uid='dashboard_payment_saved')
+@receiver(post_delete, sender=Payment, dispatch_uid='dashboard_payment_deleted')
+def invalidate_on_payment_change(sender, instance, **kwargs):
+    invalidate_on_commit(instance.owner_id)
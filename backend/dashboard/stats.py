@@ -0,0 +1,119 @@
+"""
+Stats engine for the dashboard.
+
+All member counters come from one conditional-aggregation query on Member and
+all revenue figures from one on DailyRevenueRollup, so a dashboard load costs
+four DB round trips (counters, revenue, recent payments, expiring soon)
+regardless of whether it is computed for a single owner or platform-wide.
+The two row lists come from different tables than the aggregates, so folding
+them in would take a UNION of unrelated shapes; they stay separate queries.
+The async variant used in ASGI mode runs the four at the same time.
+"""
+from datetime import timedelta
+
+from django.db.models import Count, DecimalField, Q, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from gym_management.async_api import run_concurrently
+from members.models import Member
+from payments.models import Payment, DailyRevenueRollup
+
+
+RECENT_PAYMENTS_LIMIT = 10
+EXPIRING_SOON_DAYS = 7
+
+
+def _money(expression):
+    return Coalesce(expression, Value(0), output_field=DecimalField(max_digits=12, decimal_places=2))
+
+
+def get_member_counters(members):
+    """Total and per-status member counts in a single query"""
+    return members.aggregate(
+        total_members=Count('id'),
+        active_members=Count('id', filter=Q(status='ACTIVE')),
+        expired_members=Count('id', filter=Q(status='EXPIRED')),
+        frozen_members=Count('id', filter=Q(status='FROZEN')),
+    )
+
+
+def get_revenue_totals(rollups, start_of_month):
+    """Monthly revenue and the PT/GENERAL split in a single query over the daily rollup"""
+    return rollups.aggregate(
+        monthly_revenue=_money(Sum('total_amount', filter=Q(date__gte=start_of_month))),
+        pt_revenue=_money(Sum('total_amount', filter=Q(plan_type='PT'))),
+        general_revenue=_money(Sum('total_amount', filter=Q(plan_type='GENERAL'))),
+    )
+
+
+def get_recent_payments(payments):
+    """The latest payments, newest first, in the dashboard format"""
+    recent_payments = payments.order_by('-payment_date', '-created_at').values_list(
+        'id', 'member__name', 'amount', 'payment_mode', 'payment_date'
+    )[:RECENT_PAYMENTS_LIMIT]
+    return [
+        {
+            'id': payment_id,
+            'member_name': member_name,
+            'amount': float(amount),
+            'payment_mode': payment_mode,
+            'payment_date': payment_date.isoformat(),
+        }
+        for payment_id, member_name, amount, payment_mode, payment_date in recent_payments
+    ]
+
+
+def _dashboard_queries(owner):
+    """The four independent queries behind the dashboard, as no-argument callables"""
+    members = Member.objects.all()
+    payments = Payment.objects.all()
+    rollups = DailyRevenueRollup.objects.all()
+    if owner is not None:
+        members = members.filter(owner=owner)
+        payments = payments.filter(owner=owner)
+        rollups = rollups.filter(owner=owner)
+
+    today = timezone.now().date()
+    start_of_month = today.replace(day=1)
+
+    # Members expiring soon
+    expiring_soon = members.filter(
+        end_date__lte=today + timedelta(days=EXPIRING_SOON_DAYS),
+        end_date__gte=today,
+        status='ACTIVE'
+    ).values('id', 'name', 'phone', 'end_date', 'plan_type')
+
+    return (
+        lambda: get_member_counters(members),
+        lambda: get_revenue_totals(rollups, start_of_month),
+        lambda: get_recent_payments(payments),
+        lambda: list(expiring_soon),
+    )
+
+
+def _dashboard_payload(owner, counters, revenue, recent_payments, expiring_soon):
+    return {
+        'is_superuser': owner is None,
+        **counters,
+        'monthly_revenue': float(revenue['monthly_revenue']),
+        'pt_revenue': float(revenue['pt_revenue']),
+        'general_revenue': float(revenue['general_revenue']),
+        'recent_payments': recent_payments,
+        'expiring_soon': expiring_soon,
+    }
+
+
+def get_dashboard_stats(owner=None):
+    """
+    Build the dashboard payload.
+
+    ``owner=None`` computes platform-wide stats (superuser view), otherwise the
+    stats are scoped to the given owner's members and payments.
+    """
+    return _dashboard_payload(owner, *[query() for query in _dashboard_queries(owner)])
+
+
+async def aget_dashboard_stats(owner=None):
+    """:func:`get_dashboard_stats` with the four queries running concurrently"""
+    return _dashboard_payload(owner, *await run_concurrently(*_dashboard_queries(owner)))
@@ -0,0 +1,101 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+
+from members.models import Member, Owner
+from payments.models import Payment
+from .cache import get_cached_dashboard_stats
+from .stats import get_dashboard_stats
+
+
+class DashboardStatsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.today = timezone.now().date()
+        cls.owner = Owner.objects.create_user(username='stats-owner', password='stats-pass-123')
+        other = Owner.objects.create_user(username='stats-other', password='stats-pass-123')
+
+        def member(owner, name, plan_type='GENERAL', status='ACTIVE', days_left=30):
+            return Member.objects.create(
+                owner=owner, name=name, phone='9876543210', plan_type=plan_type, status=status,
+                start_date=cls.today - timedelta(days=30), end_date=cls.today + timedelta(days=days_left),
+            )
+
+        general = member(cls.owner, 'General', days_left=3)
+        personal = member(cls.owner, 'Personal', plan_type='PT')
+        member(cls.owner, 'Expired', status='EXPIRED', days_left=-5)
+        member(cls.owner, 'Frozen', status='FROZEN')
+        elsewhere = member(other, 'Elsewhere', days_left=2)
+
+        last_month = cls.today.replace(day=1) - timedelta(days=1)
+        Payment.objects.create(member=general, amount=Decimal('1000'), payment_mode='Cash', payment_date=cls.today)
+        Payment.objects.create(member=personal, amount=Decimal('4000'), payment_mode='UPI', payment_date=cls.today)
+        Payment.objects.create(member=personal, amount=Decimal('2500'), payment_mode='UPI', payment_date=last_month)
+        Payment.objects.create(member=elsewhere, amount=Decimal('700'), payment_mode='Cash', payment_date=cls.today)
+
+    def test_owner_stats_cost_four_queries(self):
+        with self.assertNumQueries(4):
+            stats = get_dashboard_stats(self.owner)
+
+        self.assertFalse(stats['is_superuser'])
+        self.assertEqual(
+            (stats['total_members'], stats['active_members'], stats['expired_members'], stats['frozen_members']),
+            (4, 2, 1, 1),
+        )
+        self.assertEqual(stats['monthly_revenue'], 5000.0)
+        self.assertEqual(stats['pt_revenue'], 6500.0)
+        self.assertEqual(stats['general_revenue'], 1000.0)
+        self.assertEqual(len(stats['recent_payments']), 3)
+        self.assertEqual(stats['recent_payments'][-1]['amount'], 2500.0)
+        self.assertEqual([row['name'] for row in stats['expiring_soon']], ['General'])
+
+    def test_platform_stats_cost_four_queries(self):
+        with self.assertNumQueries(4):
+            stats = get_dashboard_stats()
+
+        self.assertTrue(stats['is_superuser'])
+        self.assertEqual(stats['total_members'], 5)
+        self.assertEqual(stats['general_revenue'], 1700.0)
+        self.assertEqual(len(stats['recent_payments']), 4)
+        self.assertEqual(sorted(row['name'] for row in stats['expiring_soon']), ['Elsewhere', 'General'])
+
+    def test_query_count_does_not_grow_with_rows(self):
+        personal = Member.objects.get(name='Personal')
+        Payment.objects.bulk_create([
+            Payment(member=personal, owner=self.owner, amount=Decimal('10'), payment_mode='Cash', payment_date=self.today)
+            for _ in range(30)
+        ])
+        with self.assertNumQueries(4):
+            stats = get_dashboard_stats(self.owner)
+        self.assertEqual(len(stats['recent_payments']), 10)
+
+
+class DashboardCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.today = timezone.now().date()
+        self.owner = Owner.objects.create_user(username='cache-owner', password='cache-pass-123')
+        self.member = Member.objects.create(
+            owner=self.owner, name='Cached', phone='9876543210', plan_type='GENERAL',
+            start_date=self.today - timedelta(days=30), end_date=self.today + timedelta(days=30),
+        )
+
+    def test_cache_hit_costs_no_queries(self):
+        get_cached_dashboard_stats(self.owner)
+        with self.assertNumQueries(0):
+            get_cached_dashboard_stats(self.owner)
+
+    def test_invalidated_only_after_commit(self):
+        self.assertEqual(get_cached_dashboard_stats(self.owner)['monthly_revenue'], 0)
+        with self.captureOnCommitCallbacks() as callbacks:
+            Payment.objects.create(member=self.member, amount=Decimal('900'), payment_mode='Cash', payment_date=self.today)
+            # A request during the transaction must not refill the cache from uncommitted state
+            self.assertEqual(get_cached_dashboard_stats(self.owner)['monthly_revenue'], 0)
+
+        for callback in callbacks:
+            callback()
+        self.assertEqual(get_cached_dashboard_stats(self.owner)['monthly_revenue'], 900.0)
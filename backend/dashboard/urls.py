@@ -1,7 +1,11 @@
+from django.conf import settings
 from django.urls import path
-from .views import dashboard_stats
+from .views import AsyncDashboardStatsView, dashboard_stats
 
 urlpatterns = [
-    path('stats/', dashboard_stats, name='dashboard-stats'),
+    path(
+        'stats/',
+        AsyncDashboardStatsView.as_view() if settings.ASGI_MODE else dashboard_stats,
+        name='dashboard-stats',
+    ),
 ]
-
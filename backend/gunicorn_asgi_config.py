@@ -0,0 +1,14 @@
+"""
+Gunicorn configuration for ASGI mode (uvicorn workers)
+Same settings as gunicorn_config.py, but each worker runs an event loop, so a
+slow dashboard or export no longer blocks every other request:
+    gunicorn -c gunicorn_asgi_config.py
+"""
+from gunicorn_config import *  # noqa: F401,F403
+
+# Application
+wsgi_app = "gym_management.asgi:application"
+
+# Worker processes
+worker_class = "uvicorn.workers.UvicornWorker"
+raw_env = ["ASGI_MODE=True"]
@@ -12,6 +12,8 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'gym_management.settings')
+# Async views and concurrent queries (see ASGI_MODE in settings)
+os.environ.setdefault('ASGI_MODE', 'True')
 
 application = get_asgi_application()
 
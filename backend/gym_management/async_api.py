@@ -0,0 +1,95 @@
+"""
+Async building blocks for ASGI mode (ASGI_MODE, see gunicorn_asgi_config.py).
+
+``run_concurrently`` runs independent ORM calls at the same time, each in a
+worker thread with its own database connection, so a view waits for the
+slowest query instead of their sum. That pays off when queries wait on a
+database server and connections come from the ``pool_size`` pool; without
+one (CONN_MAX_AGE is 0 in ASGI mode) every call would open and close a
+connection of its own, so the calls run in turn on the request's connection,
+as they always do on SQLite. ``AsyncAPIView`` is an ``APIView`` whose
+handlers may be ``async def``: authentication, permissions and throttling run
+in a thread (they may query the database), the handler is awaited on the
+event loop, and sync handlers such as ``options`` still work.
+
+DRF 3.14 has no async viewsets, so list endpoints stay sync views; under ASGI
+Django runs each of them in its own thread and OptionalKeysetPagination
+fetches the COUNT and the page with ``run_concurrently``. Streaming responses
+need an async iterator under ASGI, or Django reads them into memory first;
+``iterate_in_thread`` adapts a sync generator such as a CSV export.
+"""
+import asyncio
+import itertools
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.db import close_old_connections, connection
+from rest_framework.views import APIView
+
+
+def _in_worker_thread(func):
+    def call():
+        try:
+            return func()
+        finally:
+            # Worker threads never see request_finished; apply CONN_MAX_AGE here
+            close_old_connections()
+    return call
+
+
+async def run_concurrently(*funcs):
+    """Call each no-argument function in its own thread and return their results in order"""
+    if not connection.settings_dict.get('POOL'):
+        # Only pooled connections are cheap enough to use one per call
+        return await sync_to_async(lambda: [func() for func in funcs])()
+    return await asyncio.gather(*[
+        sync_to_async(_in_worker_thread(func), thread_sensitive=False)() for func in funcs
+    ])
+
+
+async def iterate_in_thread(iterable, batch_size):
+    """
+    Async iterator over a sync ``iterable`` that may query the database,
+    advanced ``batch_size`` items at a time in the request's sync thread
+    (so a server-side cursor stays on one connection).
+    """
+    iterator = iter(iterable)
+    next_batch = sync_to_async(lambda: list(itertools.islice(iterator, batch_size)))
+    while batch := await next_batch():
+        for item in batch:
+            yield item
+
+
+class AsyncAPIView(APIView):
+    """APIView with an async dispatch for ``async def`` handlers"""
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        view = super().as_view(**initkwargs)
+        # csrf_exempt (applied by APIView.as_view) returns a plain function
+        return markcoroutinefunction(view)
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+
+            if iscoroutinefunction(handler):
+                response = await handler(request, *args, **kwargs)
+            else:
+                response = await sync_to_async(handler)(request, *args, **kwargs)
+
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
@@ -0,0 +1,87 @@
+"""
+JWT authentication with a per-worker owner cache.
+
+``JWTAuthentication`` loads the owner row on every request. ``CachedJWTAuthentication``
+keeps the owners it loaded in process memory for AUTH_USER_CACHE_TTL seconds,
+keyed by user id and the token's version claim (``tv``, issued from
+``Owner.token_version``), so a warm worker authenticates without a query.
+
+Changing an owner's password, ``is_active``, ``is_staff`` or ``is_superuser``
+increments ``token_version``: tokens carrying the old version are rejected as
+soon as their owner is loaded again, and refresh tokens carrying it can no
+longer be refreshed (members.views). Saving or deleting an owner evicts the
+entry in the worker that did it (members.signals); other workers keep theirs
+until it expires, so the TTL bounds how long a change takes to reach them.
+"""
+import copy
+import threading
+import time
+
+from django.conf import settings
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings
+
+
+TOKEN_VERSION_CLAIM = 'tv'
+
+# {user_id: (token version, expiry on time.monotonic(), user)}
+_users = {}
+_lock = threading.Lock()
+
+
+def get_token_version(validated_token):
+    # Tokens issued before the claim existed count as version 0
+    return validated_token.get(TOKEN_VERSION_CLAIM, 0)
+
+
+def evict_cached_user(user_id):
+    """Drop ``user_id`` from this worker's cache"""
+    with _lock:
+        _users.pop(user_id, None)
+
+
+def clear_cached_users():
+    with _lock:
+        _users.clear()
+
+
+def _request_copy(user):
+    """Copy of a cached owner that shares no related-object or prefetch caches with it"""
+    clone = copy.copy(user)
+    clone._state = copy.copy(user._state)
+    clone._state.fields_cache = {}
+    clone.__dict__.pop('_prefetched_objects_cache', None)
+    return clone
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication that reuses recently loaded owners"""
+
+    def get_user(self, validated_token):
+        ttl = settings.AUTH_USER_CACHE_TTL
+        if ttl <= 0:
+            return self.load_user(validated_token)
+
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        version = get_token_version(validated_token)
+        now = time.monotonic()
+        entry = _users.get(user_id)
+        if entry is None or entry[0] != version or entry[1] <= now:
+            user = self.load_user(validated_token)
+            entry = (version, now + ttl, user)
+            with _lock:
+                _users.pop(user_id, None)
+                if _users and len(_users) >= settings.AUTH_USER_CACHE_SIZE:
+                    # Dicts keep insertion order: drop the oldest entry
+                    _users.pop(next(iter(_users)))
+                _users[user_id] = entry
+        # Views may modify request.user; never hand out the cached instance
+        return _request_copy(entry[2])
+
+    def load_user(self, validated_token):
+        user = super().get_user(validated_token)
+        if getattr(user, 'token_version', 0) != get_token_version(validated_token):
+            raise AuthenticationFailed(_('Token has been revoked'), code='token_revoked')
+        return user
@@ -0,0 +1,113 @@
+"""
+Conditional GET for owner-scoped API resources.
+
+Every owner has a change stamp in the cache (``time.time_ns()`` of the last
+write to their members, payments, trainers, trainer payments or gym) and
+superusers share a platform-wide stamp that moves with every owner's. Signals
+bump the stamps after commit; bulk jobs that bypass signals call
+``bump_change_version`` themselves, or ``bump_all_change_versions``.
+
+``ConditionalGetMixin`` derives the ETag and Last-Modified of ``list`` and
+``retrieve`` from those stamps, the user and the request URL. A matching
+``If-None-Match`` (or, without one, an ``If-Modified-Since`` no older than the
+stamp) gets 304 Not Modified before the queryset or the serializer run.
+
+The stamps live in the default cache and never expire, so every process that
+writes must share it: CONDITIONAL_GET_ENABLED is only on by default with a
+shared CACHE_BACKEND (file, db or redis).
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import patch_cache_control
+from django.utils.http import http_date, parse_etags, parse_http_date_safe
+from rest_framework import status
+from rest_framework.response import Response
+
+
+PLATFORM_SCOPE = 'platform'
+GENERATION_KEY = 'changes:generation'
+
+
+def _version_key(scope):
+    return f'changes:{scope}'
+
+
+def get_change_version(owner_id=None):
+    """(generation, stamp) for ``owner_id``, or the platform-wide stamps when None"""
+    key = _version_key(PLATFORM_SCOPE if owner_id is None else owner_id)
+    stored = cache.get_many([GENERATION_KEY, key])
+    missing = {name: time.time_ns() for name in (GENERATION_KEY, key) if name not in stored}
+    if missing:
+        for name, value in missing.items():
+            cache.add(name, value, None)
+        stored = {**missing, **cache.get_many(list(missing)), **stored}
+    return stored[GENERATION_KEY], stored[key]
+
+
+def bump_change_version(owner_id):
+    """Mark an owner's resources (and the platform-wide view) as changed"""
+    stamp = time.time_ns()
+    cache.set_many({_version_key(owner_id): stamp, _version_key(PLATFORM_SCOPE): stamp}, None)
+
+
+def bump_all_change_versions():
+    """Mark every owner's resources as changed, e.g. after a bulk UPDATE that bypasses signals"""
+    cache.set(GENERATION_KEY, time.time_ns(), None)
+
+
+class ConditionalGetMixin:
+    """
+    Viewset mixin adding ETag / Last-Modified validators to ``list`` and
+    ``retrieve`` and answering matching conditional requests with 304.
+    """
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(request, super().retrieve, *args, **kwargs)
+
+    def get_change_scope(self):
+        """Owner whose change stamp covers this request, or None for the platform-wide stamp"""
+        user = self.request.user
+        return None if user.is_superuser else user.pk
+
+    def conditional_response(self, request, handler, *args, **kwargs):
+        """Run ``handler`` unless the client's copy is current; views overriding ``list`` call this"""
+        if not settings.CONDITIONAL_GET_ENABLED:
+            return handler(request, *args, **kwargs)
+
+        # Read the stamps before the data so a concurrent write can only make the ETag older
+        generation, stamp = get_change_version(self.get_change_scope())
+        validator = f'{request.user.pk}:{generation}:{stamp}:{request.accepted_media_type}:{request.get_full_path()}'
+        etag = '"%s"' % hashlib.md5(validator.encode(), usedforsecurity=False).hexdigest()
+        changed_at = max(generation, stamp) / 1e9
+        # Last-Modified has one-second resolution: only send it once no later
+        # write can fall into the same second as the stamp
+        last_modified = int(changed_at) if int(time.time()) > int(changed_at) else None
+
+        if self._not_modified(request, etag, last_modified):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = handler(request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+        # Let browsers keep the response but revalidate it on every use
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    @staticmethod
+    def _not_modified(request, etag, last_modified):
+        if_none_match = request.headers.get('If-None-Match')
+        if if_none_match:
+            return etag in parse_etags(if_none_match)
+        if last_modified is None:
+            return False
+        if_modified_since = parse_http_date_safe(request.headers.get('If-Modified-Since', ''))
+        return if_modified_since is not None and last_modified <= if_modified_since
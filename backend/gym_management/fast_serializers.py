@@ -0,0 +1,104 @@
+"""
+Read-only fast path for list endpoints.
+
+``ValuesSerializer`` takes the readable fields of an existing DRF serializer,
+fetches exactly those columns with ``queryset.values(...)`` (following
+``source='member.name'`` style sources as ``member__name``) and formats each
+value with the same field's ``to_representation``. The output is the same
+JSON as the serializer's, without building model instances or running the
+per-field attribute lookups for every row.
+
+Serializers with fields that need a model instance (method fields, nested
+serializers, ``source='*'``) are not supported and keep the normal path;
+``python manage.py benchmark_serializers`` checks parity and measures both.
+"""
+from functools import lru_cache
+
+from rest_framework import serializers
+from rest_framework.relations import PrimaryKeyRelatedField
+from rest_framework.response import Response
+
+
+def _identity(value):
+    return value
+
+
+class ValuesSerializer:
+    """Serialize ``values()`` rows the way ``serializer_class`` serializes instances"""
+
+    def __init__(self, serializer_class):
+        self.serializer_class = serializer_class
+        self.columns = []
+        for name, field in serializer_class().fields.items():
+            if field.write_only:
+                continue
+            self.columns.append((name, '__'.join(field.source_attrs), self._converter(field)))
+        self.lookups = [lookup for _, lookup, _ in self.columns]
+
+    @staticmethod
+    def _converter(field):
+        if isinstance(field, PrimaryKeyRelatedField):
+            # values() already returns the related id
+            return field.pk_field.to_representation if field.pk_field else _identity
+        return field.to_representation
+
+    @staticmethod
+    def supports(serializer_class):
+        for field in serializer_class().fields.values():
+            if field.write_only:
+                continue
+            if field.source == '*' or isinstance(field, (serializers.SerializerMethodField, serializers.BaseSerializer)):
+                return False
+            if isinstance(field, serializers.RelatedField) and not isinstance(field, PrimaryKeyRelatedField):
+                return False
+        return True
+
+    def values(self, queryset, extra=()):
+        """``queryset.values()`` with the serializer's columns plus ``extra`` lookups (e.g. for keyset cursors)"""
+        lookups = list(dict.fromkeys([*self.lookups, *extra]))
+        return queryset.values(*lookups)
+
+    def to_representation(self, rows):
+        columns = self.columns
+        return [
+            {
+                name: None if row[lookup] is None else convert(row[lookup])
+                for name, lookup, convert in columns
+            }
+            for row in rows
+        ]
+
+
+@lru_cache(maxsize=None)
+def get_values_serializer(serializer_class):
+    """Cached ValuesSerializer for ``serializer_class``, or None if it needs model instances"""
+    if not ValuesSerializer.supports(serializer_class):
+        return None
+    return ValuesSerializer(serializer_class)
+
+
+class FastListMixin:
+    """
+    Viewset mixin serving ``list`` through :class:`ValuesSerializer` when the
+    list serializer supports it. Filters, ordering, search ranking and both
+    pagination modes apply as before.
+    """
+    fast_list = True
+
+    def list(self, request, *args, **kwargs):
+        values_serializer = get_values_serializer(self.get_serializer_class()) if self.fast_list else None
+        if values_serializer is None:
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        extra = []
+        paginator = self.paginator
+        if paginator is not None and hasattr(paginator, 'get_keyset_ordering') and paginator.is_keyset_request(request):
+            # Keyset cursors are built from the ordering columns of the last row
+            extra = [field.lstrip('-') for field in paginator.get_keyset_ordering(queryset, self)]
+        rows = values_serializer.values(queryset, extra)
+
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(values_serializer.to_representation(page))
+        return Response(values_serializer.to_representation(rows))
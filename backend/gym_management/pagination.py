@@ -0,0 +1,231 @@
+"""
+Pagination for the REST API.
+
+Page-number pagination stays the default so existing clients keep working.
+Passing ``?pagination=cursor`` (or following a ``cursor`` link) switches the
+request to keyset pagination: rows keep the ordering the request asked for
+(``?ordering=``, search relevance or the view's default) plus ``id`` as a
+tie-breaker, and each page is fetched with a
+``WHERE (ordering fields) < (last row)`` condition instead of COUNT + OFFSET,
+so deep pages cost the same as the first one.
+
+Clients may ask for up to MAX_PAGE_SIZE rows per page with ``?page_size=``.
+In ASGI mode with a connection pool, page-number pages run the COUNT and the
+page query concurrently.
+"""
+import base64
+import datetime
+import decimal
+import json
+from collections import OrderedDict
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from django.core.paginator import InvalidPage, Page
+from django.db.models import Q, QuerySet
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from .async_api import run_concurrently
+
+
+def rows_after(position, order_by):
+    """Rows strictly after ``position`` in ``order_by`` order (row-value comparison)"""
+    condition = Q()
+    equal = {}
+    for field, value in zip(order_by, position):
+        name = field.lstrip('-')
+        lookup = 'lt' if field.startswith('-') else 'gt'
+        condition |= Q(**equal, **{f'{name}__{lookup}': value})
+        equal[name] = value
+    return condition
+
+
+class OptionalKeysetPagination(PageNumberPagination):
+    """Page-number pagination with opt-in keyset (cursor) pagination"""
+    page_size_query_param = 'page_size'
+    max_page_size = settings.MAX_PAGE_SIZE
+    cursor_query_param = 'cursor'
+    mode_query_param = 'pagination'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = self.is_keyset_request(request)
+        if not self.keyset:
+            if settings.ASGI_MODE and isinstance(queryset, QuerySet):
+                return self.paginate_concurrently(queryset, request, view)
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.ordering = self.get_keyset_ordering(queryset, view)
+        position, reverse = self.decode_cursor(request)
+
+        order_by = [self._flip(field) for field in self.ordering] if reverse else self.ordering
+        queryset = queryset.order_by(*order_by)
+        if position is not None:
+            queryset = queryset.filter(rows_after(position, order_by))
+
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if reverse:
+            results.reverse()
+
+        if reverse:
+            self.has_next, self.has_previous = position is not None, has_more
+        else:
+            self.has_next, self.has_previous = has_more, position is not None
+        self.first_position = self._position(results[0]) if results else position
+        self.last_position = self._position(results[-1]) if results else position
+        return results
+
+    def paginate_concurrently(self, queryset, request, view=None):
+        """
+        Page-number pagination with the COUNT and the page rows fetched at
+        the same time; the page number is validated once both are back.
+        """
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+        page_number = request.query_params.get(self.page_query_param, 1)
+        try:
+            number = int(page_number)
+        except (TypeError, ValueError):
+            number = 0
+        if number < 1:
+            # 'last' needs the count first, and invalid numbers get the usual error
+            return super().paginate_queryset(queryset, request, view)
+
+        offset = (number - 1) * page_size
+        paginator = self.django_paginator_class(queryset, page_size)
+        paginator.count, rows = async_to_sync(run_concurrently)(
+            queryset.count, lambda: list(queryset[offset:offset + page_size])
+        )
+        try:
+            paginator.validate_number(number)
+        except InvalidPage as exc:
+            raise NotFound(self.invalid_page_message.format(page_number=page_number, message=str(exc)))
+        self.page = Page(rows, number, paginator)
+
+        if paginator.num_pages > 1 and self.template is not None:
+            self.display_page_controls = True
+        self.request = request
+        return rows
+
+    def get_paginated_response(self, data):
+        if not getattr(self, 'keyset', False):
+            return super().get_paginated_response(data)
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_next_link(self):
+        if not getattr(self, 'keyset', False):
+            return super().get_next_link()
+        if not self.has_next or self.last_position is None:
+            return None
+        return self._link(self.last_position, reverse=False)
+
+    def get_previous_link(self):
+        if not getattr(self, 'keyset', False):
+            return super().get_previous_link()
+        if not self.has_previous or self.first_position is None:
+            return None
+        return self._link(self.first_position, reverse=True)
+
+    def is_keyset_request(self, request):
+        return (
+            self.cursor_query_param in request.query_params
+            or request.query_params.get(self.mode_query_param) == 'cursor'
+        )
+
+    def get_keyset_ordering(self, queryset, view):
+        """
+        Ordering used for keyset pages: the queryset's effective ordering (a
+        client's ``?ordering=``, search relevance, the view's default), else
+        the view's ``ordering``, always ending with ``id`` so rows with equal
+        sort values have a stable order.
+
+        A cursor holds one plain value per ordering column, so orderings by
+        expressions, related fields or nullable columns are rejected.
+        """
+        query = queryset.query
+        if query.order_by:
+            ordering = query.order_by
+        elif query.default_ordering and queryset.model._meta.ordering:
+            ordering = queryset.model._meta.ordering
+        else:
+            ordering = getattr(view, 'ordering', None) or ['-id']
+        if isinstance(ordering, str):
+            ordering = [ordering]
+        ordering = list(ordering)
+        for field in ordering:
+            if not self._keyset_orderable(queryset, field):
+                raise ValidationError({'ordering': [f'Cursor pagination cannot order by {field}']})
+        if not any(field.lstrip('-') in ('id', 'pk') for field in ordering):
+            ordering.append('-id' if ordering[0].startswith('-') else 'id')
+        return ordering
+
+    @staticmethod
+    def _keyset_orderable(queryset, field):
+        if not isinstance(field, str) or field == '?':
+            return False
+        name = field.lstrip('-')
+        if name == 'pk' or name in queryset.query.annotations:
+            return True
+        try:
+            model_field = queryset.model._meta.get_field(name)
+        except FieldDoesNotExist:
+            return False
+        return model_field.concrete and not model_field.is_relation and not model_field.null
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')).decode('utf-8'))
+            position, reverse = payload['p'], bool(payload.get('r'))
+        except (TypeError, ValueError, KeyError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return position, reverse
+
+    def encode_cursor(self, position, reverse):
+        payload = {'p': position}
+        if reverse:
+            payload['r'] = 1
+        data = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+        return base64.urlsafe_b64encode(data).decode('ascii')
+
+    def _link(self, position, reverse):
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, self.page_query_param)
+        url = remove_query_param(url, self.mode_query_param)
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(position, reverse))
+
+    def _position(self, row):
+        values = []
+        for field in self.ordering:
+            name = field.lstrip('-')
+            value = row[name] if isinstance(row, dict) else getattr(row, 'pk' if name == 'pk' else name)
+            if isinstance(value, (datetime.date, datetime.datetime)):
+                value = value.isoformat()
+            elif isinstance(value, decimal.Decimal):
+                value = str(value)
+            values.append(value)
+        return values
+
+    @staticmethod
+    def _flip(field):
+        return field[1:] if field.startswith('-') else f'-{field}'
@@ -0,0 +1,35 @@
+"""
+orjson-based JSON parser for the REST API.
+
+``ORJSONParser`` accepts the same documents as DRF's ``JSONParser`` with
+``STRICT_JSON`` (no ``NaN``/``Infinity``) and returns the same data; bodies
+in a charset other than UTF-8 are decoded first. Without orjson installed it
+is ``JSONParser``.
+"""
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+
+from .renderers import ORJSONRenderer, orjson
+
+
+_UTF8 = {'utf-8', 'utf8'}
+
+
+class ORJSONParser(JSONParser):
+    """JSONParser that decodes with orjson when it is installed"""
+    renderer_class = ORJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        if orjson is None or not self.strict:
+            return super().parse(stream, media_type, parser_context)
+
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        try:
+            body = stream.read()
+            if encoding.lower() not in _UTF8:
+                body = body.decode(encoding)
+            return orjson.loads(body)
+        except ValueError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
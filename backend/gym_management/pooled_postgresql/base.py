@@ -0,0 +1,130 @@
+"""
+PostgreSQL backend that keeps connections in a per-process pool.
+
+Selected by ``pool_size`` in DATABASE_URL (see gym_management.database).
+Closing a connection, which Django does at the end of every request with
+CONN_MAX_AGE = 0, hands it back to the pool instead of dropping it, so any
+request or worker thread (ASGI mode runs each request in its own thread)
+reuses an open, TLS-established connection. With ``pre_ping`` a pooled
+connection is checked with ``SELECT 1`` before it is handed out, and a dead
+one is replaced by a new connection instead of failing the request.
+"""
+import threading
+from collections import deque
+
+from django.db import OperationalError
+from django.db.backends.postgresql import base
+
+
+# connection.info.transaction_status for "no transaction open", in psycopg2 and psycopg 3 alike
+TRANSACTION_IDLE = 0
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class ConnectionPool:
+    """At most ``size`` connections; checkouts wait up to ``timeout`` seconds for a free one"""
+
+    def __init__(self, size, timeout, pre_ping):
+        self.size = size
+        self.timeout = timeout
+        self.pre_ping = pre_ping
+        self._idle = deque()
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+
+    def acquire(self, connect):
+        if not self._slots.acquire(timeout=self.timeout):
+            raise OperationalError(f'No database connection free in the pool of {self.size} after {self.timeout}s')
+        try:
+            while True:
+                with self._lock:
+                    connection = self._idle.pop() if self._idle else None
+                if connection is None:
+                    return connect()
+                if self._usable(connection):
+                    return connection
+                self._discard(connection)
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def release(self, connection):
+        try:
+            if self._reset(connection):
+                with self._lock:
+                    self._idle.append(connection)
+            else:
+                self._discard(connection)
+        finally:
+            self._slots.release()
+
+    def discard(self, connection):
+        try:
+            self._discard(connection)
+        finally:
+            self._slots.release()
+
+    def _usable(self, connection):
+        if connection.closed:
+            return False
+        if not self.pre_ping:
+            return True
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    def _reset(connection):
+        """Leave no open transaction behind; False if the connection is unusable"""
+        if connection.closed:
+            return False
+        try:
+            if connection.info.transaction_status != TRANSACTION_IDLE:
+                connection.rollback()
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    def _discard(connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+
+def get_pool(alias, pool_settings):
+    with _pools_lock:
+        pool = _pools.get(alias)
+        if pool is None:
+            pool = _pools[alias] = ConnectionPool(
+                size=pool_settings['SIZE'],
+                timeout=pool_settings['TIMEOUT'],
+                pre_ping=pool_settings['PRE_PING'],
+            )
+        return pool
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+
+    @property
+    def pool(self):
+        return get_pool(self.alias, self.settings_dict['POOL'])
+
+    def get_new_connection(self, conn_params):
+        return self.pool.acquire(lambda: super(DatabaseWrapper, self).get_new_connection(conn_params))
+
+    def _close(self):
+        if self.connection is None:
+            return
+        with self.wrap_database_errors:
+            if self.in_atomic_block:
+                # Django keeps referring to a connection closed inside atomic(); never share it
+                self.pool.discard(self.connection)
+            else:
+                self.pool.release(self.connection)
@@ -0,0 +1,159 @@
+"""
+Per-request SQL query budgets.
+
+Views declare how many queries one request may run with a ``query_budget``
+attribute: an int, or a dict keyed by viewset action with an optional
+``'default'``. ``@action(..., query_budget=n)`` sets it for one extra action
+and the ``@query_budget(n)`` decorator does it for function views. Budgets
+include authentication and must not depend on the page size, so a query run
+once per row always breaks them.
+
+``QueryBudgetMiddleware`` (enabled by QUERY_BUDGET_ENABLED) counts the
+queries of every request, adds an ``X-Query-Count`` header and logs requests
+over budget together with the SQL and the application stack behind each
+query; with QUERY_BUDGET_STRICT it fails them instead. ``assert_query_budget``
+does the same for a block of code, and ``python manage.py check_query_budgets``
+runs every API endpoint against seeded data.
+"""
+import contextlib
+import logging
+import os
+import re
+import traceback
+from collections import Counter
+
+from django.conf import settings
+from django.db import connections
+
+
+logger = logging.getLogger(__name__)
+
+STACK_DEPTH = 6
+SQL_PREVIEW_LENGTH = 300
+
+
+class QueryBudgetExceeded(AssertionError):
+    """A request or block ran more queries than its budget allows"""
+
+
+class QueryRecorder:
+    """``execute_wrapper`` that keeps each query's SQL and the app frames that issued it"""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        self.queries.append((sql, _app_stack()))
+        return execute(sql, params, many, context)
+
+    def __len__(self):
+        return len(self.queries)
+
+
+def _app_stack():
+    """
+    The project's own frames (innermost last), plus the frame outside the ORM
+    that triggered the query when that is library code, e.g. a serializer
+    field following a relation
+    """
+    base_dir = str(settings.BASE_DIR)
+    stack = [frame for frame in traceback.extract_stack()[:-2] if not frame.filename.endswith('query_budget.py')]
+
+    def is_app(frame):
+        return frame.filename.startswith(base_dir) and 'site-packages' not in frame.filename
+
+    def describe(frame):
+        filename = frame.filename
+        if is_app(frame):
+            filename = filename[len(base_dir) + 1:]
+        elif 'site-packages' in filename:
+            filename = filename.split('site-packages', 1)[1].lstrip(os.sep)
+        return f'{filename}:{frame.lineno} in {frame.name}'
+
+    frames = [frame for frame in stack if is_app(frame)][-STACK_DEPTH:]
+    trigger = next((frame for frame in reversed(stack) if f'django{os.sep}db' not in frame.filename), None)
+    if trigger is not None and not is_app(trigger):
+        frames.append(trigger)
+    return [describe(frame) for frame in frames]
+
+
+def _shape(sql):
+    """SQL with literals removed, to spot the same statement run once per row"""
+    return re.sub(r"'[^']*'|\b\d+\b", '?', sql)
+
+
+def format_report(label, recorder, budget):
+    """Readable report of the queries behind a budget failure"""
+    lines = [f'{label} ran {len(recorder)} queries (budget {budget})']
+    repeated = [(shape, count) for shape, count in Counter(_shape(sql) for sql, _ in recorder.queries).items() if count > 1]
+    for shape, count in repeated:
+        lines.append(f'  repeated {count}x: {shape[:SQL_PREVIEW_LENGTH]}')
+    for number, (sql, stack) in enumerate(recorder.queries, start=1):
+        lines.append(f'  [{number}] {sql[:SQL_PREVIEW_LENGTH]}')
+        lines.extend(f'        {frame}' for frame in stack)
+    return '\n'.join(lines)
+
+
+@contextlib.contextmanager
+def record_queries():
+    """Record every query run on any database connection inside the block"""
+    recorder = QueryRecorder()
+    with contextlib.ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(recorder))
+        yield recorder
+
+
+@contextlib.contextmanager
+def assert_query_budget(budget, label='block'):
+    """Raise QueryBudgetExceeded if the block runs more than ``budget`` queries"""
+    with record_queries() as recorder:
+        yield recorder
+    if len(recorder) > budget:
+        raise QueryBudgetExceeded(format_report(label, recorder, budget))
+
+
+def query_budget(budget):
+    """Declare the query budget of a function view (apply above ``@api_view``)"""
+    def decorator(view_func):
+        view_func.query_budget = budget
+        return view_func
+    return decorator
+
+
+def get_query_budget(view_func, method):
+    """Budget declared for the view handling ``method``, or None"""
+    budget = getattr(view_func, 'initkwargs', {}).get('query_budget')
+    if budget is None:
+        budget = getattr(view_func, 'query_budget', None)
+    if budget is None:
+        budget = getattr(getattr(view_func, 'cls', None), 'query_budget', None)
+    if isinstance(budget, dict):
+        actions = getattr(view_func, 'actions', None) or {}
+        action = actions.get(method.lower())
+        budget = budget.get(action, budget.get('default'))
+    return budget
+
+
+class QueryBudgetMiddleware:
+    """Count queries per request and enforce the view's declared budget"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.query_budget = None
+        with record_queries() as recorder:
+            response = self.get_response(request)
+        response['X-Query-Count'] = str(len(recorder))
+
+        budget = request.query_budget
+        if budget is not None and len(recorder) > budget:
+            report = format_report(f'{request.method} {request.path}', recorder, budget)
+            if settings.QUERY_BUDGET_STRICT:
+                raise QueryBudgetExceeded(report)
+            logger.warning(report)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.query_budget = get_query_budget(view_func, request.method)
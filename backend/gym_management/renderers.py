@@ -0,0 +1,69 @@
+"""
+orjson-based JSON renderer for the REST API.
+
+``ORJSONRenderer`` is a drop-in replacement for DRF's ``JSONRenderer``:
+dicts, lists, strings and numbers are encoded by orjson, while ``Decimal``,
+UUIDs, lazy strings and other non-native values go through DRF's own encoder,
+so raw ``Decimal`` amounts still become JSON numbers.
+
+With API_JSON_COMPAT (the default) the output is byte-for-byte what
+``JSONRenderer`` produces with the project's settings: dates and datetimes
+use DRF's format (``Z`` for UTC) and U+2028/U+2029 are escaped. The only
+known difference is floats of 1e16 or more, which orjson writes as ``1e16``
+instead of ``1e+16``. Turning it off lets orjson format dates natively and
+skips the escaping pass.
+
+Indented output (the browsable API, ``Accept: application/json; indent=4``),
+``UNICODE_JSON = False`` / ``COMPACT_JSON = False`` and a missing orjson
+package all fall back to ``JSONRenderer``.
+``python manage.py benchmark_json`` compares both renderers.
+"""
+from django.conf import settings
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils import encoders
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+
+_drf_encoder = encoders.JSONEncoder()
+
+_LINE_SEPARATORS = ((b'\xe2\x80\xa8', b'\\u2028'), (b'\xe2\x80\xa9', b'\\u2029'))
+
+
+def _default(value):
+    # Called by orjson for types it does not serialize itself
+    return _drf_encoder.default(value)
+
+
+class ORJSONRenderer(JSONRenderer):
+    """JSONRenderer that encodes with orjson when it is installed"""
+    # None reads API_JSON_COMPAT on every render
+    compat = None
+
+    def get_options(self):
+        compat = settings.API_JSON_COMPAT if self.compat is None else self.compat
+        options = orjson.OPT_NON_STR_KEYS
+        if compat:
+            options |= orjson.OPT_PASSTHROUGH_DATETIME
+        else:
+            options |= orjson.OPT_UTC_Z
+        return options, compat
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        if orjson is None or indent is not None or self.ensure_ascii or not self.compact:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        options, compat = self.get_options()
+        ret = orjson.dumps(data, default=_default, option=options)
+        if compat and b'\xe2\x80' in ret:
+            # Same JavaScript-safe escaping as JSONRenderer
+            for raw, escaped in _LINE_SEPARATORS:
+                ret = ret.replace(raw, escaped)
+        return ret
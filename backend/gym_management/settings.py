@@ -5,7 +5,9 @@ Django settings for gym_management project.
 from pathlib import Path
 from datetime import timedelta
 from decouple import config
-import dj_database_url
+from corsheaders.defaults import default_headers
+
+from .database import database_from_url
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -73,6 +75,12 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'gym_management.wsgi.application'
+ASGI_APPLICATION = 'gym_management.asgi.application'
+
+# ASGI mode (gym_management.asgi sets it; serve with `gunicorn -c gunicorn_asgi_config.py`):
+# async dashboard view, concurrent COUNT + page queries on list endpoints and no
+# persistent DB connections, which ASGI requests (one thread each) cannot reuse
+ASGI_MODE = config('ASGI_MODE', default=False, cast=bool)
 
 
 # Database
@@ -91,18 +99,10 @@ if not DEBUG and not DATABASE_URL:
 
 if DATABASE_URL:
     # Production: Use PostgreSQL/MySQL from DATABASE_URL (Render, Railway, Supabase, Neon, etc.)
-    db_config = dj_database_url.parse(DATABASE_URL, conn_max_age=600)
-    # Optimize connection pool settings for better performance
-    db_config['CONN_MAX_AGE'] = 600  # Keep connections alive for 10 minutes
-    db_config['OPTIONS'] = db_config.get('OPTIONS', {})
-    db_config['OPTIONS']['connect_timeout'] = 10  # 10 second connection timeout
-    # Supabase/Neon require SSL; ensure sslmode is set if not already in URL
-    if db_config.get('ENGINE') == 'django.db.backends.postgresql':
-        db_config.setdefault('OPTIONS', {})
-        if 'sslmode' not in db_config['OPTIONS'] and 'sslmode' not in (DATABASE_URL or ''):
-            db_config['OPTIONS']['sslmode'] = 'require'
+    # Connection handling (kept connections, health checks, pool, pgbouncer) is set by URL options,
+    # see gym_management/database.py
     DATABASES = {
-        'default': db_config
+        'default': database_from_url(DATABASE_URL, asgi_mode=ASGI_MODE)
     }
 elif config('USE_MYSQL', default=False, cast=bool):
     # Development: Use MySQL if explicitly configured
@@ -176,16 +176,28 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # Custom User Model
 AUTH_USER_MODEL = 'members.Owner'
 
+# Largest ?page_size= a list request may ask for
+MAX_PAGE_SIZE = config('MAX_PAGE_SIZE', default=500, cast=int)
+
 # REST Framework Settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'gym_management.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    'DEFAULT_PAGINATION_CLASS': 'gym_management.pagination.OptionalKeysetPagination',
     'PAGE_SIZE': 20,
+    'DEFAULT_RENDERER_CLASSES': (
+        'gym_management.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'gym_management.parsers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
     'DEFAULT_FILTER_BACKENDS': [
         'rest_framework.filters.SearchFilter',
         'rest_framework.filters.OrderingFilter',
@@ -197,12 +209,22 @@ SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(hours=1),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=7),
     'ROTATE_REFRESH_TOKENS': True,
+    # Enforced by members.tokens (cache + RevokedToken table), not simplejwt's token_blacklist app
     'BLACKLIST_AFTER_ROTATION': True,
     'UPDATE_LAST_LOGIN': True,
     'ALGORITHM': 'HS256',
     'SIGNING_KEY': SECRET_KEY,
     'AUTH_HEADER_TYPES': ('Bearer',),
 }
+# Seconds after a rotation during which the old refresh token gets the same new
+# tokens again, so browser tabs sharing it do not log each other out (0 disables)
+JWT_REFRESH_REUSE_GRACE = config('JWT_REFRESH_REUSE_GRACE', default=30, cast=int)
+
+# Owners authenticated by JWT are cached per worker (gym_management.authentication)
+# for this many seconds; 0 loads the owner on every request. Deactivating an owner
+# or changing their password reaches the other workers within this time.
+AUTH_USER_CACHE_TTL = config('AUTH_USER_CACHE_TTL', default=60, cast=int)
+AUTH_USER_CACHE_SIZE = config('AUTH_USER_CACHE_SIZE', default=1000, cast=int)
 
 # CORS Settings
 CORS_ALLOWED_ORIGINS = config(
@@ -212,4 +234,126 @@ CORS_ALLOWED_ORIGINS = config(
 )
 
 CORS_ALLOW_CREDENTIALS = True
+# Conditional GET validators (gym_management.conditional) readable and sendable by the frontend
+CORS_EXPOSE_HEADERS = ['ETag', 'Last-Modified']
+CORS_ALLOW_HEADERS = (*default_headers, 'if-none-match', 'if-modified-since')
 
+
+# Cache Settings
+# CACHE_BACKEND selects the cache used for dashboard stats and other hot reads:
+#   locmem (default, per process), file, db (run `python manage.py createcachetable`) or redis.
+# CACHE_LOCATION overrides the backend's default location (directory, table name or redis URL).
+CACHE_BACKEND = config('CACHE_BACKEND', default='locmem')
+CACHE_LOCATION = config('CACHE_LOCATION', default='')
+
+if CACHE_BACKEND == 'redis':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_LOCATION or 'redis://127.0.0.1:6379/1',
+        }
+    }
+elif CACHE_BACKEND == 'db':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': CACHE_LOCATION or 'gymflow_cache',
+        }
+    }
+elif CACHE_BACKEND == 'file':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': CACHE_LOCATION or str(BASE_DIR / '.cache'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': CACHE_LOCATION or 'gymflow',
+        }
+    }
+
+# Dashboard stats are cached per owner (and platform-wide for superusers) and
+# invalidated by Member/Payment signals; the timeout only bounds staleness for
+# changes made outside the ORM.
+DASHBOARD_CACHE_TIMEOUT = config('DASHBOARD_CACHE_TIMEOUT', default=300, cast=int)
+
+# Plans are served from a per-worker in-memory catalog (plans.catalog), reloaded
+# when a plan changes (seen at once by workers sharing CACHE_BACKEND) and at
+# least every PLAN_CATALOG_TTL seconds. Clients may reuse /api/plans/ responses
+# for PLAN_CACHE_MAX_AGE seconds before revalidating via ETag.
+PLAN_CATALOG_TTL = config('PLAN_CATALOG_TTL', default=30, cast=int)
+PLAN_CACHE_MAX_AGE = config('PLAN_CACHE_MAX_AGE', default=0, cast=int)
+
+# Conditional GET on member, payment, trainer and gym endpoints: ETags come from
+# per-owner change stamps kept in the cache above. With the per-process locmem
+# cache, writes made by other processes (cron jobs, shells, other workers) never
+# move a worker's stamps, so it is only on by default with a shared CACHE_BACKEND.
+CONDITIONAL_GET_ENABLED = config('CONDITIONAL_GET_ENABLED', default=CACHE_BACKEND != 'locmem', cast=bool)
+
+# Each worker keeps the unexpired revoked refresh-token JTIs in memory and checks
+# a refresh against them without a query (members.tokens). Other workers'
+# revocations reach it through a version stamp in the cache, so like conditional
+# GET it is only on by default with a shared CACHE_BACKEND.
+JWT_REVOKED_SET_ENABLED = config('JWT_REVOKED_SET_ENABLED', default=CACHE_BACKEND != 'locmem', cast=bool)
+
+# API JSON is encoded/decoded with orjson (gym_management.renderers/parsers).
+# API_JSON_COMPAT keeps the output byte-identical to DRF's JSONRenderer
+# (date format, U+2028/U+2029 escaping); turn it off for orjson's native format.
+API_JSON_COMPAT = config('API_JSON_COMPAT', default=True, cast=bool)
+
+# Country code applied when normalizing phone numbers typed without one
+PHONE_DEFAULT_COUNTRY_CODE = config('PHONE_DEFAULT_COUNTRY_CODE', default='91')
+
+# Bulk member import (POST /api/members/import/)
+MEMBER_IMPORT_BATCH_SIZE = config('MEMBER_IMPORT_BATCH_SIZE', default=500, cast=int)
+MEMBER_IMPORT_MAX_ROWS = config('MEMBER_IMPORT_MAX_ROWS', default=10000, cast=int)
+
+# PostgreSQL only: partition payments_payment by payment_date month (payments.partitions).
+# Read when payments migration 0004 runs; existing deployments convert with
+# `python manage.py manage_payment_partitions --convert`. The command (daily cron)
+# keeps PAYMENT_PARTITIONS_AHEAD future months created and detaches old months
+# into PAYMENT_ARCHIVE_SCHEMA with --archive-before.
+PAYMENT_PARTITIONING = config('PAYMENT_PARTITIONING', default=False, cast=bool)
+PAYMENT_PARTITIONS_AHEAD = config('PAYMENT_PARTITIONS_AHEAD', default=3, cast=int)
+PAYMENT_ARCHIVE_SCHEMA = config('PAYMENT_ARCHIVE_SCHEMA', default='payments_archive')
+
+# Rows fetched per round trip by the streaming export endpoints
+EXPORT_CHUNK_SIZE = config('EXPORT_CHUNK_SIZE', default=2000, cast=int)
+
+# Members expired per transaction by the daily status job
+MEMBER_STATUS_BATCH_SIZE = config('MEMBER_STATUS_BATCH_SIZE', default=500, cast=int)
+
+# Notification backend for member messages (members.notifications):
+# ConsoleBackend prints messages, BatchHTTPBackend posts batches to a bulk-send gateway
+NOTIFICATION_BACKEND = config('NOTIFICATION_BACKEND', default='members.notifications.ConsoleBackend')
+NOTIFICATION_BATCH_SIZE = config('NOTIFICATION_BATCH_SIZE', default=100, cast=int)
+NOTIFICATION_HTTP_URL = config('NOTIFICATION_HTTP_URL', default='')
+NOTIFICATION_HTTP_TOKEN = config('NOTIFICATION_HTTP_TOKEN', default='')
+NOTIFICATION_HTTP_TIMEOUT = config('NOTIFICATION_HTTP_TIMEOUT', default=10, cast=float)
+
+# Expiry reminders: concurrent senders, per-provider rate limits (provider
+# requests per second keyed by backend name, 0 = unlimited), retries with
+# exponential backoff (seconds) and how long a run may hold its claimed
+# reminders before another run takes them over (seconds)
+REMINDER_MAX_WORKERS = config('REMINDER_MAX_WORKERS', default=8, cast=int)
+REMINDER_RATE_LIMITS = {
+    'default': config('REMINDER_RATE_LIMIT', default=10, cast=float),
+    'console': 0,
+}
+REMINDER_MAX_RETRIES = config('REMINDER_MAX_RETRIES', default=3, cast=int)
+REMINDER_RETRY_BACKOFF = config('REMINDER_RETRY_BACKOFF', default=0.5, cast=float)
+REMINDER_BATCH_SIZE = config('REMINDER_BATCH_SIZE', default=500, cast=int)
+REMINDER_CLAIM_TIMEOUT = config('REMINDER_CLAIM_TIMEOUT', default=3600, cast=int)
+
+# Query budgets (gym_management.query_budget): count SQL queries per request,
+# add an X-Query-Count header and report requests over their view's budget.
+# Off by default: the middleware records a stack for every query, so turn it on
+# only while profiling. QUERY_BUDGET_STRICT turns a report into a server error
+# (for CI / local checks).
+QUERY_BUDGET_ENABLED = config('QUERY_BUDGET_ENABLED', default=False, cast=bool)
+QUERY_BUDGET_STRICT = config('QUERY_BUDGET_STRICT', default=False, cast=bool)
+if QUERY_BUDGET_ENABLED:
+    MIDDLEWARE.insert(0, 'gym_management.query_budget.QueryBudgetMiddleware')
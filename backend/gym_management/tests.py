@@ -0,0 +1,294 @@
+import io
+import threading
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+
+from members.management.commands.check_query_budgets import Command as CheckQueryBudgets
+from members.views import CustomTokenObtainPairSerializer
+from . import authentication
+from .async_api import run_concurrently
+from .authentication import CachedJWTAuthentication, clear_cached_users
+from .exports import stream_export
+from members.models import Gym, Member, Owner, Trainer, TrainerPayment
+from members.views import MemberViewSet, TrainerPaymentViewSet, TrainerViewSet
+from payments.models import Payment
+from payments.views import PaymentViewSet
+
+
+@override_settings(AUTH_USER_CACHE_TTL=60)
+class CachedJWTAuthenticationTests(TestCase):
+    def setUp(self):
+        self.owner = Owner.objects.create_user(username='auth-owner', password='auth-pass-123')
+        self.auth = CachedJWTAuthentication()
+        self.token = self.auth.get_validated_token(str(CustomTokenObtainPairSerializer.get_token(self.owner).access_token))
+        clear_cached_users()
+        self.addCleanup(clear_cached_users)
+
+    def test_reuses_the_owner_without_queries(self):
+        self.assertEqual(self.auth.get_user(self.token), self.owner)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.auth.get_user(self.token), self.owner)
+
+    def test_requests_do_not_share_related_objects(self):
+        Gym.objects.create(owner=self.owner, name='First Gym')
+        first = self.auth.get_user(self.token)
+        first.first_name = 'Changed'
+        # A related object cached on the shared instance, e.g. by a select_related load
+        self.assertEqual(authentication._users[self.owner.pk][2].gym.name, 'First Gym')
+        Gym.objects.filter(owner=self.owner).update(name='Renamed Gym')
+
+        second = self.auth.get_user(self.token)
+        self.assertEqual(second.first_name, '')
+        self.assertEqual(second.gym.name, 'Renamed Gym')
+        self.assertIsNot(second.gym, first.gym)
+
+    def test_stale_token_version_is_rejected(self):
+        self.auth.get_user(self.token)
+        self.owner.set_password('changed-pass-456')
+        self.owner.save()
+        clear_cached_users()
+        with self.assertRaises(AuthenticationFailed):
+            self.auth.get_user(self.token)
+
+
+class KeysetPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = Owner.objects.create_user(username='keyset-owner', password='keyset-pass-123')
+        today = timezone.now().date()
+        for name in ['Mia Stone', 'Ada Stone', 'Zed Park', 'Lee Stone Stone', 'Bo Park', 'Cy Stone', 'Eve Park']:
+            Member.objects.create(
+                owner=cls.owner, name=name, phone='9876543210', plan_type='GENERAL',
+                start_date=today, end_date=today + timedelta(days=30),
+            )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+    def walk(self, url):
+        names = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200, response.content)
+            names += [row['name'] for row in response.data['results']]
+            url = response.data['next']
+        return names
+
+    def test_follows_client_ordering(self):
+        names = self.walk('/api/members/?pagination=cursor&page_size=3&ordering=name')
+        self.assertEqual(names, sorted(names))
+        self.assertEqual(len(names), 7)
+
+        names = self.walk('/api/members/?pagination=cursor&page_size=2&ordering=-name')
+        self.assertEqual(names, sorted(names, reverse=True))
+
+    def test_keeps_search_ranking(self):
+        ranked = [row['name'] for row in self.client.get('/api/members/?search=Stone&page_size=100').data['results']]
+        self.assertEqual(len(ranked), 4)
+        self.assertEqual(self.walk('/api/members/?search=Stone&pagination=cursor&page_size=1'), ranked)
+
+    def test_default_ordering(self):
+        names = self.walk('/api/members/?pagination=cursor&page_size=4')
+        self.assertEqual(names, list(Member.objects.order_by('-created_at', '-id').values_list('name', flat=True)))
+
+    def test_rejects_nullable_ordering(self):
+        response = self.client.get('/api/members/?pagination=cursor&ordering=last_payment_date')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('ordering', response.data)
+        # Page-number pages still accept it
+        self.assertEqual(self.client.get('/api/members/?ordering=last_payment_date').status_code, 200)
+
+    def test_asgi_page_numbers_match(self):
+        sync = self.client.get('/api/members/?page=2&page_size=3&ordering=name').data
+        with override_settings(ASGI_MODE=True):
+            concurrent = self.client.get('/api/members/?page=2&page_size=3&ordering=name').data
+            out_of_range = self.client.get('/api/members/?page=4&page_size=3')
+        self.assertEqual(concurrent, sync)
+        self.assertEqual(out_of_range.status_code, 404)
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = Owner.objects.create_user(username='etag-owner', password='etag-pass-123')
+        today = timezone.now().date()
+        cls.member = Member.objects.create(
+            owner=cls.owner, name='Etag Member', phone='9876543210', plan_type='GENERAL',
+            start_date=today, end_date=today + timedelta(days=30),
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+    def test_off_with_the_per_process_cache(self):
+        # The test settings use the default locmem CACHE_BACKEND
+        self.assertIn('LocMemCache', settings.CACHES['default']['BACKEND'])
+        self.assertFalse(settings.CONDITIONAL_GET_ENABLED)
+        response = self.client.get('/api/members/')
+        self.assertNotIn('ETag', response)
+
+    @override_settings(CONDITIONAL_GET_ENABLED=True)
+    def test_not_modified_until_a_write(self):
+        etag = self.client.get('/api/members/')['ETag']
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get('/api/members/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.member.name = 'Etag Member renamed'
+            self.member.save()
+        response = self.client.get('/api/members/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'][0]['name'], 'Etag Member renamed')
+
+
+class ExportTests(TestCase):
+    COLUMNS = [('name', 'name'), ('end_date', 'end_date')]
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = Owner.objects.create_user(username='export-owner', password='export-pass-123')
+        cls.today = timezone.now().date()
+        for name in ('Ada', 'Bo', 'Cy', 'Di', 'Eve'):
+            Member.objects.create(
+                owner=owner, name=name, phone='9876543210', plan_type='GENERAL',
+                start_date=cls.today, end_date=cls.today,
+            )
+        cls.expected = ['name,end_date'] + [f'{name},{cls.today.isoformat()}' for name in ('Ada', 'Bo', 'Cy', 'Di', 'Eve')]
+
+    def export(self):
+        return stream_export(Member.objects.order_by('name'), self.COLUMNS, 'csv', 'members')
+
+    def test_streams_synchronously(self):
+        response = self.export()
+        self.assertFalse(response.is_async)
+        self.assertEqual(b''.join(response.streaming_content).decode().splitlines(), self.expected)
+
+    @override_settings(ASGI_MODE=True, EXPORT_CHUNK_SIZE=2)
+    def test_asgi_mode_streams_asynchronously(self):
+        response = self.export()
+        # An async iterator, so the ASGI handler sends chunks instead of buffering a list
+        self.assertTrue(response.is_async)
+
+        async def collect():
+            return [chunk async for chunk in response.streaming_content]
+
+        self.assertEqual(b''.join(async_to_sync(collect)()).decode().splitlines(), self.expected)
+
+    @override_settings(EXPORT_CHUNK_SIZE=2)
+    def test_pages_by_keyset_without_server_side_cursors(self):
+        # iterator() would read every row with one unbounded query here
+        with mock.patch.dict(connection.settings_dict, DISABLE_SERVER_SIDE_CURSORS=True):
+            response = self.export()
+            with CaptureQueriesContext(connection) as queries:
+                lines = b''.join(response.streaming_content).decode().splitlines()
+            self.assertEqual(lines, self.expected)
+            self.assertEqual(len(queries), 3)
+            self.assertTrue(all('LIMIT 2' in query['sql'] for query in queries))
+
+            # Equal sort values are told apart by id
+            ties = stream_export(Member.objects.order_by('-end_date'), self.COLUMNS, 'csv', 'members')
+            self.assertCountEqual(b''.join(ties.streaming_content).decode().splitlines()[1:], self.expected[1:])
+
+            with self.assertRaises(ValidationError):
+                stream_export(Member.objects.order_by('last_payment_date'), self.COLUMNS, 'csv', 'members')
+
+
+class RunConcurrentlyTests(TestCase):
+    def threads(self):
+        return async_to_sync(run_concurrently)(threading.get_ident, threading.get_ident)
+
+    def test_runs_in_turn_without_a_pool(self):
+        # Each call in a new thread would open a connection of its own
+        with mock.patch.object(type(connections[DEFAULT_DB_ALIAS]), 'vendor', 'postgresql'):
+            self.assertEqual(self.threads(), [threading.get_ident()] * 2)
+
+    def test_uses_worker_threads_with_a_pool(self):
+        with mock.patch.dict(connection.settings_dict, POOL={'SIZE': 5, 'TIMEOUT': 10, 'PRE_PING': True}):
+            self.assertNotIn(threading.get_ident(), self.threads())
+
+
+class FastListParityTests(TestCase):
+    """The values() list path must render exactly what the serializers render"""
+
+    ENDPOINTS = [
+        (MemberViewSet, '/api/members/'),
+        (PaymentViewSet, '/api/payments/'),
+        (TrainerViewSet, '/api/members/trainers/'),
+        (TrainerPaymentViewSet, '/api/members/trainer-payments/'),
+    ]
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = Owner.objects.create_user(username='parity-owner', password='parity-pass-123')
+        today = timezone.now().date()
+        trainer = Trainer.objects.create(
+            owner=cls.owner, name='Parity Trainer', phone='9700000000', specialization='Strength',
+            salary_type='MIXED', base_salary=Decimal('10000'), commission_percent=Decimal('12.5'),
+        )
+        Trainer.objects.create(owner=cls.owner, name='Bare Trainer')
+        for i in range(6):
+            member = Member.objects.create(
+                owner=cls.owner, name=f'Parity Member {i}', phone=f'98000000{i:02d}',
+                plan_type='PT' if i % 2 else 'GENERAL', trainer=trainer if i % 2 else None,
+                assigned_trainer=trainer.name if i % 2 else None,
+                start_date=today - timedelta(days=30), end_date=today + timedelta(days=i * 7 - 10),
+            )
+            Payment.objects.create(
+                member=member, amount=Decimal('1499.50') + i, payment_mode='UPI' if i % 2 else 'Cash',
+                payment_date=today - timedelta(days=i), notes='Monthly fee' if i % 2 else None,
+            )
+            TrainerPayment.objects.create(
+                trainer=trainer, amount=Decimal('800.25'), payment_mode='Cash', payment_date=today - timedelta(days=i),
+            )
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+    def get(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def test_fast_list_matches_serializers(self):
+        for viewset, path in self.ENDPOINTS:
+            for query in ('', '?page_size=1&page=2', '?pagination=cursor&page_size=1'):
+                with self.subTest(path=path, query=query):
+                    fast = self.get(path + query)
+                    with mock.patch.object(viewset, 'fast_list', False):
+                        cache.clear()
+                        slow = self.get(path + query)
+                    self.assertTrue(fast['results'])
+                    self.assertEqual(fast, slow)
+
+
+class QueryBudgetTests(TransactionTestCase):
+    """Runs the check_query_budgets endpoints inside the test suite"""
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def test_endpoints_within_budget(self):
+        stdout = io.StringIO()
+        # More than one page, so per-row queries show up; no wrapping transaction,
+        # so on-commit work runs as it does for the command
+        rows = settings.REST_FRAMEWORK['PAGE_SIZE'] + 5
+        failures = CheckQueryBudgets(stdout=stdout).check_endpoints(rows, verbose=False)
+        self.assertEqual(failures, 0, stdout.getvalue())
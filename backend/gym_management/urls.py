@@ -4,7 +4,8 @@ URL configuration for gym_management project.
 from django.contrib import admin
 from django.urls import path, include
 from django.http import JsonResponse
-from rest_framework_simplejwt.views import TokenRefreshView
+
+from members.views import BlacklistingTokenRefreshView
 
 def root_view(request):
     """Root endpoint that returns API information"""
@@ -25,7 +26,7 @@ urlpatterns = [
     path('', root_view, name='root'),
     path('api/', root_view, name='api-root'),
     path('admin/', admin.site.urls),
-    path('api/auth/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+    path('api/auth/token/refresh/', BlacklistingTokenRefreshView.as_view(), name='token_refresh'),
     path('api/auth/', include('members.urls')),
     path('api/members/', include('members.urls')),
     path('api/plans/', include('plans.urls')),
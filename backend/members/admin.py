@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
-from .models import Owner, Member, Trainer, TrainerPayment, Gym
+from .models import Owner, Member, Trainer, TrainerPayment, Gym, ReminderLog
 
 
 @admin.register(Owner)
@@ -13,9 +13,13 @@ class OwnerAdmin(BaseUserAdmin):
 
 @admin.register(Member)
 class MemberAdmin(admin.ModelAdmin):
-    list_display = ['name', 'phone', 'plan_type', 'status', 'start_date', 'end_date', 'owner', 'assigned_trainer']
+    list_display = [
+        'name', 'phone', 'plan_type', 'status', 'start_date', 'end_date', 'owner', 'assigned_trainer',
+        'total_paid', 'last_payment_date',
+    ]
     list_filter = ['plan_type', 'status', 'owner']
     search_fields = ['name', 'phone']
+    readonly_fields = ['total_paid', 'payment_count', 'last_payment_date']
 
 
 @admin.register(Trainer)
@@ -37,3 +41,10 @@ class GymAdmin(admin.ModelAdmin):
     list_display = ['name', 'owner', 'city', 'state', 'country', 'phone']
     list_filter = ['city', 'state', 'country']
     search_fields = ['name', 'owner__username', 'city', 'state']
+
+
+@admin.register(ReminderLog)
+class ReminderLogAdmin(admin.ModelAdmin):
+    list_display = ['member', 'end_date', 'status', 'attempts', 'sent_at', 'created_at']
+    list_filter = ['status', 'end_date']
+    search_fields = ['member__name', 'member__phone']
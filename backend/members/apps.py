@@ -5,3 +5,5 @@ class MembersConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'members'
 
+    def ready(self):
+        from . import signals  # noqa: F401
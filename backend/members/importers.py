@@ -0,0 +1,154 @@
+"""
+Bulk member import from CSV/XLSX uploads.
+
+Rows are streamed from the upload, validated with ``MemberSerializer`` (the
+same rules as ``POST /api/members/``) and inserted with ``bulk_create`` in
+batches inside one transaction, so a few thousand rows cost a handful of
+INSERTs instead of one HTTP request each.
+"""
+import csv
+import datetime
+import io
+
+from django.conf import settings
+from django.db import transaction
+from rest_framework.exceptions import ValidationError
+
+from dashboard.cache import invalidate_dashboard_stats
+from gym_management.conditional import bump_change_version
+from .models import Member
+from .phone import set_phone_key
+from .serializers import MemberSerializer
+from .trainers import trainer_name_key, trainers_by_name
+
+
+IMPORT_FIELDS = ('name', 'phone', 'plan_type', 'start_date', 'end_date', 'status', 'assigned_trainer')
+
+
+class ImportFileError(ValueError):
+    """The upload cannot be read as a member spreadsheet"""
+
+
+def _clean_cell(value):
+    if value is None:
+        return None
+    if isinstance(value, datetime.datetime):
+        return value.date()
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    if isinstance(value, (int, float)):
+        return str(value)
+    if isinstance(value, str):
+        value = value.strip()
+        return value or None
+    return value
+
+
+def _rows_from_csv(upload):
+    stream = io.TextIOWrapper(upload, encoding='utf-8-sig', newline='')
+    reader = csv.reader(stream)
+    try:
+        header = next(reader, None)
+        if header is None:
+            return
+        header = [column.strip().lower() for column in header]
+        for values in reader:
+            if any(value.strip() for value in values):
+                yield dict(zip(header, values))
+    except UnicodeDecodeError:
+        raise ImportFileError('CSV files must be UTF-8 encoded.')
+    except csv.Error as exc:
+        raise ImportFileError(f'The CSV file could not be read near line {reader.line_num}: {exc}.')
+    finally:
+        stream.detach()
+
+
+def _rows_from_xlsx(upload):
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ImportFileError('XLSX import requires the openpyxl package.')
+    try:
+        workbook = load_workbook(upload, read_only=True, data_only=True)
+    except Exception:
+        raise ImportFileError('The uploaded file is not a valid XLSX workbook.')
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        header = [str(column or '').strip().lower() for column in header]
+        for values in rows:
+            if any(value not in (None, '') for value in values):
+                yield dict(zip(header, values))
+    finally:
+        workbook.close()
+
+
+def read_rows(upload, filename):
+    """Yield one dict per spreadsheet row, keyed by lower-cased header"""
+    if filename.lower().endswith('.xlsx'):
+        rows = _rows_from_xlsx(upload)
+    elif filename.lower().endswith('.csv'):
+        rows = _rows_from_csv(upload)
+    else:
+        raise ImportFileError('Upload a .csv or .xlsx file.')
+    for row in rows:
+        cleaned = {field: _clean_cell(row.get(field)) for field in IMPORT_FIELDS}
+        # Blank cells fall back to the serializer's defaults, as if the key was omitted
+        yield {field: value for field, value in cleaned.items() if value is not None}
+
+
+def import_members(upload, filename, owner, batch_size=None, atomic=False, dry_run=False):
+    """
+    Import members for ``owner`` from an uploaded file.
+
+    Invalid rows are reported and skipped; with ``atomic=True`` any invalid
+    row rolls the whole import back, and ``dry_run=True`` only validates.
+    Row numbers in the report are spreadsheet rows (the header is row 1).
+    """
+    batch_size = batch_size or settings.MEMBER_IMPORT_BATCH_SIZE
+    max_rows = settings.MEMBER_IMPORT_MAX_ROWS
+    report = {'total_rows': 0, 'valid': 0, 'created': 0, 'failed': 0, 'errors': []}
+
+    # Reuse one serializer: building its fields per row costs more than validating
+    serializer = MemberSerializer()
+    trainer_ids = trainers_by_name(owner.pk)
+    batch = []
+    with transaction.atomic():
+        for row_number, row in enumerate(read_rows(upload, filename), start=2):
+            report['total_rows'] += 1
+            if report['total_rows'] > max_rows:
+                raise ImportFileError(f'Imports are limited to {max_rows} rows per file.')
+
+            try:
+                validated_data = serializer.run_validation(row)
+            except ValidationError as exc:
+                report['failed'] += 1
+                report['errors'].append({'row': row_number, 'errors': exc.detail})
+                continue
+
+            member = Member(owner=owner, **validated_data)
+            member.trainer_id = trainer_ids.get(trainer_name_key(member.assigned_trainer))
+            set_phone_key(member)
+            report['valid'] += 1
+            if dry_run:
+                continue
+            batch.append(member)
+            if len(batch) >= batch_size:
+                Member.objects.bulk_create(batch)
+                batch = []
+
+        if batch:
+            Member.objects.bulk_create(batch)
+
+        if atomic and report['failed']:
+            transaction.set_rollback(True)
+        elif not dry_run:
+            report['created'] = report['valid']
+
+    if report['created']:
+        # bulk_create does not send post_save, so refresh the owner's dashboard and change stamp here
+        invalidate_dashboard_stats(owner.pk)
+        bump_change_version(owner.pk)
+    return report
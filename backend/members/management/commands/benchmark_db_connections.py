@@ -0,0 +1,92 @@
+"""
+Django management command to compare per-request database connection costs
+Runs against the configured database (point DATABASE_URL at the real server):
+    python manage.py benchmark_db_connections --requests 100
+
+Each simulated request runs ``SELECT 1`` between the connection handling
+Django does when a request starts and finishes:
+    cold       a new connection per request (CONN_MAX_AGE=0, no pool)
+    warm       a kept connection (CONN_MAX_AGE) without health checks
+    warm+check a kept connection checked before first use (CONN_HEALTH_CHECKS)
+    pooled     connections returned to an in-process pool (pool_size), pre-pinged
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.utils import load_backend
+
+from gym_management.database import POOLED_ENGINE, POSTGRESQL_ENGINES
+
+
+class Command(BaseCommand):
+    help = 'Measure per-request latency of new, kept, health-checked and pooled database connections'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=50, help='Simulated requests per mode (default: 50)')
+        parser.add_argument('--database', default='default', help='Database alias (default: default)')
+        parser.add_argument(
+            '--pool-size',
+            type=int,
+            default=4,
+            help='Pool size for the pooled mode on PostgreSQL (default: 4)'
+        )
+
+    def handle(self, *args, **options):
+        if options['database'] not in connections:
+            raise CommandError(f'Unknown database alias {options["database"]!r}')
+        settings_dict = connections[options['database']].settings_dict
+        engine = 'django.db.backends.postgresql' if settings_dict['ENGINE'] == POOLED_ENGINE else settings_dict['ENGINE']
+        postgresql = engine in POSTGRESQL_ENGINES
+
+        modes = [
+            ('cold', {'ENGINE': engine, 'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': False}),
+            ('warm', {'ENGINE': engine, 'CONN_MAX_AGE': None, 'CONN_HEALTH_CHECKS': False}),
+            ('warm+check', {'ENGINE': engine, 'CONN_MAX_AGE': None, 'CONN_HEALTH_CHECKS': True}),
+        ]
+        if postgresql:
+            modes.append(('pooled', {
+                'ENGINE': POOLED_ENGINE, 'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': False,
+                'POOL': {'SIZE': options['pool_size'], 'TIMEOUT': 10, 'PRE_PING': True},
+            }))
+
+        self.stdout.write(f'{options["requests"]} requests per mode against {settings_dict["ENGINE"]} {settings_dict["NAME"]}')
+        for name, overrides in modes:
+            # A separate wrapper (and pool) per mode, so no mode inherits another's connection
+            alias = f'benchmark-{name}'
+            wrapper = load_backend(overrides['ENGINE']).DatabaseWrapper({**settings_dict, **overrides}, alias)
+            try:
+                # The first request pays for the first connection in every mode; leave it out
+                self.request(wrapper)
+                latencies = [self.request(wrapper) for _ in range(options['requests'])]
+            finally:
+                wrapper.close()
+            self.report(name, latencies)
+        if not postgresql:
+            self.stdout.write(f'{"pooled":<10} skipped: the connection pool is only available on PostgreSQL')
+
+    @staticmethod
+    def request(wrapper):
+        start = time.perf_counter()
+        # What the request_started and request_finished signals do
+        wrapper.close_if_unusable_or_obsolete()
+        with wrapper.cursor() as cursor:
+            cursor.execute('SELECT 1')
+            cursor.fetchone()
+        wrapper.close_if_unusable_or_obsolete()
+        return time.perf_counter() - start
+
+    @staticmethod
+    def percentile(values, fraction):
+        index = min(len(values) - 1, max(0, round(fraction * len(values)) - 1))
+        return values[index]
+
+    def report(self, name, latencies):
+        if not latencies:
+            raise CommandError('--requests must be at least 1')
+        latencies.sort()
+        ms = {label: self.percentile(latencies, fraction) * 1000 for label, fraction in (('p50', .5), ('p95', .95))}
+        self.stdout.write(
+            f'{name:<10} p50 {ms["p50"]:8.2f} ms  p95 {ms["p95"]:8.2f} ms  '
+            f'mean {sum(latencies) / len(latencies) * 1000:8.2f} ms  max {latencies[-1] * 1000:8.2f} ms'
+        )
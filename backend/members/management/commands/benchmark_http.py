@@ -0,0 +1,140 @@
+"""
+Django management command to compare running API servers under concurrent load
+Start the sync and the ASGI server on the same database, then:
+    gunicorn -c gunicorn_config.py gym_management.wsgi:application --bind 127.0.0.1:8000
+    gunicorn -c gunicorn_asgi_config.py --bind 127.0.0.1:8001
+    python manage.py benchmark_http --username owner --password secret \
+        --target sync=http://127.0.0.1:8000 --target asgi=http://127.0.0.1:8001
+"""
+import json
+import threading
+import time
+from http.client import HTTPConnection, HTTPSConnection
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+DEFAULT_PATHS = '/api/dashboard/stats/,/api/members/,/api/payments/,/api/members/trainer-payments/'
+
+
+class Command(BaseCommand):
+    help = 'Measure throughput and latency percentiles of running API servers under concurrent requests'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--target',
+            action='append',
+            required=True,
+            help='name=base URL of a running server; repeat to compare servers'
+        )
+        parser.add_argument('--username', required=True, help='Owner to log in as')
+        parser.add_argument('--password', required=True)
+        parser.add_argument('--paths', default=DEFAULT_PATHS, help=f'Comma-separated GET paths (default: {DEFAULT_PATHS})')
+        parser.add_argument('--concurrency', type=int, default=16, help='Simultaneous clients (default: 16)')
+        parser.add_argument('--requests', type=int, default=400, help='Requests per target (default: 400)')
+        parser.add_argument('--timeout', type=float, default=30, help='Per-request timeout in seconds (default: 30)')
+
+    def handle(self, *args, **options):
+        paths = [path.strip() for path in options['paths'].split(',') if path.strip()]
+        targets = []
+        for target in options['target']:
+            name, separator, url = target.partition('=')
+            if not separator or not url:
+                raise CommandError(f'--target must look like name=http://host:port, got {target!r}')
+            targets.append((name, url.rstrip('/')))
+
+        self.stdout.write(
+            f'{options["requests"]} requests per target, {options["concurrency"]} concurrent clients, '
+            f'paths: {", ".join(paths)}'
+        )
+        for name, url in targets:
+            token = self.login(url, options['username'], options['password'], options['timeout'])
+            # One pass over the paths so imports, caches and connections are warm
+            self.run_load(url, token, paths, 1, len(paths), options['timeout'])
+            elapsed, latencies, errors = self.run_load(
+                url, token, paths, options['concurrency'], options['requests'], options['timeout']
+            )
+            self.report(name, elapsed, latencies, errors)
+
+    @staticmethod
+    def connect(url, timeout):
+        parts = urlsplit(url)
+        connection_class = HTTPSConnection if parts.scheme == 'https' else HTTPConnection
+        return connection_class(parts.netloc, timeout=timeout), parts.path
+
+    def login(self, url, username, password, timeout):
+        connection, prefix = self.connect(url, timeout)
+        body = json.dumps({'username': username, 'password': password})
+        try:
+            connection.request('POST', f'{prefix}/api/auth/login/', body, {'Content-Type': 'application/json'})
+            response = connection.getresponse()
+            payload = response.read()
+        except OSError as exc:
+            raise CommandError(f'{url} is not reachable: {exc}')
+        finally:
+            connection.close()
+        if response.status != 200:
+            raise CommandError(f'Login on {url} failed with HTTP {response.status}: {payload[:200]!r}')
+        return json.loads(payload)['access']
+
+    def run_load(self, url, token, paths, concurrency, total, timeout):
+        """Send ``total`` GETs from ``concurrency`` keep-alive clients; returns (seconds, latencies, errors)"""
+        headers = {'Authorization': f'Bearer {token}'}
+        counter = iter(range(total))
+        lock = threading.Lock()
+        latencies, errors = [], []
+
+        def client():
+            connection, prefix = self.connect(url, timeout)
+            try:
+                while True:
+                    with lock:
+                        number = next(counter, None)
+                    if number is None:
+                        return
+                    path = paths[number % len(paths)]
+                    start = time.perf_counter()
+                    try:
+                        connection.request('GET', prefix + path, headers=headers)
+                        response = connection.getresponse()
+                        response.read()
+                    except OSError as exc:
+                        connection.close()
+                        with lock:
+                            errors.append(f'{path}: {exc}')
+                        continue
+                    elapsed = time.perf_counter() - start
+                    with lock:
+                        if response.status == 200:
+                            latencies.append(elapsed)
+                        else:
+                            errors.append(f'{path}: HTTP {response.status}')
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=client) for _ in range(max(concurrency, 1))]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return time.perf_counter() - start, latencies, errors
+
+    @staticmethod
+    def percentile(values, fraction):
+        index = min(len(values) - 1, max(0, round(fraction * len(values)) - 1))
+        return values[index]
+
+    def report(self, name, elapsed, latencies, errors):
+        if not latencies:
+            raise CommandError(f'{name}: every request failed, e.g. {errors[0] if errors else "no response"}')
+        latencies.sort()
+        ms = {label: self.percentile(latencies, fraction) * 1000 for label, fraction in (('p50', .5), ('p95', .95), ('p99', .99))}
+        line = (
+            f'{name:<8} {len(latencies) / elapsed:8.1f} req/s  p50 {ms["p50"]:7.1f} ms  '
+            f'p95 {ms["p95"]:7.1f} ms  p99 {ms["p99"]:7.1f} ms  max {latencies[-1] * 1000:7.1f} ms'
+        )
+        if errors:
+            line += self.style.ERROR(f'  {len(errors)} errors, e.g. {errors[0]}')
+        self.stdout.write(line)
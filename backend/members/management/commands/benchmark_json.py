@@ -0,0 +1,71 @@
+"""
+Django management command to check and time the orjson renderer and parser
+Runs against a throwaway test database:
+    python manage.py benchmark_json --rows 5000
+"""
+import io
+
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from gym_management.parsers import ORJSONParser
+from gym_management.renderers import ORJSONRenderer, orjson
+from members.management.commands import benchmark_serializers
+from members.models import Member
+from members.serializers import MemberListSerializer
+from payments.models import Payment
+from payments.serializers import PaymentListSerializer
+
+
+class Command(benchmark_serializers.Command):
+    help = 'Compare the orjson renderer/parser with DRF\'s JSONRenderer/JSONParser on list payloads (output and speed)'
+    success_message = 'orjson output matches JSONRenderer and JSONParser'
+
+    def cases(self):
+        return [
+            ('members', MemberListSerializer, Member.objects.order_by('-created_at', '-id')),
+            ('payments', PaymentListSerializer, Payment.objects.select_related('member').order_by('-payment_date', '-id')),
+        ]
+
+    def run_cases(self, page_sizes, repeat):
+        if orjson is None:
+            self.stdout.write(self.style.WARNING('orjson is not installed; ORJSONRenderer falls back to JSONRenderer'))
+
+        drf_renderer = JSONRenderer()
+        compat_renderer = ORJSONRenderer()
+        compat_renderer.compat = True
+        native_renderer = ORJSONRenderer()
+        native_renderer.compat = False
+        drf_parser = JSONParser()
+        fast_parser = ORJSONParser()
+
+        mismatches = 0
+        for label, serializer_class, queryset in self.cases():
+            for page_size in page_sizes:
+                page = queryset[:page_size] if page_size else queryset.all()
+                data = serializer_class(page, many=True).data
+                body = drf_renderer.render(data)
+
+                same = compat_renderer.render(data) == body
+                same = same and self.parse(fast_parser, body) == self.parse(drf_parser, body)
+                mismatches += not same
+
+                drf_time = self.best_time(lambda: drf_renderer.render(data), repeat)
+                compat_time = self.best_time(lambda: compat_renderer.render(data), repeat)
+                native_time = self.best_time(lambda: native_renderer.render(data), repeat)
+                drf_parse = self.best_time(lambda: self.parse(drf_parser, body), repeat)
+                fast_parse = self.best_time(lambda: self.parse(fast_parser, body), repeat)
+                status = 'ok' if same else self.style.ERROR('MISMATCH')
+                self.stdout.write(
+                    f'{label:<9} {len(data):>6} rows {len(body) // 1024:>6} KiB  '
+                    f'render json {drf_time * 1000:7.2f} ms  orjson {compat_time * 1000:7.2f} ms '
+                    f'x{drf_time / compat_time:4.1f} (native {native_time * 1000:7.2f} ms)  '
+                    f'parse json {drf_parse * 1000:7.2f} ms  orjson {fast_parse * 1000:7.2f} ms '
+                    f'x{drf_parse / fast_parse:4.1f}  {status}'
+                )
+        return mismatches
+
+    @staticmethod
+    def parse(parser, body):
+        return parser.parse(io.BytesIO(body))
+
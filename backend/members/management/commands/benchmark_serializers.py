@@ -0,0 +1,125 @@
+"""
+Django management command to check and time the values()-based list serialization
+Runs against a throwaway test database:
+    python manage.py benchmark_serializers --rows 5000
+"""
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from gym_management.fast_serializers import get_values_serializer
+from members.models import Member, Owner, Trainer, TrainerPayment
+from members.serializers import MemberListSerializer, TrainerListSerializer, TrainerPaymentSerializer
+from payments.models import Payment
+from payments.serializers import PaymentListSerializer
+
+
+class Command(BaseCommand):
+    help = 'Compare the fast list serialization with the DRF serializers (output and speed)'
+    success_message = 'Fast path output matches the serializers'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=2000, help='Rows per model to seed (default: 2000)')
+        parser.add_argument('--repeat', type=int, default=5, help='Timing runs per case; the best is reported (default: 5)')
+        parser.add_argument(
+            '--page-sizes',
+            type=str,
+            default='20,500,0',
+            help='Comma-separated page sizes to time, 0 meaning every row (default: 20,500,0)'
+        )
+
+    def handle(self, *args, **options):
+        page_sizes = [int(size) for size in options['page_sizes'].split(',') if size.strip()]
+        setup_test_environment()
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            self.seed(options['rows'])
+            mismatches = self.run_cases(page_sizes, options['repeat'])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        if mismatches:
+            raise CommandError(f'{mismatches} case(s) produced different output')
+        self.stdout.write(self.style.SUCCESS(self.success_message))
+
+    def seed(self, rows):
+        owner = Owner.objects.create_user(username='bench-owner', password='bench-pass-123')
+        today = timezone.now().date()
+        trainers = Trainer.objects.bulk_create([
+            Trainer(owner=owner, name=f'Trainer {i}', phone=f'97{i:08d}', specialization='Strength')
+            for i in range(rows)
+        ])
+        members = Member.objects.bulk_create([
+            Member(
+                owner=owner, name=f'Member {i}', phone=f'98{i:08d}', plan_type='PT' if i % 2 else 'GENERAL',
+                start_date=today - timedelta(days=30), end_date=today + timedelta(days=i % 60),
+                assigned_trainer='Trainer 1' if i % 3 == 0 else None, trainer=trainers[1] if i % 3 == 0 else None,
+            )
+            for i in range(rows)
+        ])
+        Payment.objects.bulk_create([
+            Payment(member=members[i], owner=owner, amount=Decimal('1499.50'), payment_mode='UPI',
+                    payment_date=today - timedelta(days=i % 90), notes='Monthly fee' if i % 2 else None)
+            for i in range(rows)
+        ])
+        TrainerPayment.objects.bulk_create([
+            TrainerPayment(trainer=trainers[i % 10], owner=owner, amount=Decimal('800'), payment_mode='Cash', payment_date=today)
+            for i in range(rows)
+        ])
+
+    def cases(self):
+        return [
+            ('members', MemberListSerializer, Member.objects.order_by('-created_at', '-id')),
+            ('payments', PaymentListSerializer, Payment.objects.select_related('member').order_by('-payment_date', '-id')),
+            ('trainers', TrainerListSerializer, Trainer.objects.order_by('-created_at', '-id')),
+            ('trainer payments', TrainerPaymentSerializer, TrainerPayment.objects.select_related('trainer').order_by('-id')),
+        ]
+
+    def run_cases(self, page_sizes, repeat):
+        renderer = JSONRenderer()
+        mismatches = 0
+        for label, serializer_class, queryset in self.cases():
+            fast = get_values_serializer(serializer_class)
+            if fast is None:
+                self.stdout.write(self.style.WARNING(f'{label}: {serializer_class.__name__} has no fast path'))
+                continue
+
+            for page_size in page_sizes:
+                page = queryset[:page_size] if page_size else queryset.all()
+
+                # Clone the queryset on every run so both sides include the database fetch
+                def drf():
+                    return renderer.render(serializer_class(page.all(), many=True).data)
+
+                def values():
+                    return renderer.render(fast.to_representation(fast.values(page.all())))
+
+                same = drf() == values()
+                mismatches += not same
+                drf_time = self.best_time(drf, repeat)
+                values_time = self.best_time(values, repeat)
+                rows = page.count()
+                status = 'ok' if same else self.style.ERROR('MISMATCH')
+                self.stdout.write(
+                    f'{label:<17} {rows:>6} rows  serializer {drf_time * 1000:8.1f} ms  '
+                    f'values {values_time * 1000:8.1f} ms  x{drf_time / values_time:4.1f}  {status}'
+                )
+        return mismatches
+
+    @staticmethod
+    def best_time(func, repeat):
+        best = None
+        for _ in range(max(repeat, 1)):
+            start = time.perf_counter()
+            func()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best
@@ -0,0 +1,212 @@
+"""
+Django management command to check every API endpoint against its query budget
+Runs against a throwaway test database seeded with more rows than one page:
+    python manage.py check_query_budgets
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.urls import resolve
+from django.utils import timezone
+
+from gym_management.authentication import clear_cached_users
+from gym_management.query_budget import format_report, get_query_budget, record_queries
+from members.models import Gym, Member, Owner, Trainer, TrainerPayment
+from members.search import search_members
+from members.views import CustomTokenObtainPairSerializer
+from payments.models import Payment
+from plans.models import Plan
+
+
+# Enough rows behind each deleted object that a per-row cascade breaks its budget
+CASCADE_ROWS = 20
+
+
+class Command(BaseCommand):
+    help = 'Run each API endpoint on seeded data and fail if it exceeds its declared query budget'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows',
+            type=int,
+            default=None,
+            help='Members, payments and trainer payments to seed (default: two and a half pages)'
+        )
+        parser.add_argument('--verbose-report', action='store_true', help='Print the query report for every endpoint')
+
+    def handle(self, *args, **options):
+        rows = options['rows'] or settings.REST_FRAMEWORK['PAGE_SIZE'] * 5 // 2
+        setup_test_environment()
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            failures = self.check_endpoints(rows, options['verbose_report'])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        if failures:
+            raise CommandError(f'{failures} endpoint(s) exceeded or did not declare a query budget')
+        self.stdout.write(self.style.SUCCESS('All endpoints are within their query budgets'))
+
+    def seed(self, rows):
+        owner = Owner.objects.create_user(username='budget-owner', password='budget-pass-123')
+        superuser = Owner.objects.create_superuser(username='budget-admin', password='budget-pass-123')
+        Plan.objects.create(plan_type='GENERAL', duration_days=30, price=Decimal('2000'))
+        Plan.objects.create(plan_type='PT', duration_days=30, price=Decimal('5000'))
+        Gym.objects.create(owner=owner, name='Budget Gym')
+        trainer = Trainer.objects.create(
+            owner=owner, name='Budget Trainer', salary_type='MIXED',
+            base_salary=Decimal('10000'), commission_percent=Decimal('10'),
+        )
+        today = timezone.now().date()
+        for i in range(rows):
+            member = Member.objects.create(
+                owner=owner, name=f'Budget Member {i}', phone=f'98{i:08d}',
+                plan_type='PT' if i % 2 else 'GENERAL', trainer=trainer if i % 2 else None,
+                start_date=today - timedelta(days=20), end_date=today + timedelta(days=i % 10),
+            )
+            Payment.objects.create(member=member, amount=Decimal('500'), payment_mode='UPI', payment_date=today)
+            TrainerPayment.objects.create(trainer=trainer, amount=Decimal('100'), payment_mode='Cash', payment_date=today)
+        # The search backend probe runs once per process; budgets describe later requests
+        search_members(Member.objects.all(), 'Budget').exists()
+        return owner, superuser, member, trainer
+
+    def seed_deletable(self, owner, tag):
+        """A member, payment and trainer for one run's DELETE requests, each with rows to cascade to"""
+        today = timezone.now().date()
+        trainer = Trainer.objects.create(owner=owner, name=f'Budget Leaving Trainer {tag}', salary_type='FIXED')
+        member = Member.objects.create(
+            owner=owner, name=f'Budget Leaving Member {tag}', phone='9000000099', plan_type='PT', trainer=trainer,
+            start_date=today - timedelta(days=20), end_date=today + timedelta(days=10),
+        )
+        for i in range(CASCADE_ROWS):
+            day = today - timedelta(days=i)
+            Payment.objects.create(member=member, amount=Decimal('100'), payment_mode='Cash', payment_date=day)
+            TrainerPayment.objects.create(trainer=trainer, amount=Decimal('100'), payment_mode='Cash', payment_date=day)
+        payment = Payment.objects.create(member=member, amount=Decimal('50'), payment_mode='UPI', payment_date=today)
+        return member, payment, trainer
+
+    def endpoints(self, member, trainer, deletable, owns_trainer=True):
+        deleted_member, deleted_payment, deleted_trainer = deletable
+        payment = Payment.objects.filter(member=member).first()
+        today = timezone.now().date()
+        import_file = SimpleUploadedFile(
+            'members.csv',
+            (
+                'name,phone,plan_type,start_date,end_date\n'
+                f'Budget Import,9000000088,GENERAL,{today.isoformat()},{(today + timedelta(days=30)).isoformat()}\n'
+            ).encode(),
+            content_type='text/csv',
+        )
+        endpoints = [
+            ('GET', '/api/dashboard/stats/', None),
+            ('GET', '/api/members/', None),
+            ('GET', '/api/members/?page=2', None),
+            ('GET', '/api/members/?pagination=cursor', None),
+            ('GET', f'/api/members/{member.pk}/', None),
+            ('GET', '/api/members/search/?q=Budget', None),
+            ('GET', '/api/members/duplicates/', None),
+            ('GET', '/api/members/dues/?owes=true', None),
+            ('GET', '/api/members/export/', None),
+            ('GET', '/api/members/trainers/', None),
+            ('GET', f'/api/members/trainers/{trainer.pk}/', None),
+            ('GET', '/api/members/trainers/payroll/', None),
+            ('GET', '/api/members/trainer-payments/', None),
+            ('GET', '/api/members/trainer-payments/?page=2', None),
+            ('GET', '/api/members/trainer-payments/export/', None),
+            ('GET', '/api/members/gyms/', None),
+            ('GET', '/api/plans/', None),
+            ('GET', '/api/payments/', None),
+            ('GET', '/api/payments/?page=2', None),
+            ('GET', '/api/payments/?pagination=cursor', None),
+            ('GET', '/api/payments/export/?file_format=ndjson', None),
+            ('GET', f'/api/payments/member_payments/?member_id={member.pk}', None),
+            ('GET', f'/api/payments/outstanding_dues/?member_id={member.pk}', None),
+            ('POST', '/api/payments/', {
+                'member': member.pk, 'amount': '250.00', 'payment_mode': 'Cash',
+                'payment_date': timezone.now().date().isoformat(),
+            }),
+            ('POST', '/api/members/', {
+                'name': 'Budget Walk-in', 'phone': '9123456789', 'plan_type': 'PT', 'trainer': trainer.pk,
+                'start_date': timezone.now().date().isoformat(),
+                'end_date': (timezone.now().date() + timedelta(days=30)).isoformat(),
+            }),
+            ('PATCH', f'/api/members/{member.pk}/', {'name': 'Budget Member renamed', 'assigned_trainer': trainer.name}),
+            ('PUT', f'/api/payments/{payment.pk}/', {
+                'member': member.pk, 'amount': '600.00', 'payment_mode': 'Online', 'payment_date': today.isoformat(),
+            }),
+            ('PATCH', f'/api/payments/{payment.pk}/', {'amount': '650.00'}),
+            ('POST', '/api/members/import/', {'file': import_file}),
+        ]
+        if owns_trainer:
+            # Trainer payments can only be recorded by the trainer's own owner
+            endpoints.append(('POST', '/api/members/trainer-payments/', {
+                'trainer': trainer.pk, 'amount': '100.00', 'payment_mode': 'UPI',
+                'payment_date': today.isoformat(),
+            }))
+        endpoints += [
+            ('DELETE', f'/api/payments/{deleted_payment.pk}/', None),
+            ('DELETE', f'/api/members/{deleted_member.pk}/', None),
+            ('DELETE', f'/api/members/trainers/{deleted_trainer.pk}/', None),
+        ]
+        return endpoints
+
+    def anonymous_endpoints(self, owner):
+        get_token = CustomTokenObtainPairSerializer.get_token
+        return [
+            ('POST', '/api/auth/register/', {
+                'username': 'budget-new', 'email': 'new@example.com', 'phone': '9000000001',
+                'password': 'budget-pass-123', 'password2': 'budget-pass-123',
+            }),
+            ('POST', '/api/auth/login/', {'username': 'budget-owner', 'password': 'budget-pass-123'}),
+            ('POST', '/api/auth/token/refresh/', {'refresh': str(get_token(owner))}),
+            ('POST', '/api/auth/logout/', {'refresh': str(get_token(owner))}),
+        ]
+
+    def check_endpoints(self, rows, verbose):
+        owner, superuser, member, trainer = self.seed(rows)
+        failures = 0
+        runs = [(None, Client(), self.anonymous_endpoints(owner))] + [
+            (user, Client(HTTP_AUTHORIZATION=f'Bearer {CustomTokenObtainPairSerializer.get_token(user).access_token}'),
+             self.endpoints(member, trainer, self.seed_deletable(owner, user.username), owns_trainer=user == owner))
+            for user in (owner, superuser)
+        ]
+        for user, client, endpoints in runs:
+            for method, path, data in endpoints:
+                label = f'{method} {path} ({user.username if user else "anonymous"})'
+                budget = get_query_budget(resolve(path.split('?')[0]).func, method)
+                request = getattr(client, method.lower())
+                # Budgets hold for a worker that has not cached the owner yet
+                clear_cached_users()
+                with record_queries() as recorder:
+                    if not data:
+                        response = request(path)
+                    elif any(isinstance(value, SimpleUploadedFile) for value in data.values()):
+                        response = request(path, data)
+                    else:
+                        response = request(path, data, content_type='application/json')
+                    if response.streaming:
+                        # Exports run their queries while the body streams
+                        b''.join(response.streaming_content)
+
+                if response.status_code >= 400:
+                    failures += 1
+                    self.stdout.write(self.style.ERROR(f'FAIL  {label}: HTTP {response.status_code}'))
+                elif budget is None:
+                    failures += 1
+                    self.stdout.write(self.style.ERROR(f'FAIL  {label}: no query budget declared ({len(recorder)} queries)'))
+                elif len(recorder) > budget:
+                    failures += 1
+                    self.stdout.write(self.style.ERROR(f'OVER  {format_report(label, recorder, budget)}'))
+                else:
+                    self.stdout.write(f'ok    {label}: {len(recorder)}/{budget}')
+                    if verbose:
+                        self.stdout.write(format_report(label, recorder, budget))
+        return failures
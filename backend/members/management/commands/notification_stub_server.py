@@ -0,0 +1,135 @@
+"""
+Django management command to run a local stand-in for a bulk SMS/WhatsApp gateway
+Point BatchHTTPBackend at it for tests and benchmarks:
+    python manage.py notification_stub_server --port 8025 --latency 300
+    NOTIFICATION_BACKEND=members.notifications.BatchHTTPBackend NOTIFICATION_HTTP_URL=http://127.0.0.1:8025/send
+
+Tests run the same gateway in a thread with ``StubGateway(('127.0.0.1', 0))``
+and inspect the batches it received.
+"""
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.core.management.base import BaseCommand
+
+
+class StubGatewayHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        gateway = self.server
+        length = int(self.headers.get('Content-Length') or 0)
+        try:
+            payload = json.loads(self.rfile.read(length) or b'{}')
+            template, recipients = payload['template'], payload['recipients']
+            # Render like a provider would, once per recipient from the batch's single template
+            messages = [template.format_map(recipient['params']) for recipient in recipients]
+        except (ValueError, KeyError, TypeError):
+            self.send_error(400, 'Expected {"template": ..., "recipients": [{"to": ..., "params": {...}}]}')
+            return
+
+        if gateway.latency:
+            time.sleep(gateway.latency)
+        with gateway.lock:
+            gateway.requests += 1
+            number = gateway.requests
+            gateway.recipients += len(recipients)
+            if gateway.record:
+                gateway.batches.append({'payload': payload, 'messages': messages})
+            total = gateway.recipients
+        if number <= gateway.fail_requests:
+            self.send_error(503, 'Stub gateway failing this request')
+            return
+
+        results = [
+            {'to': recipient.get('to'), 'status': 'failed' if random.random() < gateway.fail_rate else 'sent'}
+            for recipient in recipients
+        ]
+        if gateway.on_batch is not None:
+            gateway.on_batch(number, len(recipients), total)
+
+        body = json.dumps({'results': results}).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubGateway(ThreadingHTTPServer):
+    """
+    Bulk-send gateway stub. With ``record``, ``batches`` keeps every request
+    received (decoded ``payload`` and rendered ``messages``); the first
+    ``fail_requests`` requests are answered with 503 and each recipient
+    fails with probability ``fail_rate``.
+    """
+    daemon_threads = True
+
+    def __init__(self, address, latency=0, fail_rate=0, fail_requests=0, on_batch=None, record=True):
+        super().__init__(address, StubGatewayHandler)
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self.fail_requests = fail_requests
+        self.on_batch = on_batch
+        self.record = record
+        self.batches = []
+        self.requests = 0
+        self.recipients = 0
+        self.lock = threading.Lock()
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}/send'
+
+
+class Command(BaseCommand):
+    help = 'Run a local notification gateway stub that accepts batched sends'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', type=str, default='127.0.0.1', help='Bind address (default: 127.0.0.1)')
+        parser.add_argument('--port', type=int, default=8025, help='Port (default: 8025)')
+        parser.add_argument(
+            '--latency',
+            type=float,
+            default=0,
+            help='Milliseconds to wait before answering each request, like a real provider'
+        )
+        parser.add_argument(
+            '--fail-rate',
+            type=float,
+            default=0,
+            help='Fraction of recipients (0-1) reported as failed'
+        )
+        parser.add_argument(
+            '--fail-requests',
+            type=int,
+            default=0,
+            help='Answer the first N requests with 503, to exercise retries'
+        )
+        parser.add_argument('--quiet', action='store_true', help='Do not log each request')
+
+    def handle(self, *args, **options):
+        def log_batch(number, recipients, total):
+            self.stdout.write(f'Request {number}: {recipients} recipients ({total} total)')
+
+        server = StubGateway(
+            (options['host'], options['port']),
+            latency=options['latency'] / 1000,
+            fail_rate=options['fail_rate'],
+            fail_requests=options['fail_requests'],
+            on_batch=None if options['quiet'] else log_batch,
+            record=False,
+        )
+        self.stdout.write(self.style.SUCCESS(f'Notification stub listening on {server.url}'))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            self.stdout.write(f'Handled {server.requests} requests for {server.recipients} recipients')
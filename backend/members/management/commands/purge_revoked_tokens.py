@@ -0,0 +1,22 @@
+"""
+Django management command to delete revoked refresh tokens that have expired
+Schedule it daily, e.g.: python manage.py purge_revoked_tokens
+"""
+from django.core.management.base import BaseCommand
+from members.tokens import purge_expired_revoked_tokens, PURGE_BATCH_SIZE
+
+
+class Command(BaseCommand):
+    help = 'Delete expired rows from the refresh-token blacklist table'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=PURGE_BATCH_SIZE,
+            help=f'Rows deleted per query (default: {PURGE_BATCH_SIZE})'
+        )
+
+    def handle(self, *args, **options):
+        deleted = purge_expired_revoked_tokens(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} expired revoked tokens'))
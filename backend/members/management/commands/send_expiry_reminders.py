@@ -10,9 +10,20 @@ from members.services import check_and_update_member_status
 class Command(BaseCommand):
     help = 'Send expiry reminders to members expiring in 7 days'
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--status-batch-size',
+            type=int,
+            default=None,
+            help='Members expired per transaction (default: MEMBER_STATUS_BATCH_SIZE setting)'
+        )
+
     def handle(self, *args, **options):
         self.stdout.write('Checking member statuses...')
-        check_and_update_member_status()
+        status_results = check_and_update_member_status(batch_size=options['status_batch_size'])
+        for owner_id, count in sorted(status_results['per_owner'].items()):
+            self.stdout.write(f"  Owner {owner_id}: {count} members expired")
+        self.stdout.write(f"Expired {status_results['expired']} members")
         
         self.stdout.write('Sending expiry reminders...')
         results = send_daily_expiry_reminders()
@@ -20,7 +31,8 @@ class Command(BaseCommand):
         self.stdout.write(
             self.style.SUCCESS(
                 f"Reminders sent: {results['successful']} successful, "
-                f"{results['failed']} failed out of {results['total_members']} members"
+                f"{results['failed']} failed, {results['skipped']} already sent "
+                f"out of {results['total_members']} members"
             )
         )
 
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-18 10:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('members', '0003_gym'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='member',
+            index=models.Index(fields=['owner', '-created_at', '-id'], name='member_owner_created_idx'),
+        ),
+    ]
@@ -0,0 +1,65 @@
+from django.db import migrations
+
+
+SQLITE_FORWARD = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS members_member_fts USING fts5("
+    "name, phone, content='members_member', content_rowid='id', tokenize='trigram')",
+    "CREATE TRIGGER IF NOT EXISTS members_member_fts_ai AFTER INSERT ON members_member BEGIN "
+    "INSERT INTO members_member_fts(rowid, name, phone) VALUES (new.id, new.name, new.phone); END",
+    "CREATE TRIGGER IF NOT EXISTS members_member_fts_ad AFTER DELETE ON members_member BEGIN "
+    "INSERT INTO members_member_fts(members_member_fts, rowid, name, phone) "
+    "VALUES ('delete', old.id, old.name, old.phone); END",
+    "CREATE TRIGGER IF NOT EXISTS members_member_fts_au AFTER UPDATE OF name, phone ON members_member BEGIN "
+    "INSERT INTO members_member_fts(members_member_fts, rowid, name, phone) "
+    "VALUES ('delete', old.id, old.name, old.phone); "
+    "INSERT INTO members_member_fts(rowid, name, phone) VALUES (new.id, new.name, new.phone); END",
+    "INSERT INTO members_member_fts(members_member_fts) VALUES ('rebuild')",
+]
+
+SQLITE_REVERSE = [
+    "DROP TRIGGER IF EXISTS members_member_fts_au",
+    "DROP TRIGGER IF EXISTS members_member_fts_ad",
+    "DROP TRIGGER IF EXISTS members_member_fts_ai",
+    "DROP TABLE IF EXISTS members_member_fts",
+]
+
+POSTGRESQL_FORWARD = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    # name for the trigram similarity operator, UPPER(name) for Django's icontains
+    "CREATE INDEX IF NOT EXISTS member_name_trgm_idx ON members_member USING gin (name gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS member_name_upper_trgm_idx ON members_member USING gin (UPPER(name) gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS member_phone_trgm_idx ON members_member USING gin (phone gin_trgm_ops)",
+]
+
+POSTGRESQL_REVERSE = [
+    "DROP INDEX IF EXISTS member_phone_trgm_idx",
+    "DROP INDEX IF EXISTS member_name_upper_trgm_idx",
+    "DROP INDEX IF EXISTS member_name_trgm_idx",
+]
+
+
+def _run(statements_by_vendor):
+    def run(apps, schema_editor):
+        vendor = schema_editor.connection.vendor
+        if vendor == 'sqlite':
+            # FTS5 with the trigram tokenizer needs SQLite 3.34+; without it
+            # members.search falls back to icontains.
+            if schema_editor.connection.Database.sqlite_version_info < (3, 34, 0):
+                return
+        for statement in statements_by_vendor.get(vendor, []):
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('members', '0004_member_owner_created_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            _run({'sqlite': SQLITE_FORWARD, 'postgresql': POSTGRESQL_FORWARD}),
+            _run({'sqlite': SQLITE_REVERSE, 'postgresql': POSTGRESQL_REVERSE}),
+        ),
+    ]
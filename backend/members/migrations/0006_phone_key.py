@@ -0,0 +1,61 @@
+# Generated by Django 4.2.7 on 2026-10-18 10:06
+
+from django.db import migrations, models
+
+from members.phone import normalize_phone
+
+
+BATCH_SIZE = 1000
+
+
+def backfill_phone_keys(apps, schema_editor):
+    for model_name in ('Owner', 'Trainer', 'Member'):
+        model = apps.get_model('members', model_name)
+        last_pk = 0
+        while True:
+            batch = list(
+                model.objects.filter(pk__gt=last_pk, phone__isnull=False)
+                .order_by('pk').only('pk', 'phone')[:BATCH_SIZE]
+            )
+            if not batch:
+                break
+            for obj in batch:
+                obj.phone_key = normalize_phone(obj.phone)
+            model.objects.bulk_update(batch, ['phone_key'])
+            last_pk = batch[-1].pk
+
+
+class Migration(migrations.Migration):
+    # Commit each backfill batch on its own instead of locking every row until the end
+    atomic = False
+
+    dependencies = [
+        ('members', '0005_member_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='member',
+            name='phone_key',
+            field=models.CharField(blank=True, editable=False, max_length=20, null=True),
+        ),
+        migrations.AddField(
+            model_name='owner',
+            name='phone_key',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=20, null=True),
+        ),
+        migrations.AddField(
+            model_name='trainer',
+            name='phone_key',
+            field=models.CharField(blank=True, editable=False, max_length=20, null=True),
+        ),
+        migrations.RunPython(backfill_phone_keys, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='member',
+            index=models.Index(fields=['owner', 'phone_key'], name='member_owner_phone_key_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='trainer',
+            index=models.Index(fields=['owner', 'phone_key'], name='trainer_owner_phone_key_idx'),
+        ),
+    ]
@@ -0,0 +1,74 @@
+# Generated by Django 4.2.7 on 2026-10-18 10:15
+
+from importlib import import_module
+
+from django.db import migrations, models
+from django.db.models import Count, Max, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+BATCH_SIZE = 1000
+
+# SQLite adds these columns by rebuilding members_member, which silently drops
+# the FTS triggers created in 0005; create them again and reindex.
+# Any later migration that rebuilds the table on SQLite needs the same step.
+search_index = import_module('members.migrations.0005_member_search_index')
+
+
+def backfill_payment_totals(apps, schema_editor):
+    Member = apps.get_model('members', 'Member')
+    Payment = apps.get_model('payments', 'Payment')
+    payments = Payment.objects.filter(member=OuterRef('pk')).order_by().values('member')
+    last_pk = 0
+    while True:
+        ids = list(Member.objects.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:BATCH_SIZE])
+        if not ids:
+            break
+        Member.objects.filter(pk__in=ids).update(
+            total_paid=Coalesce(
+                Subquery(payments.annotate(total=Sum('amount')).values('total')), Value(0),
+                output_field=models.DecimalField(max_digits=12, decimal_places=2),
+            ),
+            payment_count=Coalesce(Subquery(payments.annotate(count=Count('id')).values('count')), Value(0)),
+            last_payment_date=Subquery(payments.annotate(last=Max('payment_date')).values('last')),
+        )
+        last_pk = ids[-1]
+
+
+def restore_sqlite_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    if schema_editor.connection.Database.sqlite_version_info < (3, 34, 0):
+        return
+    for statement in search_index.SQLITE_FORWARD:
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+    # Commit each backfill batch on its own instead of locking every row until the end
+    atomic = False
+
+    dependencies = [
+        ('members', '0008_reminderlog'),
+        ('payments', '0002_dailyrevenuerollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='member',
+            name='last_payment_date',
+            field=models.DateField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='member',
+            name='payment_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='member',
+            name='total_paid',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=12),
+        ),
+        migrations.RunPython(backfill_payment_totals, migrations.RunPython.noop),
+        migrations.RunPython(restore_sqlite_triggers, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 4.2.7 on 2026-10-18 10:18
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+BATCH_SIZE = 1000
+
+
+def _name_key(name):
+    key = ' '.join((name or '').split()).casefold()
+    return key or None
+
+
+def link_members_to_trainers(apps, schema_editor):
+    """Set Member.trainer where assigned_trainer names exactly one of the owner's trainers"""
+    Member = apps.get_model('members', 'Member')
+    Trainer = apps.get_model('members', 'Trainer')
+
+    owner_ids = Trainer.objects.order_by().values_list('owner_id', flat=True).distinct()
+    for owner_id in owner_ids:
+        matches = {}
+        for trainer_id, name in Trainer.objects.filter(owner_id=owner_id).values_list('id', 'name'):
+            key = _name_key(name)
+            matches[key] = None if key in matches else trainer_id
+
+        last_pk = 0
+        while True:
+            batch = list(
+                Member.objects.filter(
+                    owner_id=owner_id, pk__gt=last_pk, trainer__isnull=True, assigned_trainer__isnull=False
+                ).order_by('pk').only('pk', 'assigned_trainer')[:BATCH_SIZE]
+            )
+            if not batch:
+                break
+            linked = []
+            for member in batch:
+                trainer_id = matches.get(_name_key(member.assigned_trainer))
+                if trainer_id:
+                    member.trainer_id = trainer_id
+                    linked.append(member)
+            Member.objects.bulk_update(linked, ['trainer'])
+            last_pk = batch[-1].pk
+
+
+class Migration(migrations.Migration):
+    # Commit each backfill batch on its own instead of locking every row until the end
+    atomic = False
+
+    dependencies = [
+        ('members', '0009_member_payment_totals'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='member',
+            name='trainer',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='members', to='members.trainer'),
+        ),
+        migrations.RunPython(link_members_to_trainers, migrations.RunPython.noop),
+    ]
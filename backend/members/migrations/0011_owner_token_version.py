@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 10:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('members', '0010_member_trainer'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='owner',
+            name='token_version',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
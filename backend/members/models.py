@@ -1,7 +1,28 @@
-from django.db import models
+from contextlib import nullcontext
+
+from django.db import DatabaseError, connections, models, router, transaction
 from django.contrib.auth.models import AbstractUser
 from django.core.validators import RegexValidator
 
+from .phone import set_phone_key
+
+
+def set_owner_from(instance, relation, update_fields=None):
+    """
+    Copy the owner of ``instance.<relation>`` to ``instance.owner`` before a save.
+    Returns ``update_fields`` with ``owner`` added when the relation is saved too.
+    """
+    field = instance._meta.get_field(relation)
+    if field.is_cached(instance):
+        instance.owner_id = getattr(instance, relation).owner_id
+    elif instance.owner_id is None or (update_fields is not None and relation in update_fields):
+        instance.owner_id = field.related_model.objects.filter(
+            pk=getattr(instance, field.attname)
+        ).values_list('owner_id', flat=True).first()
+    if update_fields is not None and relation in update_fields:
+        return set(update_fields) | {'owner'}
+    return update_fields
+
 
 class Owner(AbstractUser):
     """Gym owner/admin user model"""
@@ -12,11 +33,46 @@ class Owner(AbstractUser):
         null=True,
         blank=True
     )
+    # E.164 form of phone, maintained on save
+    phone_key = models.CharField(max_length=20, blank=True, null=True, editable=False, db_index=True)
+    # Carried in every JWT ("tv" claim); incremented to revoke the owner's issued tokens
+    token_version = models.PositiveIntegerField(default=0, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    # Changing any of these on a saved owner increments token_version
+    TOKEN_REVOKING_FIELDS = ('password', 'is_active', 'is_staff', 'is_superuser')
+
     def __str__(self):
         return self.username
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._token_state = instance._get_token_state()
+        return instance
+
+    def _get_token_state(self):
+        # Loaded fields only; reading a deferred field would query
+        return {name: self.__dict__[name] for name in self.TOKEN_REVOKING_FIELDS if name in self.__dict__}
+
+    def save(self, *args, **kwargs):
+        update_fields = set_phone_key(self, kwargs.get('update_fields'))
+        loaded = getattr(self, '_token_state', {})
+        if any(
+            self.__dict__.get(name) != value
+            for name, value in loaded.items()
+            if update_fields is None or name in update_fields
+        ):
+            self.token_version += 1
+            if update_fields is not None:
+                update_fields = set(update_fields) | {'token_version'}
+        kwargs['update_fields'] = update_fields
+        super().save(*args, **kwargs)
+        self._token_state = {**loaded, **{
+            name: value for name, value in self._get_token_state().items()
+            if update_fields is None or name in update_fields
+        }}
+
 
 class Trainer(models.Model):
     """Trainer working in the gym of an owner"""
@@ -28,6 +84,7 @@ class Trainer(models.Model):
         blank=True,
         null=True,
     )
+    phone_key = models.CharField(max_length=20, blank=True, null=True, editable=False)
     specialization = models.CharField(max_length=255, blank=True, null=True)
     salary_type = models.CharField(
         max_length=20,
@@ -41,10 +98,17 @@ class Trainer(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['owner', 'phone_key'], name='trainer_owner_phone_key_idx'),
+        ]
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        kwargs['update_fields'] = set_phone_key(self, kwargs.get('update_fields'))
+        super().save(*args, **kwargs)
+
 
 class Member(models.Model):
     """Gym member model"""
@@ -66,14 +130,25 @@ class Member(models.Model):
         max_length=15,
         validators=[RegexValidator(regex=r'^\+?1?\d{9,15}$', message="Phone number must be entered in the format: '+999999999'. Up to 15 digits allowed.")]
     )
+    phone_key = models.CharField(max_length=20, blank=True, null=True, editable=False)
     plan_type = models.CharField(max_length=10, choices=PLAN_TYPE_CHOICES)
     start_date = models.DateField()
     end_date = models.DateField()
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='ACTIVE')
     # Keep as simple free-text for existing data; optionally link to Trainer by name
     assigned_trainer = models.CharField(max_length=255, blank=True, null=True)
+    trainer = models.ForeignKey(
+        Trainer, on_delete=models.SET_NULL, blank=True, null=True, related_name='members'
+    )
+    # Denormalized from payments.Payment by payment signals (F() updates);
+    # `python manage.py reconcile_member_payments` repairs any drift
+    total_paid = models.DecimalField(max_digits=12, decimal_places=2, default=0, editable=False)
+    payment_count = models.PositiveIntegerField(default=0, editable=False)
+    last_payment_date = models.DateField(blank=True, null=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+
+    PAYMENT_TOTAL_FIELDS = ('total_paid', 'payment_count', 'last_payment_date')
     
     class Meta:
         ordering = ['-created_at']
@@ -81,11 +156,50 @@ class Member(models.Model):
             models.Index(fields=['owner', 'status']),
             models.Index(fields=['owner', 'plan_type']),
             models.Index(fields=['end_date']),
+            models.Index(fields=['owner', '-created_at', '-id'], name='member_owner_created_idx'),
+            models.Index(fields=['owner', 'phone_key'], name='member_owner_phone_key_idx'),
+            # Only ACTIVE members can expire, so the status job scans just these rows
+            models.Index(fields=['end_date'], condition=models.Q(status='ACTIVE'), name='member_active_end_date_idx'),
         ]
     
     def __str__(self):
         return f"{self.name} ({self.plan_type})"
 
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        full_update = (
+            not args and update_fields is None and not self._state.adding
+            and not kwargs.get('force_insert') and not kwargs.get('force_update')
+        )
+        if full_update:
+            # Never write back payment totals loaded earlier; payment signals
+            # may have moved them since this instance was read
+            deferred = self.get_deferred_fields()
+            update_fields = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.PAYMENT_TOTAL_FIELDS
+                and field.attname not in deferred
+            ]
+        kwargs['update_fields'] = set_phone_key(self, update_fields)
+        if not full_update:
+            super().save(*args, **kwargs)
+            return
+
+        using = kwargs.get('using') or router.db_for_write(type(self), instance=self)
+        try:
+            # Inside a transaction, a savepoint keeps the failed update from
+            # marking the whole transaction for rollback
+            with transaction.atomic(using=using) if connections[using].in_atomic_block else nullcontext():
+                super().save(*args, **kwargs)
+        except DatabaseError as exc:
+            # Django's "did not affect any rows" (driver errors carry a __cause__):
+            # the row was deleted, so insert it again as a plain save would
+            if exc.__cause__ is not None:
+                raise
+            kwargs['update_fields'] = None
+            super().save(force_insert=True, **kwargs)
+
 
 class TrainerPayment(models.Model):
     """Payments made to trainers"""
@@ -97,6 +211,8 @@ class TrainerPayment(models.Model):
     ]
 
     trainer = models.ForeignKey(Trainer, on_delete=models.CASCADE, related_name='payments')
+    # Copy of trainer.owner kept on save, so owner-scoped queries need no join
+    owner = models.ForeignKey(Owner, on_delete=models.CASCADE, related_name='trainer_payments', editable=False)
     amount = models.DecimalField(max_digits=10, decimal_places=2)
     payment_mode = models.CharField(max_length=10, choices=PAYMENT_MODE_CHOICES)
     payment_date = models.DateField()
@@ -105,10 +221,18 @@ class TrainerPayment(models.Model):
 
     class Meta:
         ordering = ['-payment_date', '-created_at']
+        indexes = [
+            # Owner-scoped lists in the default ordering
+            models.Index(fields=['owner', '-payment_date', '-created_at'], name='trainerpayment_owner_date_idx'),
+        ]
 
     def __str__(self):
         return f"{self.trainer.name} - {self.amount} on {self.payment_date}"
 
+    def save(self, *args, **kwargs):
+        kwargs['update_fields'] = set_owner_from(self, 'trainer', kwargs.get('update_fields'))
+        super().save(*args, **kwargs)
+
 
 class Gym(models.Model):
     """Gym profile / settings for each owner"""
@@ -137,3 +261,60 @@ class Gym(models.Model):
     def __str__(self):
         return self.name
 
+
+
+class JobCheckpoint(models.Model):
+    """Progress watermark for resumable batch jobs"""
+    name = models.CharField(max_length=100, unique=True)
+    run_date = models.DateField()
+    last_id = models.BigIntegerField(default=0)
+    completed = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} @ {self.run_date} (last id {self.last_id})"
+
+
+class ReminderLog(models.Model):
+    """One expiry reminder per member and membership end date"""
+
+    STATUS_CHOICES = [
+        ('PENDING', 'Pending'),
+        ('SENDING', 'Sending'),
+        ('SENT', 'Sent'),
+        ('FAILED', 'Failed'),
+    ]
+
+    member = models.ForeignKey(Member, on_delete=models.CASCADE, related_name='reminder_logs')
+    end_date = models.DateField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='PENDING')
+    claim_token = models.CharField(max_length=32, blank=True, null=True)
+    # When a run last claimed the log; SENDING claims older than REMINDER_CLAIM_TIMEOUT are taken over
+    claimed_at = models.DateTimeField(blank=True, null=True)
+    attempts = models.IntegerField(default=0)
+    last_error = models.TextField(blank=True, null=True)
+    sent_at = models.DateTimeField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        constraints = [
+            models.UniqueConstraint(fields=['member', 'end_date'], name='unique_member_reminder'),
+        ]
+        indexes = [
+            models.Index(fields=['claim_token']),
+        ]
+
+    def __str__(self):
+        return f"Reminder for {self.member_id} ({self.end_date}): {self.status}"
+
+
+class RevokedToken(models.Model):
+    """Refresh token that may no longer be used (members.tokens); durable copy of the cached blacklist"""
+    jti = models.CharField(max_length=255, unique=True)
+    expires_at = models.DateTimeField(db_index=True)
+    # Workers read the rows created since their last load (members.tokens)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"Revoked token {self.jti} (expires {self.expires_at})"
@@ -0,0 +1,113 @@
+"""
+Notification backends for member messages (SMS / WhatsApp).
+
+The backend is chosen with the NOTIFICATION_BACKEND setting, the same way
+Django picks an EMAIL_BACKEND. Every backend sends a *batch*: one message
+template plus a list of recipients, each with its own template context, so
+providers with bulk APIs get one request per batch instead of one per member.
+"""
+import json
+import sys
+import urllib.error
+import urllib.request
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+class NotificationError(Exception):
+    """The provider could not be reached or rejected the whole batch"""
+
+
+class BaseNotificationBackend:
+    """
+    Subclasses implement ``send_batch(template, recipients)``.
+
+    ``template`` is a ``str.format`` template and ``recipients`` a list of
+    ``{'phone': ..., 'context': {...}}`` dicts, at most ``batch_size`` long.
+    It returns one bool per recipient and raises NotificationError when the
+    batch as a whole failed and may be retried.
+    """
+    name = 'base'
+
+    def __init__(self, batch_size=None, **kwargs):
+        self.batch_size = batch_size or settings.NOTIFICATION_BATCH_SIZE
+
+    def send_batch(self, template, recipients):
+        raise NotImplementedError('subclasses of BaseNotificationBackend must override send_batch()')
+
+
+class ConsoleBackend(BaseNotificationBackend):
+    """Writes each rendered message to a stream (stdout by default); for development"""
+    name = 'console'
+
+    def __init__(self, stream=None, **kwargs):
+        super().__init__(**kwargs)
+        self.stream = stream or sys.stdout
+
+    def send_batch(self, template, recipients):
+        for recipient in recipients:
+            self.stream.write(f"[CONSOLE] Message to {recipient['phone']}:\n")
+            self.stream.write(template.format_map(recipient['context']) + '\n')
+            self.stream.write('-' * 50 + '\n')
+        self.stream.flush()
+        return [True] * len(recipients)
+
+
+class BatchHTTPBackend(BaseNotificationBackend):
+    """
+    Posts up to ``batch_size`` recipients per request to a bulk-send gateway.
+
+    Request body: ``{"template": ..., "recipients": [{"to": ..., "params": {...}}]}``.
+    The template is sent once per batch and rendered by the gateway. The
+    response is expected to carry ``{"results": [{"status": "sent" | ...}]}``
+    in recipient order; a 2xx response without results counts as all sent.
+    """
+    name = 'http'
+
+    def __init__(self, url=None, token=None, timeout=None, **kwargs):
+        super().__init__(**kwargs)
+        self.url = url or settings.NOTIFICATION_HTTP_URL
+        self.token = token or settings.NOTIFICATION_HTTP_TOKEN
+        self.timeout = timeout or settings.NOTIFICATION_HTTP_TIMEOUT
+
+    def send_batch(self, template, recipients):
+        if not self.url:
+            raise NotificationError('NOTIFICATION_HTTP_URL is not configured')
+        body = json.dumps({
+            'template': template,
+            'recipients': [
+                {'to': recipient['phone'], 'params': recipient['context']}
+                for recipient in recipients
+            ],
+        }, default=str).encode('utf-8')
+        headers = {'Content-Type': 'application/json'}
+        if self.token:
+            headers['Authorization'] = f'Bearer {self.token}'
+        request = urllib.request.Request(self.url, data=body, headers=headers, method='POST')
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                payload = response.read()
+        except (urllib.error.URLError, OSError) as exc:
+            raise NotificationError(f'Notification gateway request failed: {exc}')
+
+        try:
+            results = json.loads(payload or b'{}').get('results')
+        except ValueError:
+            raise NotificationError('Notification gateway returned invalid JSON')
+        if results is None:
+            return [True] * len(recipients)
+        if len(results) != len(recipients):
+            raise NotificationError('Notification gateway returned a result count that does not match the batch')
+        return [result.get('status') == 'sent' for result in results]
+
+
+_backends = {}
+
+
+def get_notification_backend():
+    """Return the configured backend instance (one per process)"""
+    path = settings.NOTIFICATION_BACKEND
+    if path not in _backends:
+        _backends[path] = import_string(path)()
+    return _backends[path]
@@ -0,0 +1,43 @@
+"""
+Phone number normalization.
+
+Phones are stored as typed; ``phone_key`` holds the E.164 form so the same
+number entered as ``98765 43210``, ``+91-98765-43210`` or ``098765 43210``
+compares equal and can be looked up through an index.
+"""
+import re
+
+from django.conf import settings
+
+
+NATIONAL_NUMBER_LENGTH = 10
+MIN_DIGITS = 9
+
+
+def normalize_phone(value, default_country_code=None):
+    """Return ``value`` in E.164 form (``+919876543210``), or None if it is not a phone number"""
+    if not value:
+        return None
+    digits = re.sub(r'\D', '', value)
+    if len(digits) < MIN_DIGITS:
+        return None
+
+    if value.strip().startswith('+'):
+        return f'+{digits}'
+    if digits.startswith('00'):
+        return f'+{digits[2:]}'
+
+    # Drop the national trunk prefix; a bare national number gets the default country code
+    national = digits.lstrip('0')
+    if len(national) <= NATIONAL_NUMBER_LENGTH:
+        country_code = default_country_code or settings.PHONE_DEFAULT_COUNTRY_CODE
+        return f'+{country_code}{national}'
+    return f'+{national}'
+
+
+def set_phone_key(instance, update_fields=None):
+    """Refresh ``instance.phone_key`` from ``instance.phone`` before a save"""
+    instance.phone_key = normalize_phone(instance.phone)
+    if update_fields is not None and 'phone' in update_fields:
+        return set(update_fields) | {'phone_key'}
+    return update_fields
@@ -1,32 +1,183 @@
 """
 Reminder service for member expiry notifications
 """
+import logging
+import random
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F, Q
 from django.utils import timezone
+
+from .models import ReminderLog
+from .notifications import get_notification_backend
 from .services import get_members_expiring_soon
 
 
+logger = logging.getLogger(__name__)
+
+
+EXPIRY_REMINDER_TEMPLATE = """
+Hi {name},
+
+Your {plan} membership at the gym is expiring on {end_date}.
+Please renew your membership to continue enjoying our services.
+
+Thank you!
+"""
+
+
+def reminder_recipient(member):
+    """Recipient entry for the notification backend"""
+    return {
+        'phone': member.phone,
+        'context': {
+            'name': member.name,
+            'plan': member.get_plan_type_display(),
+            'end_date': member.end_date.isoformat(),
+        },
+    }
+
+
 def send_expiry_reminder(member):
     """
-    Mock function to send expiry reminder via WhatsApp/SMS
-    In production, integrate with Twilio, WhatsApp Business API, etc.
+    Send one expiry reminder via the configured notification backend
+    (console by default; see members.notifications)
     """
-    message = f"""
-    Hi {member.name},
-    
-    Your {member.get_plan_type_display()} membership at the gym is expiring on {member.end_date}.
-    Please renew your membership to continue enjoying our services.
-    
-    Thank you!
+    backend = get_notification_backend()
+    return backend.send_batch(EXPIRY_REMINDER_TEMPLATE, [reminder_recipient(member)])[0]
+
+
+class RateLimiter:
+    """Thread-safe token bucket allowing ``rate`` calls per second (0 disables limiting)"""
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.capacity = float(burst or max(rate, 1))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        if self.rate <= 0:
+            return
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+_rate_limiters = {}
+_rate_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(provider):
+    """Shared limiter for ``provider``, configured by REMINDER_RATE_LIMITS (calls per second)"""
+    with _rate_limiters_lock:
+        if provider not in _rate_limiters:
+            rate = settings.REMINDER_RATE_LIMITS.get(provider, settings.REMINDER_RATE_LIMITS.get('default', 0))
+            _rate_limiters[provider] = RateLimiter(rate)
+        return _rate_limiters[provider]
+
+
+def _send_with_retries(backend, recipients, limiter):
+    """
+    Send one batch with exponential backoff on batch-level failures.
+    Returns (per-recipient results, attempts, error).
+    """
+    max_attempts = settings.REMINDER_MAX_RETRIES + 1
+    error = None
+    for attempt in range(1, max_attempts + 1):
+        limiter.acquire()
+        try:
+            results = backend.send_batch(EXPIRY_REMINDER_TEMPLATE, recipients)
+            return results, attempt, None if all(results) else 'Provider rejected the message'
+        except Exception as exc:
+            error = str(exc) or exc.__class__.__name__
+        if attempt < max_attempts:
+            backoff = settings.REMINDER_RETRY_BACKOFF * (2 ** (attempt - 1))
+            time.sleep(backoff + random.uniform(0, backoff / 2))
+    return [False] * len(recipients), max_attempts, error
+
+
+def claim_due_reminders(members):
+    """
+    Create a ReminderLog for every (member, end_date) in the ``members``
+    queryset not seen before and claim the ones still owed a message.
+
+    The claim is a single conditional UPDATE, so concurrent runs never pick
+    up the same log and a reminder that was sent is never sent again.
+    Logs left SENDING by a run that died are claimed again once their claim
+    is older than REMINDER_CLAIM_TIMEOUT; if that run had already reached the
+    provider, the member gets the reminder twice rather than never.
+    """
+    ReminderLog.objects.bulk_create(
+        [
+            ReminderLog(member_id=member_id, end_date=end_date)
+            for member_id, end_date in members.values_list('id', 'end_date').iterator()
+        ],
+        batch_size=settings.REMINDER_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+    token = uuid.uuid4().hex
+    now = timezone.now()
+    abandoned = Q(status='SENDING') & (
+        Q(claimed_at__isnull=True) | Q(claimed_at__lt=now - timedelta(seconds=settings.REMINDER_CLAIM_TIMEOUT))
+    )
+    ReminderLog.objects.filter(
+        Q(status__in=['PENDING', 'FAILED']) | abandoned,
+        member__in=members.values('id'),
+        end_date=F('member__end_date'),
+        attempts__lt=settings.REMINDER_MAX_RETRIES + 1,
+    ).update(status='SENDING', claim_token=token, claimed_at=now)
+    return list(ReminderLog.objects.filter(claim_token=token).select_related('member'))
+
+
+def dispatch_reminders(logs, backend=None):
+    """
+    Send the claimed reminders in provider-sized batches, several batches
+    at a time, and record the outcome.
+
+    Worker threads only talk to the provider; all database writes happen on
+    the calling thread in one bulk update. Returns (success, attempts, error)
+    per log.
     """
-    
-    # Mock implementation - in production, call actual SMS/WhatsApp API
-    print(f"[MOCK] Sending reminder to {member.name} ({member.phone}):")
-    print(message)
-    print("-" * 50)
-    
-    # Return True to indicate success (in production, check API response)
-    return True
+    backend = backend or get_notification_backend()
+    limiter = get_rate_limiter(backend.name)
+    batches = [logs[i:i + backend.batch_size] for i in range(0, len(logs), backend.batch_size)]
+
+    def send(batch):
+        return _send_with_retries(backend, [reminder_recipient(log.member) for log in batch], limiter)
+
+    outcomes = []
+    with ThreadPoolExecutor(max_workers=settings.REMINDER_MAX_WORKERS) as executor:
+        for results, attempts, error in executor.map(send, batches):
+            outcomes.extend((success, attempts, None if success else error) for success in results)
+
+    now = timezone.now()
+    for log, (success, attempts, error) in zip(logs, outcomes):
+        log.attempts += attempts
+        log.claim_token = None
+        if success:
+            log.status, log.sent_at, log.last_error = 'SENT', now, None
+        else:
+            log.status, log.last_error = 'FAILED', error
+            logger.warning("Error sending reminder to %s: %s", log.member.name, error)
+    ReminderLog.objects.bulk_update(
+        logs, ['status', 'attempts', 'claim_token', 'sent_at', 'last_error'],
+        batch_size=settings.REMINDER_BATCH_SIZE,
+    )
+    return outcomes
 
 
 def send_daily_expiry_reminders():
@@ -34,30 +185,28 @@ def send_daily_expiry_reminders():
     Daily cron job function to send reminders to members expiring in 7 days
     """
     members_expiring = get_members_expiring_soon(days=7)
-    
+    total_members = members_expiring.count()
+    logs = claim_due_reminders(members_expiring)
+    outcomes = dispatch_reminders(logs)
+
     results = {
-        'total_members': members_expiring.count(),
+        'total_members': total_members,
         'successful': 0,
         'failed': 0,
+        # Already reminded for this end date, or out of retries
+        'skipped': total_members - len(logs),
         'members_notified': []
     }
-    
-    for member in members_expiring:
-        try:
-            success = send_expiry_reminder(member)
-            if success:
-                results['successful'] += 1
-                results['members_notified'].append({
-                    'id': member.id,
-                    'name': member.name,
-                    'phone': member.phone,
-                    'expiry_date': member.end_date.isoformat()
-                })
-            else:
-                results['failed'] += 1
-        except Exception as e:
-            print(f"Error sending reminder to {member.name}: {str(e)}")
+    for log, (success, _, _) in zip(logs, outcomes):
+        if success:
+            results['successful'] += 1
+            results['members_notified'].append({
+                'id': log.member.id,
+                'name': log.member.name,
+                'phone': log.member.phone,
+                'expiry_date': log.end_date.isoformat()
+            })
+        else:
             results['failed'] += 1
-    
-    return results
 
+    return results
@@ -0,0 +1,133 @@
+"""
+Indexed member search.
+
+PostgreSQL uses pg_trgm GIN indexes on ``name``, ``UPPER(name)`` and
+``phone``: rows match on substring (served by the trigram indexes) or on
+trigram similarity, which tolerates typos, and are ranked by similarity.
+
+SQLite uses the ``members_member_fts`` FTS5 shadow table (trigram tokenizer,
+kept in sync by triggers) for indexed substring matching ranked by bm25.
+
+Any other database, and queries too short for trigrams, fall back to the
+original ``icontains`` filter. A query that is a complete phone number also
+matches members whose ``phone_key`` equals its normalized form, however the
+number was typed, and those members rank first.
+"""
+import re
+
+from django.db import connections
+from django.db.models import Case, F, FloatField, Q, Value, When
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Greatest
+from rest_framework.filters import SearchFilter
+
+from .phone import NATIONAL_NUMBER_LENGTH, normalize_phone
+
+
+MIN_TRIGRAM_QUERY_LENGTH = 3
+FTS_TABLE = 'members_member_fts'
+PHONE_QUERY_PATTERN = re.compile(r'^\+?[\d\s()-]+$')
+# search_rank of an exact phone_key match, above any similarity or bm25 score
+EXACT_PHONE_RANK = 1e9
+
+_fts_tables = {}
+
+
+def _matching(condition, phone_key):
+    return condition | Q(phone_key=phone_key) if phone_key else condition
+
+
+def _ranked(queryset, score, phone_key):
+    if phone_key:
+        score = Case(
+            When(phone_key=phone_key, then=Value(EXACT_PHONE_RANK)), default=score, output_field=FloatField(),
+        )
+    return queryset.annotate(search_rank=score).order_by('-search_rank', '-created_at')
+
+
+def _icontains(queryset, query, rank, phone_key):
+    return queryset.filter(_matching(Q(name__icontains=query) | Q(phone__icontains=query), phone_key))
+
+
+def _search_postgresql(queryset, query, rank, phone_key):
+    from django.contrib.postgres.lookups import TrigramSimilar
+    from django.contrib.postgres.search import TrigramSimilarity
+
+    queryset = queryset.filter(_matching(
+        Q(name__icontains=query)
+        | Q(phone__contains=query)
+        | TrigramSimilar(F('name'), Value(query)),
+        phone_key,
+    ))
+    if not rank:
+        return queryset
+    return _ranked(
+        queryset, Greatest(TrigramSimilarity('name', query), TrigramSimilarity('phone', query)), phone_key,
+    )
+
+
+def _sqlite_fts_available(alias):
+    if alias not in _fts_tables:
+        with connections[alias].cursor() as cursor:
+            _fts_tables[alias] = FTS_TABLE in connections[alias].introspection.table_names(cursor)
+    return _fts_tables[alias]
+
+
+def _search_sqlite(queryset, query, rank, phone_key):
+    # Quote the query as one FTS5 phrase so user input is never parsed as syntax
+    phrase = '"' + query.replace('"', '""') + '"'
+    queryset = queryset.filter(_matching(
+        Q(id__in=RawSQL(f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [phrase])),
+        phone_key,
+    ))
+    if not rank:
+        return queryset
+    return _ranked(
+        queryset,
+        RawSQL(
+            f'SELECT -bm25({FTS_TABLE}) FROM {FTS_TABLE} '
+            f'WHERE {FTS_TABLE} MATCH %s AND rowid = members_member.id',
+            [phrase],
+            output_field=FloatField(),
+        ),
+        phone_key,
+    )
+
+
+def search_members(queryset, query, rank=True):
+    """
+    Filter ``queryset`` to members whose name or phone matches ``query``.
+
+    With ``rank=True`` the result is ordered best match first, otherwise the
+    queryset's existing ordering is kept.
+    """
+    query = (query or '').strip()
+    if not query:
+        return queryset
+
+    phone_key = None
+    if PHONE_QUERY_PATTERN.match(query) and len(re.sub(r'\D', '', query)) >= NATIONAL_NUMBER_LENGTH:
+        phone_key = normalize_phone(query)
+
+    connection = connections[queryset.db]
+    if len(query) >= MIN_TRIGRAM_QUERY_LENGTH:
+        if connection.vendor == 'postgresql':
+            return _search_postgresql(queryset, query, rank, phone_key)
+        if connection.vendor == 'sqlite' and _sqlite_fts_available(queryset.db):
+            return _search_sqlite(queryset, query, rank, phone_key)
+    return _icontains(queryset, query, rank, phone_key)
+
+
+class MemberSearchFilter(SearchFilter):
+    """
+    ``?search=`` backed by :func:`search_members`.
+
+    Results are ranked by relevance unless the request asks for an explicit
+    ``ordering``; list it after OrderingFilter so the rank is not overridden
+    by the view's default ordering.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '')
+        rank = not request.query_params.get('ordering')
+        return search_members(queryset, query, rank=rank)
@@ -1,6 +1,7 @@
 from rest_framework import serializers
 from django.contrib.auth.password_validation import validate_password
 from .models import Owner, Member, Trainer, TrainerPayment, Gym
+from .trainers import payroll_status, trainer_name_key, trainers_by_name
 
 
 class OwnerRegistrationSerializer(serializers.ModelSerializer):
@@ -36,9 +37,12 @@ class MemberSerializer(serializers.ModelSerializer):
         model = Member
         fields = (
             'id', 'name', 'phone', 'plan_type', 'start_date',
-            'end_date', 'status', 'assigned_trainer', 'created_at', 'updated_at', 'owner'
+            'end_date', 'status', 'assigned_trainer', 'trainer', 'total_paid', 'payment_count',
+            'last_payment_date', 'created_at', 'updated_at', 'owner'
+        )
+        read_only_fields = (
+            'id', 'total_paid', 'payment_count', 'last_payment_date', 'created_at', 'updated_at', 'owner'
         )
-        read_only_fields = ('id', 'created_at', 'updated_at', 'owner')
 
     def validate(self, attrs):
         start_date = attrs.get('start_date')
@@ -48,6 +52,21 @@ class MemberSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError({
                 'end_date': 'End date must be after start date.'
             })
+
+        request = self.context.get('request')
+        trainer = attrs.get('trainer')
+        if trainer:
+            if request and not request.user.is_superuser and trainer.owner_id != request.user.pk:
+                raise serializers.ValidationError({
+                    'trainer': 'You can only assign your own trainers.'
+                })
+            if not attrs.get('assigned_trainer'):
+                attrs['assigned_trainer'] = trainer.name
+        elif 'assigned_trainer' in attrs and 'trainer' not in attrs:
+            # Free-text trainer name: link it when it names exactly one of the owner's trainers
+            owner_id = self.instance.owner_id if self.instance else (request.user.pk if request else None)
+            if owner_id:
+                attrs['trainer_id'] = trainers_by_name(owner_id).get(trainer_name_key(attrs['assigned_trainer']))
         
         return attrs
 
@@ -58,7 +77,8 @@ class MemberListSerializer(serializers.ModelSerializer):
         model = Member
         fields = (
             'id', 'name', 'phone', 'plan_type', 'start_date',
-            'end_date', 'status', 'assigned_trainer', 'created_at'
+            'end_date', 'status', 'assigned_trainer', 'trainer', 'total_paid', 'payment_count',
+            'last_payment_date', 'created_at'
         )
 
 
@@ -83,6 +103,35 @@ class TrainerListSerializer(serializers.ModelSerializer):
         )
 
 
+class TrainerPayrollSerializer(serializers.ModelSerializer):
+    """Trainer with the monthly pay annotated by members.trainers.annotate_payroll"""
+    commission_base = serializers.DecimalField(max_digits=12, decimal_places=2, read_only=True)
+    base_pay = serializers.DecimalField(max_digits=12, decimal_places=2, read_only=True)
+    commission = serializers.DecimalField(max_digits=12, decimal_places=2, read_only=True)
+    total_due = serializers.DecimalField(max_digits=12, decimal_places=2, read_only=True)
+    paid = serializers.DecimalField(max_digits=12, decimal_places=2, read_only=True)
+    balance = serializers.DecimalField(max_digits=12, decimal_places=2, read_only=True)
+    status = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Trainer
+        fields = (
+            'id', 'name', 'salary_type', 'base_salary', 'commission_percent', 'is_active',
+            'commission_base', 'base_pay', 'commission', 'total_due', 'paid', 'balance', 'status',
+        )
+
+    def get_status(self, obj):
+        return payroll_status(obj.total_due, obj.paid)
+
+
+class TrainerPayrollTotalsSerializer(serializers.Serializer):
+    base_pay = serializers.DecimalField(max_digits=14, decimal_places=2)
+    commission = serializers.DecimalField(max_digits=14, decimal_places=2)
+    total_due = serializers.DecimalField(max_digits=14, decimal_places=2)
+    paid = serializers.DecimalField(max_digits=14, decimal_places=2)
+    balance = serializers.DecimalField(max_digits=14, decimal_places=2)
+
+
 class TrainerPaymentSerializer(serializers.ModelSerializer):
     trainer_name = serializers.CharField(source='trainer.name', read_only=True)
 
@@ -97,7 +146,7 @@ class TrainerPaymentSerializer(serializers.ModelSerializer):
     def validate(self, attrs):
         trainer = attrs.get('trainer')
         request = self.context.get('request')
-        if trainer and request and trainer.owner != request.user:
+        if trainer and request and trainer.owner_id != request.user.pk:
             raise serializers.ValidationError(
                 {'trainer': 'You can only pay your own trainers.'}
             )
@@ -1,26 +1,70 @@
 """
 Service layer for member-related business logic
 """
+from collections import Counter
+from django.conf import settings
+from django.db import transaction
 from django.utils import timezone
 from datetime import timedelta
-from .models import Member
+from .models import Member, JobCheckpoint
+from dashboard.cache import invalidate_dashboard_stats
+from gym_management.conditional import bump_change_version
 
 
-def check_and_update_member_status():
-    """Check member expiry dates and update status"""
+MEMBER_STATUS_JOB = 'member_status_transition'
+
+
+def check_and_update_member_status(batch_size=None):
+    """
+    Expire ACTIVE members whose end date is today or earlier.
+
+    Members are processed in id order, ``batch_size`` rows per transaction,
+    and the last processed id is stored in a JobCheckpoint so a crashed run
+    resumes where it stopped on the same day. Returns the number of members
+    expired in total and per owner id.
+    """
+    batch_size = batch_size or settings.MEMBER_STATUS_BATCH_SIZE
     today = timezone.now().date()
-    
-    # Update expired members
-    Member.objects.filter(
-        end_date__lt=today,
-        status='ACTIVE'
-    ).update(status='EXPIRED')
-    
-    # Update members that are expiring today
-    Member.objects.filter(
-        end_date=today,
-        status='ACTIVE'
-    ).update(status='EXPIRED')
+
+    checkpoint, _ = JobCheckpoint.objects.get_or_create(
+        name=MEMBER_STATUS_JOB, defaults={'run_date': today}
+    )
+    if checkpoint.run_date != today or checkpoint.completed:
+        # Start over; only an unfinished run from today is resumed
+        checkpoint.run_date, checkpoint.last_id, checkpoint.completed = today, 0, False
+        checkpoint.save()
+
+    per_owner = Counter()
+    while True:
+        with transaction.atomic():
+            batch = list(
+                Member.objects.select_for_update()
+                .filter(status='ACTIVE', end_date__lte=today, id__gt=checkpoint.last_id)
+                .order_by('id')
+                .values_list('id', 'owner_id')[:batch_size]
+            )
+            if not batch:
+                break
+            Member.objects.filter(id__in=[member_id for member_id, _ in batch]).update(
+                status='EXPIRED', updated_at=timezone.now()
+            )
+            checkpoint.last_id = batch[-1][0]
+            checkpoint.save(update_fields=['last_id', 'updated_at'])
+
+        batch_owners = Counter(owner_id for _, owner_id in batch)
+        per_owner.update(batch_owners)
+        # Bulk updates bypass the model signals, so drop cached dashboards and move change stamps here
+        for owner_id in batch_owners:
+            invalidate_dashboard_stats(owner_id)
+            bump_change_version(owner_id)
+
+    checkpoint.completed = True
+    checkpoint.save(update_fields=['completed', 'updated_at'])
+
+    return {
+        'expired': sum(per_owner.values()),
+        'per_owner': dict(per_owner),
+    }
 
 
 def get_members_expiring_soon(days=7):
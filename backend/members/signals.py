@@ -0,0 +1,80 @@
+"""
+Move the per-owner change stamps used for conditional GET when members,
+trainers, trainer payments or gym profiles change, move a trainer's payments
+along when the trainer changes owner, and drop changed owners from this
+worker's authentication cache
+"""
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_migrate, post_save, pre_save
+from django.dispatch import receiver
+
+from gym_management.authentication import evict_cached_user
+from gym_management.conditional import bump_all_change_versions, bump_change_version
+from .models import Gym, Member, Owner, Trainer, TrainerPayment
+
+
+def bump_owner_on_commit(owner_id):
+    # Bump after commit so no request reads the old rows under the new stamp
+    if owner_id is not None:
+        transaction.on_commit(partial(bump_change_version, owner_id))
+
+
+def previous_owner_id(instance):
+    """Owner a Member or Trainer is being moved away from by the save in progress, or None"""
+    previous = getattr(instance, '_previous_owner_id', None)
+    return previous if previous != instance.owner_id else None
+
+
+@receiver(pre_save, sender=Member, dispatch_uid='owner_member_pre_save')
+@receiver(pre_save, sender=Trainer, dispatch_uid='owner_trainer_pre_save')
+def remember_previous_owner(sender, instance, raw=False, update_fields=None, **kwargs):
+    instance._previous_owner_id = None
+    if instance.pk and not raw and (update_fields is None or 'owner' in update_fields):
+        instance._previous_owner_id = sender.objects.filter(
+            pk=instance.pk
+        ).values_list('owner_id', flat=True).first()
+
+
+@receiver(post_save, sender=Member, dispatch_uid='owner_member_saved')
+@receiver(post_save, sender=Trainer, dispatch_uid='owner_trainer_saved')
+def follow_owner_change(sender, instance, raw=False, **kwargs):
+    previous = previous_owner_id(instance)
+    if raw or previous is None:
+        return
+    if sender is Trainer:
+        # Trainer payments carry their trainer's owner; a Member's payments move in payments.signals
+        TrainerPayment.objects.filter(trainer=instance).update(owner_id=instance.owner_id)
+    bump_owner_on_commit(previous)
+
+
+@receiver(post_save, sender=Member, dispatch_uid='conditional_member_saved')
+@receiver(post_delete, sender=Member, dispatch_uid='conditional_member_deleted')
+@receiver(post_save, sender=Trainer, dispatch_uid='conditional_trainer_saved')
+@receiver(post_delete, sender=Trainer, dispatch_uid='conditional_trainer_deleted')
+@receiver(post_save, sender=Gym, dispatch_uid='conditional_gym_saved')
+@receiver(post_delete, sender=Gym, dispatch_uid='conditional_gym_deleted')
+def bump_on_owned_change(sender, instance, **kwargs):
+    bump_owner_on_commit(instance.owner_id)
+
+
+@receiver(post_save, sender=TrainerPayment, dispatch_uid='conditional_trainer_payment_saved')
+@receiver(post_delete, sender=TrainerPayment, dispatch_uid='conditional_trainer_payment_deleted')
+def bump_on_trainer_payment_change(sender, instance, **kwargs):
+    bump_owner_on_commit(instance.owner_id)
+
+
+@receiver(post_save, sender=Owner, dispatch_uid='auth_owner_saved')
+@receiver(post_delete, sender=Owner, dispatch_uid='auth_owner_deleted')
+def evict_owner_on_change(sender, instance, update_fields=None, **kwargs):
+    # Logins only record last_login, which authentication does not depend on
+    if update_fields is not None and set(update_fields) <= {'last_login'}:
+        return
+    transaction.on_commit(partial(evict_cached_user, instance.pk))
+
+
+@receiver(post_migrate, dispatch_uid='conditional_migrated')
+def bump_after_migrate(sender, **kwargs):
+    # Data migrations bypass the signals above
+    bump_all_change_versions()
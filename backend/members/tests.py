@@ -0,0 +1,417 @@
+import io
+import threading
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .management.commands.notification_stub_server import StubGateway
+from .models import Member, Owner, ReminderLog, RevokedToken, Trainer, TrainerPayment
+from .notifications import BatchHTTPBackend, ConsoleBackend, NotificationError
+from .reminder_service import EXPIRY_REMINDER_TEMPLATE, claim_due_reminders, dispatch_reminders
+from .search import search_members
+from .services import get_members_expiring_soon
+from .trainers import parse_month
+from .tokens import (
+    _recently_revoked, bump_revoked_version, clear_revoked_set, get_revoked_set, is_token_revoked, revoke_token,
+)
+from payments.models import Payment
+
+
+def create_member(owner, name, phone='9876543210', **fields):
+    today = timezone.now().date()
+    fields.setdefault('plan_type', 'GENERAL')
+    fields.setdefault('start_date', today - timedelta(days=10))
+    fields.setdefault('end_date', today + timedelta(days=20))
+    return Member.objects.create(owner=owner, name=name, phone=phone, **fields)
+
+
+class MemberSaveTests(TestCase):
+    def setUp(self):
+        self.owner = Owner.objects.create_user(username='save-owner', password='save-pass-123')
+        self.member = create_member(self.owner, 'Saver')
+
+    def test_full_save_keeps_payment_totals(self):
+        stale = Member.objects.get(pk=self.member.pk)
+        Payment.objects.create(member=self.member, amount=Decimal('750'), payment_mode='Cash',
+                               payment_date=timezone.now().date())
+
+        stale.name = 'Saver renamed'
+        stale.save()
+
+        self.member.refresh_from_db()
+        self.assertEqual(self.member.name, 'Saver renamed')
+        self.assertEqual((self.member.total_paid, self.member.payment_count), (Decimal('750'), 1))
+
+    def test_saving_a_deleted_member_inserts_it_again(self):
+        Member.objects.filter(pk=self.member.pk).delete()
+
+        self.member.save()
+
+        self.assertTrue(Member.objects.filter(pk=self.member.pk, name='Saver').exists())
+
+    def test_update_fields_still_apply(self):
+        self.member.phone = '+91 98765 00000'
+        self.member.save(update_fields=['phone'])
+        self.assertEqual(Member.objects.get(pk=self.member.pk).phone_key, '+919876500000')
+
+
+class TrainerOwnerChangeTests(TestCase):
+    def test_trainer_payments_follow_the_trainer(self):
+        owner = Owner.objects.create_user(username='trainer-owner', password='trainer-pass-123')
+        other = Owner.objects.create_user(username='trainer-other', password='trainer-pass-123')
+        trainer = Trainer.objects.create(owner=owner, name='Moving Trainer')
+        TrainerPayment.objects.create(trainer=trainer, amount=Decimal('800'), payment_mode='Cash',
+                                      payment_date=timezone.now().date())
+
+        trainer.owner = other
+        trainer.save()
+
+        self.assertEqual(list(TrainerPayment.objects.values_list('owner_id', flat=True)), [other.pk])
+
+
+class PayrollMonthTests(TestCase):
+    @override_settings(TIME_ZONE='Asia/Kolkata')
+    def test_current_month_follows_local_date(self):
+        # 20:00 UTC on 31 January is already 1 February in the gym's time zone
+        late_evening = datetime(2026, 1, 31, 20, 0, tzinfo=dt_timezone.utc)
+        with mock.patch('django.utils.timezone.now', return_value=late_evening):
+            self.assertEqual(parse_month('').isoformat(), '2026-02-01')
+
+    def test_explicit_month(self):
+        self.assertEqual(parse_month('2025-12').isoformat(), '2025-12-01')
+        with self.assertRaises(ValueError):
+            parse_month('12-2025')
+
+
+class MemberSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = Owner.objects.create_user(username='search-owner', password='search-pass-123')
+        cls.foreign = create_member(cls.owner, 'Foreign Number', phone='+15551234567')
+        cls.local = create_member(cls.owner, 'Local Number', phone='5551234567')
+        cls.typed = create_member(cls.owner, 'Typed Number', phone='+919812345678')
+        create_member(cls.owner, 'Someone Else', phone='9000000000')
+
+    def search(self, query):
+        return list(search_members(Member.objects.all(), query).values_list('name', flat=True))
+
+    def test_full_number_keeps_substring_matches(self):
+        self.assertEqual(self.search('5551234567'), ['Local Number', 'Foreign Number'])
+
+    def test_full_number_matches_other_spellings(self):
+        self.assertEqual(self.search('098123 45678'), ['Typed Number'])
+        self.assertEqual(self.search('+91 98123-45678'), ['Typed Number'])
+
+    def test_partial_number_and_name(self):
+        self.assertCountEqual(self.search('5551234'), ['Local Number', 'Foreign Number'])
+        self.assertEqual(self.search('typed'), ['Typed Number'])
+
+    def test_without_ranking_keeps_order(self):
+        found = search_members(Member.objects.order_by('name'), '5551234567', rank=False)
+        self.assertEqual(list(found.values_list('name', flat=True)), ['Foreign Number', 'Local Number'])
+
+
+@override_settings(PHONE_DEFAULT_COUNTRY_CODE='1')
+class DuplicateMemberTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = Owner.objects.create_user(username='dupes-owner', password='dupes-pass-123')
+        cls.other = Owner.objects.create_user(username='dupes-other', password='dupes-pass-123')
+        cls.admin = Owner.objects.create_superuser(username='dupes-admin', password='dupes-pass-123')
+        create_member(cls.owner, 'Plus Format', phone='+1 555-123-4567')
+        create_member(cls.owner, 'Bare Format', phone='5551234567')
+        create_member(cls.owner, 'Unrelated', phone='5559876543')
+        create_member(cls.other, 'Other Gym', phone='555.123.4567')
+
+    def duplicates(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        response = client.get('/api/members/duplicates/')
+        self.assertEqual(response.status_code, 200)
+        return [(group['phone_key'], sorted(member['name'] for member in group['members'])) for group in response.data]
+
+    def test_groups_differently_written_numbers(self):
+        self.assertEqual(self.duplicates(self.owner), [('+15551234567', ['Bare Format', 'Plus Format'])])
+
+    def test_other_owners_number_is_not_a_duplicate(self):
+        self.assertEqual(self.duplicates(self.other), [])
+
+    def test_superuser_groups_per_owner(self):
+        create_member(self.other, 'Other Gym Again', phone='(555) 123 4567')
+        self.assertEqual(self.duplicates(self.admin), [
+            ('+15551234567', ['Bare Format', 'Plus Format']),
+            ('+15551234567', ['Other Gym', 'Other Gym Again']),
+        ])
+
+
+class MemberImportTests(TestCase):
+    HEADER = 'name,phone,plan_type,start_date,end_date\n'
+
+    def setUp(self):
+        self.owner = Owner.objects.create_user(username='import-owner', password='import-pass-123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+    def upload(self, content, name='members.csv'):
+        upload = SimpleUploadedFile(name, content, content_type='text/csv')
+        return self.client.post('/api/members/import/', {'file': upload}, format='multipart')
+
+    def test_imports_rows(self):
+        response = self.upload((self.HEADER + 'Asha,9876543210,GENERAL,2026-01-01,2026-02-01\n').encode())
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(Member.objects.get(owner=self.owner).phone_key, '+919876543210')
+
+    def test_unparseable_csv_is_a_bad_request(self):
+        content = self.HEADER + 'Asha,9876543210,GENERAL,2026-01-01,2026-02-01\n' + '"' + 'x' * 200000 + '"\n'
+        response = self.upload(content.encode())
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('line 3', response.data['error'])
+        self.assertFalse(Member.objects.exists())
+
+    def test_non_utf8_csv_is_a_bad_request(self):
+        response = self.upload((self.HEADER + 'J\xf6rg,9876543210,GENERAL,2026-01-01,2026-02-01\n').encode('latin-1'))
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['error'], 'CSV files must be UTF-8 encoded.')
+
+
+class ReminderClaimTests(TestCase):
+    def setUp(self):
+        owner = Owner.objects.create_user(username='reminder-owner', password='reminder-pass-123')
+        today = timezone.now().date()
+        self.members = [create_member(owner, f'Expiring {i}', end_date=today + timedelta(days=3)) for i in range(4)]
+
+    def log(self, member, status, claimed_minutes_ago=None):
+        claimed_at = None
+        if claimed_minutes_ago is not None:
+            claimed_at = timezone.now() - timedelta(minutes=claimed_minutes_ago)
+        return ReminderLog.objects.create(
+            member=member, end_date=member.end_date, status=status, claim_token='crashed', claimed_at=claimed_at,
+        )
+
+    def test_claims_new_and_abandoned_reminders(self):
+        self.log(self.members[0], 'SENDING', claimed_minutes_ago=120)
+        self.log(self.members[1], 'SENDING', claimed_minutes_ago=5)
+        self.log(self.members[2], 'SENT', claimed_minutes_ago=120)
+
+        with self.settings(REMINDER_CLAIM_TIMEOUT=3600):
+            claimed = claim_due_reminders(get_members_expiring_soon(days=7))
+
+        self.assertCountEqual([log.member for log in claimed], [self.members[0], self.members[3]])
+        self.assertTrue(all(log.status == 'SENDING' and log.claimed_at for log in claimed))
+        self.assertEqual(len({log.claim_token for log in claimed}), 1)
+
+    def test_claims_sending_rows_without_claim_time(self):
+        self.log(self.members[0], 'SENDING')
+        claimed = claim_due_reminders(get_members_expiring_soon(days=7))
+        self.assertIn(self.members[0], [log.member for log in claimed])
+
+    def test_second_run_claims_nothing(self):
+        self.assertEqual(len(claim_due_reminders(get_members_expiring_soon(days=7))), 4)
+        self.assertEqual(claim_due_reminders(get_members_expiring_soon(days=7)), [])
+
+
+@override_settings(REMINDER_RETRY_BACKOFF=0, REMINDER_MAX_RETRIES=3)
+class NotificationBackendTests(TestCase):
+    """BatchHTTPBackend and the reminder dispatcher against the local stub gateway"""
+
+    def setUp(self):
+        self.gateway = self.start_gateway()
+        owner = Owner.objects.create_user(username='notify-owner', password='notify-pass-123')
+        today = timezone.now().date()
+        self.members = [
+            create_member(owner, f'Notified {i}', phone=f'98765432{i:02d}', plan_type='PT' if i % 2 else 'GENERAL',
+                          end_date=today + timedelta(days=3))
+            for i in range(5)
+        ]
+
+    def start_gateway(self, **options):
+        gateway = StubGateway(('127.0.0.1', 0), **options)
+        thread = threading.Thread(target=gateway.serve_forever, args=(0.05,), daemon=True)
+        thread.start()
+        self.addCleanup(thread.join)
+        self.addCleanup(gateway.server_close)
+        self.addCleanup(gateway.shutdown)
+        return gateway
+
+    def backend(self, batch_size=2):
+        return BatchHTTPBackend(url=self.gateway.url, batch_size=batch_size, timeout=5)
+
+    def dispatch(self, backend):
+        logs = claim_due_reminders(get_members_expiring_soon(days=7))
+        dispatch_reminders(logs, backend=backend)
+        return {log.member.name: log for log in ReminderLog.objects.select_related('member')}
+
+    def test_sends_template_once_per_batch(self):
+        recipients = [{'phone': '9876543210', 'context': {'name': name}} for name in ('Asha', 'Ravi', 'Meera')]
+
+        results = BatchHTTPBackend(url=self.gateway.url, batch_size=10).send_batch('Hi {name}!', recipients)
+
+        self.assertEqual(results, [True, True, True])
+        self.assertEqual(len(self.gateway.batches), 1)
+        payload = self.gateway.batches[0]['payload']
+        self.assertEqual(payload['template'], 'Hi {name}!')
+        self.assertEqual(payload['recipients'][1], {'to': '9876543210', 'params': {'name': 'Ravi'}})
+        self.assertEqual(self.gateway.batches[0]['messages'], ['Hi Asha!', 'Hi Ravi!', 'Hi Meera!'])
+
+    def test_reminders_are_batched_and_rendered(self):
+        logs = self.dispatch(self.backend(batch_size=2))
+
+        self.assertEqual(sorted(len(batch['messages']) for batch in self.gateway.batches), [1, 2, 2])
+        self.assertTrue(all(log.status == 'SENT' and log.attempts == 1 for log in logs.values()))
+        member = self.members[1]
+        expected = EXPIRY_REMINDER_TEMPLATE.format(
+            name=member.name, plan='Personal Training', end_date=member.end_date.isoformat(),
+        )
+        messages = [message for batch in self.gateway.batches for message in batch['messages']]
+        self.assertIn(expected, messages)
+        self.assertEqual(len(messages), 5)
+
+    def test_failed_requests_are_retried(self):
+        self.gateway = self.start_gateway(fail_requests=2)
+
+        logs = self.dispatch(self.backend(batch_size=10))
+
+        self.assertEqual(len(self.gateway.batches), 3)
+        self.assertTrue(all(log.status == 'SENT' and log.attempts == 3 for log in logs.values()))
+
+    def test_gives_up_after_max_retries(self):
+        self.gateway = self.start_gateway(fail_requests=100)
+
+        with self.settings(REMINDER_MAX_RETRIES=1), self.assertLogs('members.reminder_service', 'WARNING'):
+            logs = self.dispatch(self.backend(batch_size=10))
+            # Out of retries: the next run does not claim them again
+            self.assertEqual(claim_due_reminders(get_members_expiring_soon(days=7)), [])
+
+        self.assertEqual(len(self.gateway.batches), 2)
+        for log in logs.values():
+            self.assertEqual((log.status, log.attempts), ('FAILED', 2))
+            self.assertIn('503', log.last_error)
+
+    def test_rejected_recipients_fail_without_retry(self):
+        self.gateway = self.start_gateway(fail_rate=1)
+
+        with self.assertLogs('members.reminder_service', 'WARNING'):
+            logs = self.dispatch(self.backend(batch_size=10))
+
+        self.assertEqual(len(self.gateway.batches), 1)
+        self.assertTrue(all(log.status == 'FAILED' and log.attempts == 1 for log in logs.values()))
+
+    def test_unreachable_gateway(self):
+        url = self.gateway.url
+        self.gateway.shutdown()
+        self.gateway.server_close()
+        with self.assertRaises(NotificationError):
+            BatchHTTPBackend(url=url, timeout=1).send_batch('Hi {name}', [{'phone': '1', 'context': {'name': 'A'}}])
+
+    def test_console_backend_renders_each_recipient(self):
+        stream = io.StringIO()
+        results = ConsoleBackend(stream=stream).send_batch(
+            'Hi {name}', [{'phone': '111', 'context': {'name': 'Asha'}}, {'phone': '222', 'context': {'name': 'Ravi'}}],
+        )
+        self.assertEqual(results, [True, True])
+        self.assertIn('Message to 222:\nHi Ravi\n', stream.getvalue())
+
+
+class TokenRefreshTests(TestCase):
+    def setUp(self):
+        self.owner = Owner.objects.create_user(username='refresh-owner', password='refresh-pass-123')
+        self.client = APIClient()
+        response = self.client.post('/api/auth/login/', {'username': 'refresh-owner', 'password': 'refresh-pass-123'})
+        self.refresh = response.data['refresh']
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.addCleanup(_recently_revoked.clear)
+
+    def post_refresh(self, refresh):
+        return self.client.post('/api/auth/token/refresh/', {'refresh': refresh})
+
+    def test_rotates_refresh_token(self):
+        response = self.post_refresh(self.refresh)
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(self.post_refresh(response.data['refresh']).status_code, 200)
+
+    def test_password_change_stops_refresh(self):
+        self.owner.set_password('changed-pass-456')
+        self.owner.save()
+        self.assertEqual(self.post_refresh(self.refresh).status_code, 401)
+
+    def test_deactivated_owner_cannot_refresh(self):
+        self.owner.is_active = False
+        self.owner.save()
+        self.assertEqual(self.post_refresh(self.refresh).status_code, 401)
+
+    def test_revoked_token_missing_from_cache(self):
+        token = RefreshToken(self.refresh)
+        revoke_token(token)
+        # Evicted from the cache (and never seen by this worker): the table still knows
+        cache.clear()
+        _recently_revoked.clear()
+        self.assertTrue(is_token_revoked(token))
+        self.assertEqual(self.post_refresh(self.refresh).status_code, 401)
+
+    def test_concurrent_tabs_get_the_same_tokens(self):
+        first = self.post_refresh(self.refresh)
+        second = self.post_refresh(self.refresh)
+        self.assertEqual(second.status_code, 200, second.data)
+        self.assertEqual(second.data, first.data)
+
+    @override_settings(JWT_REFRESH_REUSE_GRACE=0)
+    def test_reuse_without_grace_is_rejected(self):
+        self.assertEqual(self.post_refresh(self.refresh).status_code, 200)
+        self.assertEqual(self.post_refresh(self.refresh).status_code, 401)
+
+    def test_reuse_after_logout_is_rejected(self):
+        rotated = self.post_refresh(self.refresh).data['refresh']
+        self.assertEqual(self.client.post('/api/auth/logout/', {'refresh': rotated}).status_code, 200)
+        self.assertEqual(self.post_refresh(self.refresh).status_code, 401)
+
+
+@override_settings(JWT_REVOKED_SET_ENABLED=True)
+class RevokedSetRefreshTests(TokenRefreshTests):
+    """The refresh tests again, checked against the per-worker revoked set"""
+
+    def setUp(self):
+        super().setUp()
+        clear_revoked_set()
+        self.addCleanup(clear_revoked_set)
+
+    def revoked_token_selects(self, queries):
+        return [query['sql'] for query in queries if query['sql'].startswith('SELECT')
+                and 'members_revokedtoken' in query['sql']]
+
+    def test_valid_refresh_skips_the_table(self):
+        get_revoked_set()
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.post_refresh(self.refresh).status_code, 200)
+        self.assertEqual(self.revoked_token_selects(queries), [])
+
+    def test_reloads_when_another_worker_revokes(self):
+        get_revoked_set()
+        token = RefreshToken(self.refresh)
+        # Another worker's revocation: nothing in this worker's memory
+        RevokedToken.objects.create(
+            jti=token['jti'], expires_at=datetime.fromtimestamp(token['exp'], tz=dt_timezone.utc),
+        )
+        self.assertFalse(is_token_revoked(token))
+
+        bump_revoked_version()
+        with CaptureQueriesContext(connection) as queries:
+            self.assertTrue(is_token_revoked(token))
+        self.assertEqual(len(self.revoked_token_selects(queries)), 1)
+        self.assertEqual(self.post_refresh(self.refresh).status_code, 401)
+
+    def test_revoking_moves_the_stamp_after_commit(self):
+        version = get_revoked_set().version
+        with self.captureOnCommitCallbacks(execute=True):
+            revoke_token(RefreshToken(self.refresh))
+            self.assertEqual(get_revoked_set().version, version)
+        self.assertNotEqual(get_revoked_set().version, version)
@@ -0,0 +1,186 @@
+"""
+Refresh-token blacklist kept in the cache and the RevokedToken table.
+
+Rotating a refresh token (ROTATE_REFRESH_TOKENS / BLACKLIST_AFTER_ROTATION)
+or logging out revokes its JTI: the JTI is written to the cache, expiring
+with the token, and to the RevokedToken table. Checking a token looks at:
+
+1. this worker's recently revoked JTIs (in memory), which catches a replayed
+   token without any round trip;
+2. with JWT_REVOKED_SET_ENABLED, this worker's copy of every unexpired JTI in
+   the RevokedToken table. Revoking a token moves a version stamp in the
+   cache once the row is committed, and a worker whose copy was loaded under
+   another stamp reads the rows created since its last load (less
+   REVOKED_SET_OVERLAP, for clock skew between workers) before answering. A
+   JTI missing from a current copy is valid without a query; a missing or
+   evicted stamp only means a reload. The stamp must reach every worker, so
+   this is on by default only with a shared CACHE_BACKEND;
+3. otherwise the cache, which answers "revoked" for JTIs it still holds,
+   then the RevokedToken table. Caches evict keys (the file and db backends
+   cull past MAX_ENTRIES, redis under memory pressure), so a JTI the cache
+   does not know is never taken as valid on the cache's word.
+
+Two tabs sharing a refresh token both refresh when their access tokens
+expire; the second would send a token the first just revoked. For
+JWT_REFRESH_REUSE_GRACE seconds after a rotation, the cache keeps the tokens
+it produced, and presenting the old refresh token again returns the same
+tokens instead of failing (members.views).
+
+Expired rows are removed in batches by ``python manage.py purge_revoked_tokens``.
+"""
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from rest_framework_simplejwt.settings import api_settings
+
+from .models import RevokedToken
+
+
+PURGE_BATCH_SIZE = 1000
+# Most recently revoked JTIs remembered by each worker
+MEMORY_SIZE = 10000
+
+VERSION_KEY = 'jwt:revoked:version'
+# Rows created this long before a worker's last load are read again by its next one
+REVOKED_SET_OVERLAP = timedelta(minutes=5)
+
+# {jti: expiry timestamp}
+_recently_revoked = {}
+_lock = threading.Lock()
+
+# jtis: {jti: expiry timestamp} for every unexpired RevokedToken row as of ``version``
+RevokedSet = namedtuple('RevokedSet', ['version', 'jtis', 'loaded_at'])
+_revoked_set = RevokedSet(None, {}, None)
+_revoked_set_lock = threading.Lock()
+
+
+def _key(jti):
+    return f'jwt:revoked:{jti}'
+
+
+def _rotation_key(jti):
+    return f'jwt:rotated:{jti}'
+
+
+def _remember(jti, expires):
+    with _lock:
+        _recently_revoked.pop(jti, None)
+        if _recently_revoked and len(_recently_revoked) >= MEMORY_SIZE:
+            now = time.time()
+            for old_jti in [old_jti for old_jti, old_expires in _recently_revoked.items() if old_expires <= now]:
+                del _recently_revoked[old_jti]
+            if len(_recently_revoked) >= MEMORY_SIZE:
+                _recently_revoked.pop(next(iter(_recently_revoked)))
+        _recently_revoked[jti] = expires
+
+
+def _current_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        version = time.time_ns()
+        cache.add(VERSION_KEY, version, None)
+        version = cache.get(VERSION_KEY, version)
+    return version
+
+
+def bump_revoked_version():
+    """Make every worker sharing this cache read new RevokedToken rows before its next check"""
+    cache.set(VERSION_KEY, time.time_ns(), None)
+
+
+def _load_revoked_set(previous, version):
+    loaded_at = timezone.now()
+    rows = RevokedToken.objects.filter(expires_at__gt=loaded_at)
+    jtis = {}
+    if previous.loaded_at is not None:
+        rows = rows.filter(created_at__gte=previous.loaded_at - REVOKED_SET_OVERLAP)
+        now = time.time()
+        jtis = {jti: expires for jti, expires in previous.jtis.items() if expires > now}
+    jtis.update((jti, expires_at.timestamp()) for jti, expires_at in rows.values_list('jti', 'expires_at'))
+    return RevokedSet(version, jtis, loaded_at)
+
+
+def get_revoked_set():
+    """This worker's RevokedSet, brought up to date if the version stamp moved"""
+    global _revoked_set
+    version = _current_version()
+    if _revoked_set.version != version:
+        with _revoked_set_lock:
+            if _revoked_set.version != version:
+                _revoked_set = _load_revoked_set(_revoked_set, version)
+    return _revoked_set
+
+
+def clear_revoked_set():
+    global _revoked_set
+    with _revoked_set_lock:
+        _revoked_set = RevokedSet(None, {}, None)
+
+
+def revoke_token(token):
+    """Blacklist a refresh token until it expires"""
+    jti = token[api_settings.JTI_CLAIM]
+    expires = token['exp']
+    timeout = int(expires - time.time()) + 1
+    if timeout <= 0:
+        return
+    _remember(jti, expires)
+    RevokedToken.objects.bulk_create(
+        [RevokedToken(jti=jti, expires_at=datetime.fromtimestamp(expires, tz=dt_timezone.utc))],
+        ignore_conflicts=True,
+    )
+    cache.set(_key(jti), True, timeout)
+    if settings.JWT_REVOKED_SET_ENABLED:
+        # Other workers must not reload before the row is visible to them
+        transaction.on_commit(bump_revoked_version)
+
+
+def is_token_revoked(token):
+    jti = token[api_settings.JTI_CLAIM]
+    expires = _recently_revoked.get(jti)
+    if expires is not None and expires > time.time():
+        return True
+    if settings.JWT_REVOKED_SET_ENABLED:
+        return jti in get_revoked_set().jtis
+    if cache.get(_key(jti)):
+        return True
+    return RevokedToken.objects.filter(jti=jti).exists()
+
+
+def remember_rotation(old_jti, new_jti, data):
+    """Keep the tokens (``data``) that replaced refresh token ``old_jti`` for the grace period"""
+    grace = settings.JWT_REFRESH_REUSE_GRACE
+    if grace > 0:
+        cache.set(_rotation_key(old_jti), (new_jti, data), grace)
+
+
+def get_recent_rotation(token):
+    """Tokens a refresh of ``token`` produced within the grace period, unless they were revoked since"""
+    rotation = cache.get(_rotation_key(token[api_settings.JTI_CLAIM]))
+    if rotation is None:
+        return None
+    new_jti, data = rotation
+    if is_token_revoked({api_settings.JTI_CLAIM: new_jti}):
+        # Logged out (or refreshed again) since: the old token gets nothing
+        return None
+    return data
+
+
+def purge_expired_revoked_tokens(batch_size=PURGE_BATCH_SIZE):
+    """Delete expired RevokedToken rows ``batch_size`` at a time; returns the number deleted"""
+    deleted = 0
+    while True:
+        batch = list(
+            RevokedToken.objects.filter(expires_at__lte=timezone.now())
+            .order_by('pk')
+            .values_list('pk', flat=True)[:batch_size]
+        )
+        if not batch:
+            return deleted
+        deleted += RevokedToken.objects.filter(pk__in=batch).delete()[0]
@@ -0,0 +1,118 @@
+"""
+Trainer helpers: linking members to Trainer rows by name, and monthly payroll.
+
+Payroll for a month is one grouped query over the owner's trainers: the
+commission base is the sum of payments made that month by the trainer's PT
+members, and what was already paid comes from TrainerPayment rows in the same
+month (a subquery, so it is not multiplied by the member join).
+"""
+import re
+from datetime import date
+from decimal import Decimal
+
+from django.db.models import Case, DecimalField, F, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Trainer, TrainerPayment
+
+
+MONEY = DecimalField(max_digits=12, decimal_places=2)
+MONTH_PATTERN = re.compile(r'^(\d{4})-(\d{2})$')
+
+
+def trainer_name_key(name):
+    """Case- and whitespace-insensitive form of a trainer name, or None"""
+    key = ' '.join((name or '').split()).casefold()
+    return key or None
+
+
+def trainers_by_name(owner_id):
+    """
+    ``{name key: trainer id}`` for an owner's trainers. Names shared by more
+    than one trainer are left out, since they cannot be matched reliably.
+    """
+    matches = {}
+    for trainer_id, name in Trainer.objects.filter(owner_id=owner_id).values_list('id', 'name'):
+        key = trainer_name_key(name)
+        matches[key] = None if key in matches else trainer_id
+    return {key: trainer_id for key, trainer_id in matches.items() if trainer_id is not None}
+
+
+def parse_month(value, today=None):
+    """First day of ``YYYY-MM`` (the current month when empty); raises ValueError"""
+    if not value:
+        return (today or timezone.localdate()).replace(day=1)
+    match = MONTH_PATTERN.match(value)
+    if not match:
+        raise ValueError('month must be in YYYY-MM format')
+    return date(int(match.group(1)), int(match.group(2)), 1)
+
+
+def _next_month(month_start):
+    if month_start.month == 12:
+        return month_start.replace(year=month_start.year + 1, month=1)
+    return month_start.replace(month=month_start.month + 1)
+
+
+def annotate_payroll(trainers, month_start):
+    """
+    Annotate a Trainer queryset with ``commission_base``, ``base_pay``,
+    ``commission``, ``total_due``, ``paid`` and ``balance`` for the month
+    starting at ``month_start``
+    """
+    month_end = _next_month(month_start)
+    paid = (
+        TrainerPayment.objects.filter(
+            trainer=OuterRef('pk'), payment_date__gte=month_start, payment_date__lt=month_end
+        )
+        .order_by()
+        .values('trainer')
+        .annotate(total=Sum('amount'))
+        .values('total')
+    )
+    zero = Value(Decimal('0'), output_field=MONEY)
+    return trainers.annotate(
+        commission_base=Coalesce(
+            Sum(
+                'members__payments__amount',
+                filter=Q(
+                    members__plan_type='PT',
+                    members__payments__payment_date__gte=month_start,
+                    members__payments__payment_date__lt=month_end,
+                ),
+            ),
+            zero,
+            output_field=MONEY,
+        ),
+        paid=Coalesce(Subquery(paid), zero, output_field=MONEY),
+    ).annotate(
+        base_pay=Case(
+            When(salary_type__in=['FIXED', 'MIXED'], then=F('base_salary')),
+            default=zero,
+            output_field=MONEY,
+        ),
+        commission=Case(
+            When(
+                salary_type__in=['COMMISSION', 'MIXED'],
+                then=F('commission_base') * F('commission_percent') / Value(Decimal('100')),
+            ),
+            default=zero,
+            output_field=MONEY,
+        ),
+    ).annotate(
+        total_due=F('base_pay') + F('commission'),
+    ).annotate(
+        balance=F('total_due') - F('paid'),
+    )
+
+
+def payroll_status(total_due, paid):
+    """Reconcile what a trainer earned with what TrainerPayment says was paid"""
+    if not total_due and not paid:
+        return 'NOTHING_DUE'
+    if paid > total_due:
+        return 'OVERPAID'
+    if paid == total_due:
+        return 'PAID'
+    return 'PARTIAL' if paid else 'UNPAID'
@@ -3,6 +3,7 @@ from rest_framework.routers import DefaultRouter
 from .views import (
     OwnerRegistrationView,
     CustomTokenObtainPairView,
+    LogoutView,
     MemberViewSet,
     TrainerViewSet,
     TrainerPaymentViewSet,
@@ -18,6 +19,7 @@ router.register(r'', MemberViewSet, basename='members')
 
 urlpatterns = [
     path('login/', CustomTokenObtainPairView.as_view(), name='token_obtain_pair'),
+    path('logout/', LogoutView.as_view(), name='token_logout'),
     path('', include(router.urls)),
 ]
 
@@ -1,14 +1,29 @@
-from rest_framework import viewsets, status
+from rest_framework import serializers, viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny, IsAuthenticated
-from rest_framework_simplejwt.views import TokenObtainPairView
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework.parsers import MultiPartParser, FormParser
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, TokenError
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView, TokenViewBase
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.tokens import RefreshToken
 from django_filters.rest_framework import DjangoFilterBackend
+from decimal import Decimal
+from django.db.models import Exists, OuterRef
 from rest_framework.filters import SearchFilter, OrderingFilter
-from django.db.models import Q
 
-from .models import Member, Trainer, TrainerPayment, Gym
+from gym_management.authentication import TOKEN_VERSION_CLAIM, get_token_version
+from gym_management.conditional import ConditionalGetMixin
+from gym_management.exports import ExportMixin
+from gym_management.fast_serializers import FastListMixin
+from payments.dues import annotate_dues
+from payments.serializers import MemberDuesSerializer
+from .models import Member, Owner, Trainer, TrainerPayment, Gym
+from .search import MemberSearchFilter, search_members
+from .importers import ImportFileError, import_members
+from .tokens import get_recent_rotation, is_token_revoked, remember_rotation, revoke_token
+from .trainers import annotate_payroll, parse_month
 from .serializers import (
     OwnerRegistrationSerializer,
     OwnerSerializer,
@@ -16,6 +31,8 @@ from .serializers import (
     MemberListSerializer,
     TrainerSerializer,
     TrainerListSerializer,
+    TrainerPayrollSerializer,
+    TrainerPayrollTotalsSerializer,
     TrainerPaymentSerializer,
     GymSerializer,
 )
@@ -26,11 +43,72 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
     def get_token(cls, user):
         token = super().get_token(user)
         token['username'] = user.username
+        token[TOKEN_VERSION_CLAIM] = user.token_version
         return token
 
 
 class CustomTokenObtainPairView(TokenObtainPairView):
     serializer_class = CustomTokenObtainPairSerializer
+    query_budget = 3
+
+
+class BlacklistingTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    Refresh that rejects revoked refresh tokens, and tokens issued before the
+    owner's token_version moved or the owner was deactivated, and revokes the
+    rotated one (members.tokens). A token rotated moments ago by another tab
+    gets the same new tokens again.
+    """
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+        token_version = Owner.objects.filter(
+            **{jwt_settings.USER_ID_FIELD: refresh[jwt_settings.USER_ID_CLAIM]}, is_active=True,
+        ).values_list('token_version', flat=True).first()
+        if token_version is None:
+            raise AuthenticationFailed('No active account found with the given credentials', code='no_active_account')
+        if token_version != get_token_version(refresh):
+            raise TokenError('Token has been revoked')
+        if is_token_revoked(refresh):
+            rotated = get_recent_rotation(refresh)
+            if rotated is None:
+                raise TokenError('Token is blacklisted')
+            return rotated
+
+        data = {'access': str(refresh.access_token)}
+        if jwt_settings.ROTATE_REFRESH_TOKENS:
+            old_jti = refresh[jwt_settings.JTI_CLAIM]
+            if jwt_settings.BLACKLIST_AFTER_ROTATION:
+                revoke_token(refresh)
+            refresh.set_jti()
+            refresh.set_exp()
+            refresh.set_iat()
+            data['refresh'] = str(refresh)
+            if jwt_settings.BLACKLIST_AFTER_ROTATION:
+                remember_rotation(old_jti, refresh[jwt_settings.JTI_CLAIM], data)
+        return data
+
+
+class BlacklistingTokenRefreshView(TokenRefreshView):
+    serializer_class = BlacklistingTokenRefreshSerializer
+    # The owner's token_version, the revocation check (the table unless the cache
+    # holds the JTI, or with JWT_REVOKED_SET_ENABLED only when the stamp moved),
+    # then BEGIN + INSERT revoking the old token
+    query_budget = 4
+
+
+class LogoutSerializer(serializers.Serializer):
+    refresh = serializers.CharField()
+
+    def validate(self, attrs):
+        revoke_token(RefreshToken(attrs['refresh']))
+        return {}
+
+
+class LogoutView(TokenViewBase):
+    """Revoke the posted refresh token; the access token stays valid until it expires"""
+    serializer_class = LogoutSerializer
+    query_budget = 2
 
 
 class OwnerRegistrationView(viewsets.ModelViewSet):
@@ -38,6 +116,7 @@ class OwnerRegistrationView(viewsets.ModelViewSet):
     serializer_class = OwnerRegistrationSerializer
     permission_classes = [AllowAny]
     http_method_names = ['post']
+    query_budget = 3
 
     def create(self, request):
         serializer = self.get_serializer(data=request.data)
@@ -50,14 +129,38 @@ class OwnerRegistrationView(viewsets.ModelViewSet):
         }, status=status.HTTP_201_CREATED)
 
 
-class MemberViewSet(viewsets.ModelViewSet):
+class MemberViewSet(ConditionalGetMixin, ExportMixin, FastListMixin, viewsets.ModelViewSet):
+    # A delete subtracts the member's payments from the revenue rollup in one UPDATE
+    # before the cascade. The import budget is for a file that fits in one batch:
+    # each further MEMBER_IMPORT_BATCH_SIZE rows add one INSERT
+    query_budget = {
+        'list': 3, 'retrieve': 2, 'search': 3, 'duplicates': 2, 'dues': 4,
+        'import_members': 4, 'destroy': 9, 'default': 6,
+    }
     serializer_class = MemberSerializer
     permission_classes = [IsAuthenticated]
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
-    filterset_fields = ['plan_type', 'status']
-    search_fields = ['name', 'phone']
-    ordering_fields = ['created_at', 'name', 'end_date']
+    # Search runs last so its relevance ranking wins over the default ordering
+    filter_backends = [DjangoFilterBackend, OrderingFilter, MemberSearchFilter]
+    filterset_fields = ['plan_type', 'status', 'trainer']
+    ordering_fields = ['created_at', 'name', 'end_date', 'total_paid', 'payment_count', 'last_payment_date']
     ordering = ['-created_at']
+    export_filename = 'members'
+    export_fields = {
+        'id': 'id',
+        'name': 'name',
+        'phone': 'phone',
+        'plan_type': 'plan_type',
+        'start_date': 'start_date',
+        'end_date': 'end_date',
+        'status': 'status',
+        'assigned_trainer': 'assigned_trainer',
+        'trainer': 'trainer_id',
+        'total_paid': 'total_paid',
+        'payment_count': 'payment_count',
+        'last_payment_date': 'last_payment_date',
+        'created_at': 'created_at',
+        'updated_at': 'updated_at',
+    }
 
     def get_queryset(self):
         # Superuser can see all members, regular users see only their own
@@ -84,9 +187,7 @@ class MemberViewSet(viewsets.ModelViewSet):
         queryset = self.get_queryset()
 
         if query:
-            queryset = queryset.filter(
-                Q(name__icontains=query) | Q(phone__icontains=query)
-            )
+            queryset = search_members(queryset, query)
 
         if plan_type:
             queryset = queryset.filter(plan_type=plan_type)
@@ -102,9 +203,114 @@ class MemberViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(queryset, many=True)
         return Response(serializer.data)
 
+    @action(detail=False, methods=['post'], url_path='import', parser_classes=[MultiPartParser, FormParser])
+    def import_members(self, request):
+        """
+        Bulk import members from a CSV or XLSX upload (multipart field ``file``).
+
+        Columns: name, phone, plan_type, start_date, end_date and optionally
+        status and assigned_trainer. Query params: ``batch_size``,
+        ``atomic=true`` (reject the whole file if any row is invalid) and
+        ``dry_run=true`` (validate only).
+        """
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response(
+                {'error': 'file is required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            batch_size = max(int(request.query_params.get('batch_size', 0)), 0) or None
+        except ValueError:
+            return Response(
+                {'error': 'batch_size must be an integer'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        truthy = ('1', 'true', 'yes')
+        try:
+            report = import_members(
+                upload,
+                upload.name,
+                owner=request.user,
+                batch_size=batch_size,
+                atomic=request.query_params.get('atomic', '').lower() in truthy,
+                dry_run=request.query_params.get('dry_run', '').lower() in truthy,
+            )
+        except ImportFileError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        if report['created']:
+            response_status = status.HTTP_201_CREATED
+        elif report['failed']:
+            response_status = status.HTTP_400_BAD_REQUEST
+        else:
+            response_status = status.HTTP_200_OK
+        return Response(report, status=response_status)
+
+    @action(
+        detail=False,
+        methods=['get'],
+        ordering_fields=[
+            'created_at', 'name', 'end_date', 'total_paid', 'payment_count', 'last_payment_date',
+            'plan_price', 'outstanding_dues',
+        ],
+    )
+    def dues(self, request):
+        """
+        Members with plan price, total paid and outstanding dues, in one query.
 
-class TrainerViewSet(viewsets.ModelViewSet):
+        Supports the list filters, ``search``, ``ordering`` (also by
+        ``total_paid`` and ``outstanding_dues``) and ``owes=true|false``.
+        """
+        queryset = annotate_dues(self.get_queryset())
+        owes = request.query_params.get('owes', '').lower()
+        if owes in ('1', 'true', 'yes'):
+            queryset = queryset.filter(outstanding_dues__gt=0)
+        elif owes in ('0', 'false', 'no'):
+            queryset = queryset.filter(outstanding_dues=0)
+        queryset = self.filter_queryset(queryset)
+
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            serializer = MemberDuesSerializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+
+        serializer = MemberDuesSerializer(queryset, many=True)
+        return Response(serializer.data)
+
+    @action(detail=False, methods=['get'])
+    def duplicates(self, request):
+        """Members of the same owner sharing a normalized phone number, grouped by number"""
+        queryset = self.get_queryset()
+        same_phone = Member.objects.filter(
+            owner_id=OuterRef('owner_id'),
+            phone_key=OuterRef('phone_key'),
+        ).exclude(pk=OuterRef('pk'))
+        members = queryset.filter(phone_key__isnull=False).filter(
+            Exists(same_phone)
+        ).order_by('owner_id', 'phone_key', 'created_at')
+
+        groups = []
+        for member in members:
+            if not groups or groups[-1]['key'] != (member.owner_id, member.phone_key):
+                groups.append({'key': (member.owner_id, member.phone_key), 'members': []})
+            groups[-1]['members'].append(member)
+
+        return Response([
+            {
+                'phone_key': group['key'][1],
+                'count': len(group['members']),
+                'members': MemberListSerializer(group['members'], many=True).data,
+            }
+            for group in groups
+        ])
+
+
+class TrainerViewSet(ConditionalGetMixin, FastListMixin, viewsets.ModelViewSet):
     """Manage trainers for the logged-in owner"""
+    # A delete also unassigns the trainer's members and removes their payments
+    query_budget = {'list': 3, 'retrieve': 2, 'payroll': 2, 'destroy': 7, 'default': 4}
     permission_classes = [IsAuthenticated]
     filter_backends = [SearchFilter, OrderingFilter]
     search_fields = ['name', 'phone', 'specialization']
@@ -125,24 +331,61 @@ class TrainerViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         serializer.save(owner=self.request.user)
 
+    @action(detail=False, methods=['get'])
+    def payroll(self, request):
+        """
+        Pay for one month (``?month=YYYY-MM``, default current month) per trainer:
+        base salary and/or commission on their PT members' payments, reconciled
+        against the trainer payments recorded for that month.
+        """
+        try:
+            month_start = parse_month(request.query_params.get('month'))
+        except ValueError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        trainers = list(annotate_payroll(self.filter_queryset(self.get_queryset()), month_start))
+        serializer = TrainerPayrollSerializer(trainers, many=True)
+        totals = TrainerPayrollTotalsSerializer({
+            field: sum((getattr(trainer, field) for trainer in trainers), Decimal('0'))
+            for field in ('base_pay', 'commission', 'total_due', 'paid', 'balance')
+        })
+        return Response({
+            'month': month_start.strftime('%Y-%m'),
+            'trainers': serializer.data,
+            'totals': totals.data,
+        })
+
 
-class TrainerPaymentViewSet(viewsets.ModelViewSet):
+class TrainerPaymentViewSet(ConditionalGetMixin, ExportMixin, FastListMixin, viewsets.ModelViewSet):
     """Record and view payments made to trainers"""
+    query_budget = {'list': 3, 'retrieve': 2, 'default': 4}
     permission_classes = [IsAuthenticated]
     serializer_class = TrainerPaymentSerializer
     filter_backends = [OrderingFilter]
     ordering_fields = ['payment_date', 'created_at']
     ordering = ['-payment_date', '-created_at']
+    export_filename = 'trainer-payments'
+    export_fields = {
+        'id': 'id',
+        'trainer': 'trainer_id',
+        'trainer_name': 'trainer__name',
+        'amount': 'amount',
+        'payment_mode': 'payment_mode',
+        'payment_date': 'payment_date',
+        'notes': 'notes',
+        'created_at': 'created_at',
+    }
 
     def get_queryset(self):
         # Superuser sees all trainer payments; owner sees only their trainers' payments
         if self.request.user.is_superuser:
-            return TrainerPayment.objects.all()
-        return TrainerPayment.objects.filter(trainer__owner=self.request.user)
+            return TrainerPayment.objects.select_related('trainer')
+        return TrainerPayment.objects.filter(owner=self.request.user).select_related('trainer')
 
 
-class GymViewSet(viewsets.ModelViewSet):
+class GymViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     """Manage gym profile for each owner (one gym per owner)"""
+    query_budget = 4
     serializer_class = GymSerializer
     permission_classes = [IsAuthenticated]
 
@@ -156,6 +399,9 @@ class GymViewSet(viewsets.ModelViewSet):
         """
         For normal owners, return at most one gym (their own).
         """
+        return self.conditional_response(request, self._list_gyms)
+
+    def _list_gyms(self, request):
         queryset = self.get_queryset()
         # For owners, this will already be filtered to their gym
         serializer = self.get_serializer(queryset, many=True)
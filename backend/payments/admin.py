@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Payment
+from .models import Payment, DailyRevenueRollup
 
 
 @admin.register(Payment)
@@ -8,3 +8,10 @@ class PaymentAdmin(admin.ModelAdmin):
     list_filter = ['payment_mode', 'payment_date']
     search_fields = ['member__name', 'member__phone']
 
+
+
+@admin.register(DailyRevenueRollup)
+class DailyRevenueRollupAdmin(admin.ModelAdmin):
+    list_display = ['owner', 'date', 'plan_type', 'payment_mode', 'total_amount', 'payment_count']
+    list_filter = ['plan_type', 'payment_mode', 'date']
+    search_fields = ['owner__username']
@@ -0,0 +1,28 @@
+"""
+Outstanding dues per member, computed in the database.
+
+``annotate_dues`` adds ``plan_price`` and ``outstanding_dues`` to a Member
+queryset, so any filtered, ordered or paginated member list gets
+its dues in the same single query. Plan prices come from the in-memory plan
+catalog as a CASE on plan_type and the amount paid is the denormalized
+``Member.total_paid`` column, so no join or subquery is involved.
+"""
+from django.db.models import Case, DecimalField, F, Value, When
+from django.db.models.functions import Greatest
+
+from plans.catalog import get_plan_prices
+
+
+MONEY = DecimalField(max_digits=12, decimal_places=2)
+
+
+def annotate_dues(members):
+    """Annotate a Member queryset with plan_price and outstanding_dues"""
+    plan_price = Case(
+        *[When(plan_type=plan_type, then=Value(price)) for plan_type, price in get_plan_prices().items()],
+        default=Value(0),
+        output_field=MONEY,
+    )
+    return members.annotate(plan_price=plan_price).annotate(
+        outstanding_dues=Greatest(F('plan_price') - F('total_paid'), Value(0), output_field=MONEY),
+    )
@@ -0,0 +1,69 @@
+"""
+Django management command to maintain the monthly payment partitions (PostgreSQL)
+Run daily so future months exist before payments arrive: python manage.py manage_payment_partitions
+"""
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from payments.partitions import (
+    archive_partitions, create_partitions, is_partitioned, list_partitions, month_start,
+    partition_payments, partitioning_supported,
+)
+
+
+class Command(BaseCommand):
+    help = 'Create upcoming monthly payment partitions and optionally archive old ones'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--ahead',
+            type=int,
+            default=None,
+            help='Months after the current one to create (default: PAYMENT_PARTITIONS_AHEAD)'
+        )
+        parser.add_argument(
+            '--convert',
+            action='store_true',
+            help='Partition the payments table first if it is a plain table (locks it while rows are copied)'
+        )
+        parser.add_argument(
+            '--archive-before',
+            type=str,
+            default=None,
+            help='Detach the partitions of months before YYYY-MM into PAYMENT_ARCHIVE_SCHEMA'
+        )
+
+    def handle(self, *args, **options):
+        if not partitioning_supported(connection):
+            self.stdout.write(f'Payments are only partitioned on PostgreSQL; nothing to do on {connection.vendor}')
+            return
+
+        cutoff = None
+        if options['archive_before']:
+            try:
+                cutoff = date.fromisoformat(f"{options['archive_before']}-01")
+            except ValueError:
+                raise CommandError('--archive-before must look like YYYY-MM')
+            if cutoff > month_start(timezone.now().date()):
+                raise CommandError('--archive-before cannot include the current month')
+
+        if options['convert'] and partition_payments(connection, options['ahead']):
+            self.stdout.write('Converted payments_payment to monthly partitions')
+        if not is_partitioned(connection):
+            self.stdout.write('payments_payment is not partitioned; run with --convert to partition it')
+            return
+
+        for name in create_partitions(connection, options['ahead']):
+            self.stdout.write(f'Created {name}')
+        if cutoff is not None:
+            for name in archive_partitions(connection, cutoff):
+                self.stdout.write(f'Archived {name}')
+
+        partitions = list_partitions(connection)
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(partitions)} monthly partitions attached, '
+            f'{partitions[0][1]:%Y-%m} to {partitions[-1][1]:%Y-%m}' if partitions else 'No monthly partitions attached'
+        ))
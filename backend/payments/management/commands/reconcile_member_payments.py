@@ -0,0 +1,53 @@
+"""
+Django management command to repair the payment totals stored on members
+Run after raw SQL changes to payments or to check for drift: python manage.py reconcile_member_payments --dry-run
+"""
+from django.core.management.base import BaseCommand
+from django.db import connection
+from payments.partitions import archived_partitions
+from payments.totals import reconcile_member_payment_totals, RECONCILE_BATCH_SIZE
+
+
+class Command(BaseCommand):
+    help = 'Recompute Member.total_paid, payment_count and last_payment_date where they differ from the payments table'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--owner',
+            type=int,
+            default=None,
+            help='Only check members of this owner id (default: all owners)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=RECONCILE_BATCH_SIZE,
+            help=f'Members compared per query (default: {RECONCILE_BATCH_SIZE})'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report drifted members without fixing them'
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write('Reconciling member payment totals...')
+        archived = archived_partitions(connection)
+        if archived:
+            self.stdout.write(self.style.WARNING(
+                f'{len(archived)} archived payment partitions are left out of the recomputed totals (oldest: {archived[0]})'
+            ))
+        result = reconcile_member_payment_totals(
+            owner_id=options['owner'],
+            batch_size=options['batch_size'],
+            dry_run=options['dry_run'],
+        )
+        drifted = result['drifted']
+        if drifted:
+            preview = ', '.join(str(member_id) for member_id in drifted[:20])
+            more = f' (+{len(drifted) - 20} more)' if len(drifted) > 20 else ''
+            self.stdout.write(f'Drifted member ids: {preview}{more}')
+        action = 'would be fixed' if options['dry_run'] else 'fixed'
+        self.stdout.write(self.style.SUCCESS(
+            f"Checked {result['checked']} members: {len(drifted)} {action}"
+        ))
@@ -0,0 +1,59 @@
+# Generated by Django 4.2.7 on 2026-10-18 10:02
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill_rollup(apps, schema_editor):
+    Payment = apps.get_model('payments', 'Payment')
+    DailyRevenueRollup = apps.get_model('payments', 'DailyRevenueRollup')
+    grouped = Payment.objects.order_by().values(
+        'member__owner_id', 'payment_date', 'member__plan_type', 'payment_mode'
+    ).annotate(total=models.Sum('amount'), count=models.Count('id'))
+    batch = []
+    for row in grouped.iterator(chunk_size=1000):
+        batch.append(DailyRevenueRollup(
+            owner_id=row['member__owner_id'],
+            date=row['payment_date'],
+            plan_type=row['member__plan_type'],
+            payment_mode=row['payment_mode'],
+            total_amount=row['total'],
+            payment_count=row['count'],
+        ))
+        if len(batch) >= 1000:
+            DailyRevenueRollup.objects.bulk_create(batch)
+            batch = []
+    DailyRevenueRollup.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('members', '0003_gym'),
+        ('payments', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyRevenueRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('plan_type', models.CharField(choices=[('GENERAL', 'General Training'), ('PT', 'Personal Training')], max_length=10)),
+                ('payment_mode', models.CharField(choices=[('Cash', 'Cash'), ('UPI', 'UPI'), ('Online', 'Online')], max_length=10)),
+                ('total_amount', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('payment_count', models.IntegerField(default=0)),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='revenue_rollups', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-date', 'plan_type', 'payment_mode'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='dailyrevenuerollup',
+            constraint=models.UniqueConstraint(fields=('owner', 'date', 'plan_type', 'payment_mode'), name='unique_daily_revenue_rollup'),
+        ),
+        migrations.RunPython(backfill_rollup, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 4.2.7 on 2026-10-18 11:02
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+BATCH_SIZE = 1000
+
+
+def backfill_owner(apps, schema_editor):
+    """Copy member.owner to every payment, one batch of ids per UPDATE"""
+    Member = apps.get_model('members', 'Member')
+    Payment = apps.get_model('payments', 'Payment')
+    owner_of_member = Member.objects.filter(pk=models.OuterRef('member_id')).values('owner_id')[:1]
+    last_pk = 0
+    while True:
+        batch = list(
+            Payment.objects.filter(pk__gt=last_pk, owner__isnull=True)
+            .order_by('pk')
+            .values_list('pk', flat=True)[:BATCH_SIZE]
+        )
+        if not batch:
+            break
+        Payment.objects.filter(pk__in=batch).update(owner_id=models.Subquery(owner_of_member))
+        last_pk = batch[-1]
+
+
+class Migration(migrations.Migration):
+    # Commit each backfill batch on its own instead of locking every row until the end
+    atomic = False
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('members', '0013_trainerpayment_owner'),
+        ('payments', '0002_dailyrevenuerollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='payment',
+            name='owner',
+            field=models.ForeignKey(editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='payments', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.RunPython(backfill_owner, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='payment',
+            name='owner',
+            field=models.ForeignKey(editable=False, on_delete=django.db.models.deletion.CASCADE, related_name='payments', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['owner', '-payment_date', '-created_at'], name='payment_owner_date_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+from django.conf import settings
+from django.db import migrations
+
+from payments.partitions import partition_payments, unpartition_payments
+
+
+# Only with PAYMENT_PARTITIONING on PostgreSQL; elsewhere the table stays as it is
+def forwards(apps, schema_editor):
+    if settings.PAYMENT_PARTITIONING:
+        partition_payments(schema_editor.connection)
+
+
+def backwards(apps, schema_editor):
+    unpartition_payments(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0003_payment_owner'),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, backwards),
+    ]
@@ -1,5 +1,5 @@
 from django.db import models
-from members.models import Member
+from members.models import Owner, Member, set_owner_from
 
 
 class Payment(models.Model):
@@ -12,6 +12,8 @@ class Payment(models.Model):
     ]
     
     member = models.ForeignKey(Member, on_delete=models.CASCADE, related_name='payments')
+    # Copy of member.owner kept on save, so owner-scoped queries need no join
+    owner = models.ForeignKey(Owner, on_delete=models.CASCADE, related_name='payments', editable=False)
     amount = models.DecimalField(max_digits=10, decimal_places=2)
     payment_mode = models.CharField(max_length=10, choices=PAYMENT_MODE_CHOICES)
     payment_date = models.DateField()
@@ -22,8 +24,36 @@ class Payment(models.Model):
         ordering = ['-payment_date', '-created_at']
         indexes = [
             models.Index(fields=['member', 'payment_date']),
+            # Owner-scoped lists in the default ordering and per-owner date ranges
+            models.Index(fields=['owner', '-payment_date', '-created_at'], name='payment_owner_date_idx'),
         ]
     
     def __str__(self):
         return f"{self.member.name} - ₹{self.amount} - {self.payment_date}"
 
+    def save(self, *args, **kwargs):
+        kwargs['update_fields'] = set_owner_from(self, 'member', kwargs.get('update_fields'))
+        super().save(*args, **kwargs)
+
+
+
+class DailyRevenueRollup(models.Model):
+    """Payment totals per owner, day, plan type and payment mode"""
+    owner = models.ForeignKey(Owner, on_delete=models.CASCADE, related_name='revenue_rollups')
+    date = models.DateField()
+    plan_type = models.CharField(max_length=10, choices=Member.PLAN_TYPE_CHOICES)
+    payment_mode = models.CharField(max_length=10, choices=Payment.PAYMENT_MODE_CHOICES)
+    total_amount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    payment_count = models.IntegerField(default=0)
+
+    class Meta:
+        ordering = ['-date', 'plan_type', 'payment_mode']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['owner', 'date', 'plan_type', 'payment_mode'],
+                name='unique_daily_revenue_rollup',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.owner} - {self.date} - {self.plan_type}/{self.payment_mode} - ₹{self.total_amount}"
@@ -0,0 +1,240 @@
+"""
+Optional PostgreSQL partitioning of the payments table by payment_date month.
+
+With PAYMENT_PARTITIONING set when migration 0004 runs (or after
+``python manage.py manage_payment_partitions --convert``), ``payments_payment``
+is a range-partitioned table with one partition per month
+(``payments_payment_p202610``) and a default partition for dates outside
+them. Queries on recent dates, like the dashboard's recent payments and the
+owner-scoped lists ordered by date, then read the newest partitions first and
+skip the rest.
+
+The primary key becomes (id, payment_date), since PostgreSQL requires the
+partition key in it; ids still come from one sequence and stay unique.
+
+``manage_payment_partitions`` creates the partitions ahead of time (daily
+cron) and can detach old ones into PAYMENT_ARCHIVE_SCHEMA. Archived payments
+leave the API but stay counted in the stored member totals and the revenue
+rollup; reconcile_member_payments and rebuild_revenue_rollup recompute those
+from the attached payments only.
+
+Other databases keep the plain table and every function here is a no-op.
+"""
+import re
+from datetime import date
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+
+PARENT = 'payments_payment'
+DEFAULT_PARTITION = f'{PARENT}_default'
+SEQUENCE = f'{PARENT}_id_seq'
+PRIMARY_KEY = f'{PARENT}_pkey'
+
+_BOUND = re.compile(r"FROM \('([\d-]+)'\) TO \('([\d-]+)'\)")
+_INDEX_TABLE = re.compile(r' ON (?:ONLY )?\S+ USING ')
+
+
+def month_start(day):
+    return day.replace(day=1)
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month):
+    return f'{PARENT}_p{month:%Y%m}'
+
+
+def partitioning_supported(connection):
+    return connection.vendor == 'postgresql'
+
+
+def is_partitioned(connection):
+    if not partitioning_supported(connection):
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)', [PARENT])
+        row = cursor.fetchone()
+    return row is not None and row[0] == 'p'
+
+
+def list_partitions(connection):
+    """[(name, first day, first day after)] of the monthly partitions, oldest first"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) FROM pg_inherits i '
+            'JOIN pg_class c ON c.oid = i.inhrelid WHERE i.inhparent = to_regclass(%s)',
+            [PARENT],
+        )
+        rows = cursor.fetchall()
+    partitions = []
+    for name, bound in rows:
+        match = _BOUND.search(bound)
+        if match:
+            partitions.append((name, date.fromisoformat(match[1]), date.fromisoformat(match[2])))
+    return sorted(partitions, key=lambda partition: partition[1])
+
+
+def _table_definition(cursor, table):
+    """Index and foreign key DDL of ``table``, except the primary key, rewritten for PARENT"""
+    quote = cursor.db.ops.quote_name
+    cursor.execute(
+        'SELECT pg_get_indexdef(x.indexrelid) FROM pg_index x '
+        'WHERE x.indrelid = to_regclass(%s) AND NOT x.indisprimary',
+        [table],
+    )
+    statements = [_INDEX_TABLE.sub(f' ON {quote(PARENT)} USING ', row[0], count=1) for row in cursor.fetchall()]
+    cursor.execute(
+        "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+        "WHERE conrelid = to_regclass(%s) AND contype = 'f'",
+        [table],
+    )
+    statements += [
+        f'ALTER TABLE {quote(PARENT)} ADD CONSTRAINT {quote(name)} {definition}'
+        for name, definition in cursor.fetchall()
+    ]
+    return statements
+
+
+def _replace_parent(cursor, partitioned, months_ahead):
+    """Copy PARENT into a new (un)partitioned table of the same name and definition"""
+    quote = cursor.db.ops.quote_name
+    old = f'{PARENT}_old'
+    cursor.execute(f'ALTER TABLE {quote(PARENT)} RENAME TO {quote(old)}')
+    definition = _table_definition(cursor, old)
+
+    partition_clause = ' PARTITION BY RANGE (payment_date)' if partitioned else ''
+    cursor.execute(
+        f'CREATE TABLE {quote(PARENT)} (LIKE {quote(old)} INCLUDING DEFAULTS INCLUDING STORAGE){partition_clause}'
+    )
+    # The id default belongs to the old table; a new sequence is created below
+    cursor.execute(f'ALTER TABLE {quote(PARENT)} ALTER COLUMN id DROP DEFAULT')
+    if partitioned:
+        cursor.execute(f'SELECT MIN(payment_date) FROM {quote(old)}')
+        today = timezone.now().date()
+        first = month_start(cursor.fetchone()[0] or today)
+        last = add_months(month_start(today), months_ahead)
+        month = first
+        while month <= last:
+            cursor.execute(
+                f'CREATE TABLE {quote(partition_name(month))} PARTITION OF {quote(PARENT)} '
+                f'FOR VALUES FROM (%s) TO (%s)',
+                [month, add_months(month, 1)],
+            )
+            month = add_months(month, 1)
+        cursor.execute(f'CREATE TABLE {quote(DEFAULT_PARTITION)} PARTITION OF {quote(PARENT)} DEFAULT')
+
+    cursor.execute(f'INSERT INTO {quote(PARENT)} SELECT * FROM {quote(old)}')
+    cursor.execute(f'SELECT MAX(id) FROM {quote(old)}')
+    last_id = cursor.fetchone()[0]
+    # Partitions are dropped with a partitioned table; detached (archived) ones are not
+    cursor.execute(f'DROP TABLE {quote(old)}')
+
+    if partitioned:
+        cursor.execute(f'CREATE SEQUENCE {quote(SEQUENCE)} OWNED BY {quote(PARENT)}.id')
+        cursor.execute(f"ALTER TABLE {quote(PARENT)} ALTER COLUMN id SET DEFAULT nextval('{SEQUENCE}')")
+        if last_id is not None:
+            cursor.execute('SELECT setval(%s, %s)', [SEQUENCE, last_id])
+        cursor.execute(f'ALTER TABLE {quote(PARENT)} ADD CONSTRAINT {quote(PRIMARY_KEY)} PRIMARY KEY (id, payment_date)')
+    else:
+        cursor.execute(
+            f'ALTER TABLE {quote(PARENT)} ALTER COLUMN id ADD GENERATED BY DEFAULT AS IDENTITY '
+            f'(SEQUENCE NAME {quote(SEQUENCE)} START WITH {(last_id or 0) + 1})'
+        )
+        cursor.execute(f'ALTER TABLE {quote(PARENT)} ADD CONSTRAINT {quote(PRIMARY_KEY)} PRIMARY KEY (id)')
+    for statement in definition:
+        cursor.execute(statement)
+
+
+def partition_payments(connection, months_ahead=None):
+    """Turn the plain payments table into monthly partitions; False when not applicable"""
+    if not partitioning_supported(connection) or is_partitioned(connection):
+        return False
+    with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+        _replace_parent(cursor, True, settings.PAYMENT_PARTITIONS_AHEAD if months_ahead is None else months_ahead)
+    return True
+
+
+def unpartition_payments(connection):
+    """Turn the partitioned payments table back into a plain one (archived partitions stay archived)"""
+    if not is_partitioned(connection):
+        return False
+    with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+        _replace_parent(cursor, False, 0)
+    return True
+
+
+def create_partitions(connection, months_ahead=None, today=None):
+    """Create the missing partitions from this month to ``months_ahead`` months ahead; returns their names"""
+    if not is_partitioned(connection):
+        return []
+    months_ahead = settings.PAYMENT_PARTITIONS_AHEAD if months_ahead is None else months_ahead
+    quote = connection.ops.quote_name
+    existing = {start for _, start, _ in list_partitions(connection)}
+    first = month_start(today or timezone.now().date())
+    created = []
+    for month in (add_months(first, offset) for offset in range(months_ahead + 1)):
+        if month in existing:
+            continue
+        name, end = partition_name(month), add_months(month, 1)
+        with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+            # Rows for this month may already sit in the default partition; move
+            # them before attaching, since the two ranges may not overlap
+            cursor.execute(f'CREATE TABLE {quote(name)} (LIKE {quote(PARENT)} INCLUDING DEFAULTS INCLUDING STORAGE)')
+            cursor.execute(
+                f'WITH moved AS (DELETE FROM {quote(DEFAULT_PARTITION)} '
+                f'WHERE payment_date >= %s AND payment_date < %s RETURNING *) '
+                f'INSERT INTO {quote(name)} SELECT * FROM moved',
+                [month, end],
+            )
+            cursor.execute(
+                f'ALTER TABLE {quote(PARENT)} ATTACH PARTITION {quote(name)} FOR VALUES FROM (%s) TO (%s)',
+                [month, end],
+            )
+        created.append(name)
+    return created
+
+
+def archive_partitions(connection, before, schema=None):
+    """
+    Detach the monthly partitions that end on or before the month of ``before``
+    and move them to ``schema``; returns their names
+    """
+    if not is_partitioned(connection):
+        return []
+    schema = schema or settings.PAYMENT_ARCHIVE_SCHEMA
+    quote = connection.ops.quote_name
+    cutoff = month_start(before)
+    archived = []
+    for name, _, end in list_partitions(connection):
+        if end > cutoff:
+            break
+        with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+            cursor.execute(f'CREATE SCHEMA IF NOT EXISTS {quote(schema)}')
+            cursor.execute(f'ALTER TABLE {quote(PARENT)} DETACH PARTITION {quote(name)}')
+            # Archived rows must not keep members or owners from being deleted
+            cursor.execute(
+                "SELECT conname FROM pg_constraint WHERE conrelid = to_regclass(%s) AND contype = 'f'", [name]
+            )
+            for (constraint,) in cursor.fetchall():
+                cursor.execute(f'ALTER TABLE {quote(name)} DROP CONSTRAINT {quote(constraint)}')
+            cursor.execute(f'ALTER TABLE {quote(name)} SET SCHEMA {quote(schema)}')
+        archived.append(name)
+    return archived
+
+
+def archived_partitions(connection):
+    """Names of the payment partitions in PAYMENT_ARCHIVE_SCHEMA"""
+    if not partitioning_supported(connection):
+        return []
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT tablename FROM pg_tables WHERE schemaname = %s AND tablename LIKE %s ORDER BY tablename',
+            [settings.PAYMENT_ARCHIVE_SCHEMA, f'{PARENT}_p%'],
+        )
+        return [row[0] for row in cursor.fetchall()]
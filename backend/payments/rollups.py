@@ -0,0 +1,138 @@
+"""
+Maintenance of the DailyRevenueRollup table.
+
+Every payment contributes its amount to the rollup row keyed by
+(owner, payment_date, member plan_type, payment_mode). Rows are adjusted with
+F() expressions so concurrent writers never lose an update; the
+``rebuild_revenue_rollup`` command recomputes the table from scratch.
+"""
+import logging
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Exists, F, OuterRef, Subquery, Sum
+
+from members.models import Member
+from .models import DailyRevenueRollup, Payment
+
+
+REBUILD_BATCH_SIZE = 1000
+
+logger = logging.getLogger(__name__)
+
+
+def payment_rollup_key(payment):
+    """
+    Return (owner_id, date, plan_type, payment_mode) for a payment instance.
+    The plan type is read from the member's row: a member cached on the
+    payment may be stale.
+    """
+    plan_type = Member.objects.filter(pk=payment.member_id).values_list('plan_type', flat=True).get()
+    return payment.owner_id, payment.payment_date, plan_type, payment.payment_mode
+
+
+def stored_payment_rollup(payment_id):
+    """Return (key, amount, member_id) for a payment as currently stored, or None"""
+    row = Payment.objects.filter(pk=payment_id).values_list(
+        'owner_id', 'payment_date', 'member__plan_type', 'payment_mode', 'amount', 'member_id'
+    ).first()
+    if row is None:
+        return None
+    return row[:4], row[4], row[5]
+
+
+def apply_rollup_delta(key, amount, count):
+    """Add ``amount``/``count`` to the rollup row for ``key``, creating it if needed"""
+    owner_id, day, plan_type, payment_mode = key
+    rows = DailyRevenueRollup.objects.filter(
+        owner_id=owner_id, date=day, plan_type=plan_type, payment_mode=payment_mode
+    )
+    if rows.update(total_amount=F('total_amount') + amount, payment_count=F('payment_count') + count):
+        return
+    if count < 0:
+        # Payments deleted with their owner or member never get here, so the
+        # rollup no longer matches the payments table
+        logger.warning(
+            'No revenue rollup row for %s to subtract %s payment(s) from; run rebuild_revenue_rollup --owner %s',
+            key, -count, owner_id,
+        )
+        return
+    try:
+        with transaction.atomic():
+            DailyRevenueRollup.objects.create(
+                owner_id=owner_id, date=day, plan_type=plan_type, payment_mode=payment_mode,
+                total_amount=amount, payment_count=count,
+            )
+    except IntegrityError:
+        # Another writer created the row first
+        rows.update(total_amount=F('total_amount') + amount, payment_count=F('payment_count') + count)
+
+
+def remove_member_revenue(member_id):
+    """
+    Subtract all of a member's payments from the rollup before they are
+    deleted, with one UPDATE however many days they span
+    """
+    payments = Payment.objects.filter(member_id=member_id).order_by()
+    per_row = payments.filter(
+        owner_id=OuterRef('owner_id'), payment_date=OuterRef('date'),
+        member__plan_type=OuterRef('plan_type'), payment_mode=OuterRef('payment_mode'),
+    ).values('member_id')
+    updated = DailyRevenueRollup.objects.filter(Exists(per_row)).update(
+        total_amount=F('total_amount') - Subquery(per_row.annotate(total=Sum('amount')).values('total')),
+        payment_count=F('payment_count') - Subquery(per_row.annotate(count=Count('id')).values('count')),
+    )
+    expected = payments.values('owner_id', 'payment_date', 'member__plan_type', 'payment_mode').distinct().count()
+    if updated < expected:
+        logger.warning(
+            'Revenue rollup is missing %s row(s) for member %s; run rebuild_revenue_rollup',
+            expected - updated, member_id,
+        )
+
+
+def move_member_revenue(member, old_plan_type, old_owner_id=None):
+    """Move a member's payments between buckets after a plan or owner change"""
+    if old_owner_id is None:
+        old_owner_id = member.owner_id
+    per_day = Payment.objects.filter(member=member).values('payment_date', 'payment_mode').annotate(
+        total=Sum('amount'), count=Count('id')
+    )
+    for row in per_day:
+        old_key = (old_owner_id, row['payment_date'], old_plan_type, row['payment_mode'])
+        new_key = (member.owner_id, row['payment_date'], member.plan_type, row['payment_mode'])
+        apply_rollup_delta(old_key, -row['total'], -row['count'])
+        apply_rollup_delta(new_key, row['total'], row['count'])
+
+
+def rebuild_revenue_rollup(owner_id=None, batch_size=REBUILD_BATCH_SIZE):
+    """Recompute rollup rows from the payments table; returns the number of rows written"""
+    payments = Payment.objects.all()
+    rollups = DailyRevenueRollup.objects.all()
+    if owner_id is not None:
+        payments = payments.filter(owner_id=owner_id)
+        rollups = rollups.filter(owner_id=owner_id)
+
+    grouped = payments.order_by().values(
+        'owner_id', 'payment_date', 'member__plan_type', 'payment_mode'
+    ).annotate(total=Sum('amount'), count=Count('id'))
+
+    written = 0
+    with transaction.atomic():
+        rollups.delete()
+        batch = []
+        for row in grouped.iterator(chunk_size=batch_size):
+            batch.append(DailyRevenueRollup(
+                owner_id=row['owner_id'],
+                date=row['payment_date'],
+                plan_type=row['member__plan_type'],
+                payment_mode=row['payment_mode'],
+                total_amount=row['total'],
+                payment_count=row['count'],
+            ))
+            if len(batch) >= batch_size:
+                DailyRevenueRollup.objects.bulk_create(batch)
+                written += len(batch)
+                batch = []
+        if batch:
+            DailyRevenueRollup.objects.bulk_create(batch)
+            written += len(batch)
+    return written
@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from .models import Payment
+from members.models import Member
 from members.serializers import MemberListSerializer
 
 
@@ -19,7 +20,7 @@ class PaymentSerializer(serializers.ModelSerializer):
         request = self.context.get('request')
         if member and request:
             # Superusers can create payments for any member
-            if not request.user.is_superuser and member.owner != request.user:
+            if not request.user.is_superuser and member.owner_id != request.user.pk:
                 raise serializers.ValidationError({
                     'member': 'You can only create payments for your own members.'
                 })
@@ -38,3 +39,16 @@ class PaymentListSerializer(serializers.ModelSerializer):
             'payment_mode', 'payment_date', 'created_at'
         )
 
+
+
+class MemberDuesSerializer(serializers.ModelSerializer):
+    """Member with the dues annotated by payments.dues.annotate_dues"""
+    plan_price = serializers.DecimalField(max_digits=12, decimal_places=2, read_only=True)
+    outstanding_dues = serializers.DecimalField(max_digits=12, decimal_places=2, read_only=True)
+
+    class Meta:
+        model = Member
+        fields = (
+            'id', 'name', 'phone', 'plan_type', 'status', 'end_date',
+            'plan_price', 'total_paid', 'payment_count', 'last_payment_date', 'outstanding_dues'
+        )
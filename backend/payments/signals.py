@@ -0,0 +1,91 @@
+"""
+Keep DailyRevenueRollup and the Member payment totals in sync with payment
+and member writes, move a member's payments along when the member changes
+owner, and move the owner's conditional GET stamp on payment writes
+"""
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from members.models import Member, Owner
+from members.signals import bump_owner_on_commit, previous_owner_id
+from .models import Payment
+from .rollups import (
+    apply_rollup_delta, move_member_revenue, payment_rollup_key, remove_member_revenue, stored_payment_rollup,
+)
+from .totals import add_payment_to_member, adjust_member_totals
+
+
+@receiver(pre_save, sender=Payment, dispatch_uid='rollup_payment_pre_save')
+def remember_previous_payment(sender, instance, raw=False, **kwargs):
+    instance._rollup_previous = None
+    if instance.pk and not raw:
+        instance._rollup_previous = stored_payment_rollup(instance.pk)
+
+
+@receiver(post_save, sender=Payment, dispatch_uid='rollup_payment_saved')
+def apply_payment_to_rollup(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_rollup_previous', None)
+    if previous is not None:
+        previous_key, previous_amount, previous_member_id = previous
+        apply_rollup_delta(previous_key, -previous_amount, -1)
+    apply_rollup_delta(payment_rollup_key(instance), instance.amount, 1)
+
+    if previous is None:
+        add_payment_to_member(instance.member_id, instance.amount, instance.payment_date)
+    elif previous_member_id == instance.member_id:
+        adjust_member_totals(instance.member_id, instance.amount - previous_amount, 0)
+    else:
+        adjust_member_totals(previous_member_id, -previous_amount, -1)
+        add_payment_to_member(instance.member_id, instance.amount, instance.payment_date)
+
+
+def _deleted_with(origin, model):
+    # ``origin`` is the instance or queryset whose delete() cascaded here
+    return isinstance(origin, model) or (isinstance(origin, QuerySet) and origin.model is model)
+
+
+@receiver(post_delete, sender=Payment, dispatch_uid='rollup_payment_deleted')
+def remove_payment_from_rollup(sender, instance, origin=None, **kwargs):
+    # The owner's rollup rows go in the same delete; a member's payments were
+    # subtracted in one pass before it was deleted
+    if _deleted_with(origin, Owner) or _deleted_with(origin, Member):
+        return
+    apply_rollup_delta(payment_rollup_key(instance), -instance.amount, -1)
+    adjust_member_totals(instance.member_id, -instance.amount, -1)
+
+
+@receiver(pre_delete, sender=Member, dispatch_uid='rollup_member_pre_delete')
+def remove_member_from_rollup(sender, instance, origin=None, **kwargs):
+    if not _deleted_with(origin, Owner):
+        remove_member_revenue(instance.pk)
+
+
+@receiver(pre_save, sender=Member, dispatch_uid='rollup_member_pre_save')
+def remember_previous_plan_type(sender, instance, raw=False, **kwargs):
+    instance._rollup_previous_plan_type = None
+    if instance.pk and not raw:
+        instance._rollup_previous_plan_type = Member.objects.filter(
+            pk=instance.pk
+        ).values_list('plan_type', flat=True).first()
+
+
+@receiver(post_save, sender=Member, dispatch_uid='rollup_member_saved')
+def move_revenue_on_member_change(sender, instance, created=False, raw=False, **kwargs):
+    previous_plan_type = getattr(instance, '_rollup_previous_plan_type', None)
+    if created or raw or not previous_plan_type:
+        return
+    previous_owner = previous_owner_id(instance)
+    if previous_owner is not None:
+        # Payments carry their member's owner, which scopes every payment query
+        Payment.objects.filter(member=instance).update(owner_id=instance.owner_id)
+    if previous_plan_type != instance.plan_type or previous_owner is not None:
+        move_member_revenue(instance, previous_plan_type, previous_owner or instance.owner_id)
+
+
+@receiver(post_save, sender=Payment, dispatch_uid='conditional_payment_saved')
+@receiver(post_delete, sender=Payment, dispatch_uid='conditional_payment_deleted')
+def bump_on_payment_change(sender, instance, **kwargs):
+    bump_owner_on_commit(instance.owner_id)
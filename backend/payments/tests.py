@@ -0,0 +1,235 @@
+from datetime import timedelta
+from decimal import Decimal
+from unittest import skipUnless
+
+from django.conf import settings
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from django.utils import timezone
+
+from members.models import Member, Owner
+from .models import DailyRevenueRollup, Payment
+from .partitions import (
+    add_months, archive_partitions, archived_partitions, create_partitions, is_partitioned, list_partitions,
+    month_start, partition_name, partition_payments, unpartition_payments,
+)
+
+
+class RevenueRollupDeleteTests(TestCase):
+    def setUp(self):
+        self.today = timezone.now().date()
+        self.owner = Owner.objects.create_user(username='rollup-owner', password='rollup-pass-123')
+        self.member = self.create_member('Paying')
+        for amount in ('1000', '500'):
+            Payment.objects.create(member=self.member, amount=Decimal(amount), payment_mode='Cash', payment_date=self.today)
+
+    def create_member(self, name, owner=None):
+        return Member.objects.create(
+            owner=owner or self.owner, name=name, phone='9876543210', plan_type='GENERAL',
+            start_date=self.today - timedelta(days=10), end_date=self.today + timedelta(days=20),
+        )
+
+    def rollup(self, owner=None):
+        return list(
+            DailyRevenueRollup.objects.filter(owner=owner or self.owner).values_list('total_amount', 'payment_count')
+        )
+
+    def test_deleting_owner_with_payments(self):
+        other = Owner.objects.create_user(username='rollup-other', password='rollup-pass-123')
+        Payment.objects.create(member=self.create_member('Other', other), amount=Decimal('300'),
+                               payment_mode='Cash', payment_date=self.today)
+
+        self.owner.delete()
+
+        self.assertFalse(Owner.objects.filter(username='rollup-owner').exists())
+        self.assertFalse(DailyRevenueRollup.objects.filter(owner_id=self.owner.pk).exists())
+        self.assertEqual(self.rollup(other), [(Decimal('300'), 1)])
+
+    def test_deleting_owners_through_queryset(self):
+        Owner.objects.filter(pk=self.owner.pk).delete()
+        self.assertFalse(DailyRevenueRollup.objects.exists())
+
+    def test_deleting_member_removes_its_revenue(self):
+        keep = self.create_member('Keep')
+        Payment.objects.create(member=keep, amount=Decimal('200'), payment_mode='Cash', payment_date=self.today)
+
+        self.member.delete()
+
+        self.assertEqual(self.rollup(), [(Decimal('200'), 1)])
+
+    def test_deleting_payment_updates_rollup_and_member(self):
+        Payment.objects.filter(amount=Decimal('500')).get().delete()
+
+        self.assertEqual(self.rollup(), [(Decimal('1000'), 1)])
+        self.member.refresh_from_db()
+        self.assertEqual((self.member.total_paid, self.member.payment_count), (Decimal('1000'), 1))
+
+    def test_removal_never_creates_a_rollup_row(self):
+        DailyRevenueRollup.objects.all().delete()
+        with self.assertLogs('payments.rollups', 'WARNING') as logs:
+            Payment.objects.filter(amount=Decimal('500')).get().delete()
+        self.assertEqual(self.rollup(), [])
+        self.assertIn('rebuild_revenue_rollup', logs.output[0])
+
+    def test_member_delete_reports_missing_rollup_rows(self):
+        DailyRevenueRollup.objects.all().delete()
+        with self.assertLogs('payments.rollups', 'WARNING') as logs:
+            self.member.delete()
+        self.assertIn('missing 1 row(s)', logs.output[0])
+
+    def delete_queries(self, payments):
+        member = self.create_member(f'Deleted with {payments}')
+        for i in range(payments):
+            # One rollup row per payment, so a per-row update would show
+            Payment.objects.create(member=member, amount=Decimal('10'), payment_mode='UPI' if i % 2 else 'Cash',
+                                   payment_date=self.today - timedelta(days=i + 1))
+        with CaptureQueriesContext(connection) as queries:
+            member.delete()
+        return len(queries)
+
+    def test_member_delete_does_not_query_per_payment(self):
+        self.assertEqual(self.delete_queries(2), self.delete_queries(21))
+        self.assertEqual(
+            list(DailyRevenueRollup.objects.exclude(payment_count=0).values_list('total_amount', 'payment_count')),
+            [(Decimal('1500'), 2)],
+        )
+
+    def test_stale_cached_member_plan(self):
+        payment = Payment.objects.select_related('member').filter(amount=Decimal('500')).get()
+        self.member.plan_type = 'PT'
+        self.member.save()
+        # payment.member still says GENERAL
+        payment.delete()
+
+        self.assertEqual(
+            list(DailyRevenueRollup.objects.filter(owner=self.owner).exclude(payment_count=0).values_list(
+                'plan_type', 'total_amount', 'payment_count'
+            )),
+            [('PT', Decimal('1000'), 1)],
+        )
+
+
+class MemberOwnerChangeTests(TestCase):
+    def setUp(self):
+        self.today = timezone.now().date()
+        self.owner = Owner.objects.create_user(username='moving-owner', password='moving-pass-123')
+        self.other = Owner.objects.create_user(username='moving-other', password='moving-pass-123')
+        self.member = Member.objects.create(
+            owner=self.owner, name='Moving', phone='9876543210', plan_type='GENERAL',
+            start_date=self.today - timedelta(days=10), end_date=self.today + timedelta(days=20),
+        )
+        for amount in ('1000', '500'):
+            Payment.objects.create(member=self.member, amount=Decimal(amount), payment_mode='Cash', payment_date=self.today)
+
+    def rollup(self, owner):
+        return list(DailyRevenueRollup.objects.filter(owner=owner).exclude(payment_count=0).values_list(
+            'plan_type', 'total_amount', 'payment_count'
+        ))
+
+    def listed_payments(self, owner):
+        client = APIClient()
+        client.force_authenticate(owner)
+        return [row['id'] for row in client.get('/api/payments/').data['results']]
+
+    def test_payments_follow_the_member(self):
+        self.member.owner = self.other
+        self.member.save()
+
+        self.assertEqual(set(Payment.objects.values_list('owner_id', flat=True)), {self.other.pk})
+        self.assertEqual(self.rollup(self.owner), [])
+        self.assertEqual(self.rollup(self.other), [('GENERAL', Decimal('1500'), 2)])
+        self.assertEqual(self.listed_payments(self.owner), [])
+        self.assertEqual(len(self.listed_payments(self.other)), 2)
+
+    def test_owner_and_plan_change_together(self):
+        self.member.owner = self.other
+        self.member.plan_type = 'PT'
+        self.member.save()
+
+        self.assertEqual(self.rollup(self.owner), [])
+        self.assertEqual(self.rollup(self.other), [('PT', Decimal('1500'), 2)])
+
+    def test_saves_without_owner_change_leave_payments(self):
+        self.member.name = 'Staying'
+        self.member.save()
+        self.member.save(update_fields=['name'])
+
+        self.assertEqual(set(Payment.objects.values_list('owner_id', flat=True)), {self.owner.pk})
+        self.assertEqual(self.rollup(self.owner), [('GENERAL', Decimal('1500'), 2)])
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Payment partitioning needs PostgreSQL')
+class PaymentPartitionTests(TransactionTestCase):
+    def setUp(self):
+        self.this_month = month_start(timezone.now().date())
+        owner = Owner.objects.create_user(username='partition-owner', password='partition-pass-123')
+        self.member = Member.objects.create(
+            owner=owner, name='Partitioned', phone='9876543210', plan_type='GENERAL',
+            start_date=self.this_month, end_date=self.this_month + timedelta(days=30),
+        )
+        for months_ago in (0, 3, 12):
+            self.pay(add_months(self.this_month, -months_ago))
+        # Leave a plain table behind whatever the test did; archived partitions go first
+        self.addCleanup(unpartition_payments, connection)
+        self.addCleanup(self.drop_archive)
+
+    def pay(self, day):
+        return Payment.objects.create(member=self.member, amount=Decimal('100'), payment_mode='Cash', payment_date=day)
+
+    def drop_archive(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DROP SCHEMA IF EXISTS {connection.ops.quote_name(settings.PAYMENT_ARCHIVE_SCHEMA)} CASCADE')
+
+    def migrate(self, target):
+        executor = MigrationExecutor(connection)
+        executor.migrate([('payments', target)])
+
+    def partition_rows(self, name):
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT COUNT(*) FROM {connection.ops.quote_name(name)}')
+            return cursor.fetchone()[0]
+
+    def test_migration_forward_and_back(self):
+        with self.settings(PAYMENT_PARTITIONING=True):
+            self.migrate('0003_payment_owner')
+            self.migrate('0004_partition_payments')
+        self.assertTrue(is_partitioned(connection))
+        names = [name for name, _, _ in list_partitions(connection)]
+        self.assertEqual(names[0], partition_name(add_months(self.this_month, -12)))
+        self.assertEqual(self.partition_rows(partition_name(add_months(self.this_month, -3))), 1)
+        # New rows still draw ids from one sequence
+        ids = {self.pay(self.this_month).pk, self.pay(add_months(self.this_month, -3)).pk}
+        self.assertEqual(len(ids), 2)
+        self.assertEqual(Payment.objects.count(), 5)
+
+        self.migrate('0003_payment_owner')
+        self.assertFalse(is_partitioned(connection))
+        self.assertEqual(Payment.objects.count(), 5)
+        self.assertNotIn(self.pay(self.this_month).pk, ids)
+        self.migrate('0004_partition_payments')
+        self.assertFalse(is_partitioned(connection))
+
+    def test_create_and_archive_partitions(self):
+        self.assertTrue(partition_payments(connection, months_ahead=1))
+
+        created = create_partitions(connection, months_ahead=3)
+        self.assertEqual(created, [partition_name(add_months(self.this_month, months)) for months in (2, 3)])
+        self.assertEqual(create_partitions(connection, months_ahead=3), [])
+
+        # A row beyond the last partition lands in the default one and moves into the new month
+        far = add_months(self.this_month, 6)
+        self.pay(far)
+        self.assertEqual(create_partitions(connection, months_ahead=6)[-1], partition_name(far))
+        self.assertEqual(self.partition_rows(partition_name(far)), 1)
+
+        archived = archive_partitions(connection, before=add_months(self.this_month, -2))
+        self.assertEqual(archived[0], partition_name(add_months(self.this_month, -12)))
+        self.assertEqual(archived[-1], partition_name(add_months(self.this_month, -3)))
+        self.assertEqual(archived_partitions(connection), sorted(archived))
+        # Archived months leave the table, and their member can still be deleted
+        self.assertEqual(Payment.objects.count(), 2)
+        self.member.delete()
+        self.assertFalse(Payment.objects.exists())
@@ -0,0 +1,96 @@
+"""
+Maintenance of the denormalized payment totals on Member.
+
+``total_paid``, ``payment_count`` and ``last_payment_date`` are adjusted with
+single UPDATE statements (F() expressions, or a subquery for the last payment
+date when a payment goes away), so concurrent payment writes never lose an
+update. ``reconcile_member_payment_totals`` recomputes them from the payments
+table and fixes any member that drifted.
+"""
+from django.db.models import Count, DateField, F, Max, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from gym_management.conditional import bump_all_change_versions
+from members.models import Member
+from .models import Payment
+
+
+RECONCILE_BATCH_SIZE = 1000
+
+
+def _member_payments():
+    return Payment.objects.filter(member=OuterRef('pk')).order_by().values('member')
+
+
+def computed_payment_totals():
+    """Expressions that recompute every payment total of a member from its payments"""
+    payments = _member_payments()
+    return {
+        'total_paid': Coalesce(
+            Subquery(payments.annotate(total=Sum('amount')).values('total')), Value(0),
+            output_field=Member._meta.get_field('total_paid'),
+        ),
+        'payment_count': Coalesce(Subquery(payments.annotate(count=Count('id')).values('count')), Value(0)),
+        'last_payment_date': Subquery(payments.annotate(last=Max('payment_date')).values('last')),
+    }
+
+
+def add_payment_to_member(member_id, amount, payment_date):
+    """Count a new payment in the member's totals"""
+    Member.objects.filter(pk=member_id).update(
+        total_paid=F('total_paid') + amount,
+        payment_count=F('payment_count') + 1,
+        last_payment_date=Greatest(
+            Coalesce(F('last_payment_date'), Value(payment_date)), Value(payment_date),
+            output_field=DateField(),
+        ),
+    )
+
+
+def adjust_member_totals(member_id, amount, count):
+    """
+    Add ``amount``/``count`` (usually negative) after a payment was removed or
+    changed, and recompute the last payment date from the remaining payments
+    """
+    Member.objects.filter(pk=member_id).update(
+        total_paid=F('total_paid') + amount,
+        payment_count=F('payment_count') + count,
+        last_payment_date=computed_payment_totals()['last_payment_date'],
+    )
+
+
+def reconcile_member_payment_totals(owner_id=None, batch_size=RECONCILE_BATCH_SIZE, dry_run=False):
+    """
+    Compare the stored totals with the payments table, ``batch_size`` members
+    at a time, and recompute the ones that differ. Returns the number of
+    members checked and the ids of those that had drifted.
+    """
+    members = Member.objects.all()
+    if owner_id is not None:
+        members = members.filter(owner_id=owner_id)
+    computed = computed_payment_totals()
+
+    checked, drifted = 0, []
+    last_id = 0
+    while True:
+        batch = list(
+            members.filter(id__gt=last_id).order_by('id')
+            .annotate(**{f'computed_{name}': expression for name, expression in computed.items()})
+            .values('id', *Member.PAYMENT_TOTAL_FIELDS, *[f'computed_{name}' for name in computed])[:batch_size]
+        )
+        if not batch:
+            break
+        checked += len(batch)
+        last_id = batch[-1]['id']
+        ids = [
+            row['id'] for row in batch
+            if any(row[name] != row[f'computed_{name}'] for name in Member.PAYMENT_TOTAL_FIELDS)
+        ]
+        if ids and not dry_run:
+            # Recompute in the UPDATE itself so payments written meanwhile are included
+            Member.objects.filter(id__in=ids).update(**computed)
+        drifted.extend(ids)
+
+    if drifted and not dry_run:
+        bump_all_change_versions()
+    return {'checked': checked, 'drifted': drifted}
@@ -2,25 +2,45 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from django.db.models import Sum, Q
-from django.utils import timezone
-from datetime import timedelta
 
+from gym_management.conditional import ConditionalGetMixin
+from gym_management.exports import ExportMixin
+from gym_management.fast_serializers import FastListMixin
+from .dues import annotate_dues
 from .models import Payment
 from .serializers import PaymentSerializer, PaymentListSerializer
 from members.models import Member
-from plans.models import Plan
 
 
-class PaymentViewSet(viewsets.ModelViewSet):
+class PaymentViewSet(ConditionalGetMixin, ExportMixin, FastListMixin, viewsets.ModelViewSet):
+    # Writes include the revenue rollup (with a fresh read of the member's plan type)
+    # and member totals kept by payment signals; an update that moves a payment to
+    # a new day or mode also creates that rollup row
+    query_budget = {
+        'list': 3, 'retrieve': 2, 'member_payments': 3, 'outstanding_dues': 2,
+        'update': 11, 'partial_update': 11, 'default': 8,
+    }
     serializer_class = PaymentSerializer
     permission_classes = [IsAuthenticated]
+    export_filename = 'payments'
+    export_fields = {
+        'id': 'id',
+        'member': 'member_id',
+        'member_name': 'member__name',
+        'member_phone': 'member__phone',
+        'amount': 'amount',
+        'payment_mode': 'payment_mode',
+        'payment_date': 'payment_date',
+        'notes': 'notes',
+        'created_at': 'created_at',
+    }
 
     def get_queryset(self):
         # Superuser can see all payments, regular users see only their own
+        # Both serializers read the member, so fetch it in the same query
         if self.request.user.is_superuser:
-            return Payment.objects.all()
-        return Payment.objects.filter(member__owner=self.request.user)
+            return Payment.objects.select_related('member')
+        return Payment.objects.filter(owner=self.request.user).select_related('member')
 
     def get_serializer_class(self):
         if self.action == 'list':
@@ -51,7 +71,7 @@ class PaymentViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_404_NOT_FOUND
             )
 
-        payments = Payment.objects.filter(member=member)
+        payments = Payment.objects.filter(member=member).select_related('member')
         serializer = self.get_serializer(payments, many=True)
         return Response(serializer.data)
 
@@ -65,36 +85,20 @@ class PaymentViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
+        members = Member.objects.all() if request.user.is_superuser else Member.objects.filter(owner=request.user)
         try:
-            if request.user.is_superuser:
-                member = Member.objects.get(id=member_id)
-            else:
-                member = Member.objects.get(id=member_id, owner=request.user)
+            # Plan price and payment total come from the same query as the member
+            member = annotate_dues(members).get(id=member_id)
         except Member.DoesNotExist:
             return Response(
                 {'error': 'Member not found'},
                 status=status.HTTP_404_NOT_FOUND
             )
 
-        # Get the plan price
-        try:
-            plan = Plan.objects.get(plan_type=member.plan_type)
-            plan_price = plan.price
-        except Plan.DoesNotExist:
-            plan_price = 0
-
-        # Calculate total payments
-        total_payments = Payment.objects.filter(member=member).aggregate(
-            total=Sum('amount')
-        )['total'] or 0
-
-        outstanding = max(0, plan_price - total_payments)
-
         return Response({
             'member_id': member.id,
             'member_name': member.name,
-            'plan_price': float(plan_price),
-            'total_payments': float(total_payments),
-            'outstanding_dues': float(outstanding)
+            'plan_price': float(member.plan_price),
+            'total_payments': float(member.total_paid),
+            'outstanding_dues': float(member.outstanding_dues)
         })
-
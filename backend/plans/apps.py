@@ -5,3 +5,6 @@ class PlansConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'plans'
 
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,84 @@
+"""
+Process-local Plan catalog.
+
+The Plan table is tiny and rarely changes, so every worker keeps all plans in
+memory keyed by plan_type. A version stamp in the Django cache is bumped after
+a plan is saved or deleted; a worker whose copy was loaded under a different
+stamp reloads it. With a shared CACHE_BACKEND that reaches every worker on its
+next request. A worker also reloads once its copy is PLAN_CATALOG_TTL seconds
+old, which bounds how long it can miss a change: with the default per-worker
+locmem cache other workers never see the stamp move, and raw SQL never moves it.
+
+The catalog's ETag is a digest of the plan rows, so every worker gives the
+same plans the same ETag.
+"""
+import hashlib
+import threading
+import time
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Plan
+
+
+VERSION_KEY = 'plans:catalog:version'
+
+PlanCatalog = namedtuple('PlanCatalog', ['version', 'plans', 'etag', 'expires_at'])
+
+_catalog = PlanCatalog(None, {}, None, 0)
+_lock = threading.Lock()
+
+
+def _current_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        version = time.time_ns()
+        cache.add(VERSION_KEY, version, None)
+        version = cache.get(VERSION_KEY, version)
+    return version
+
+
+def _plans_etag(plans):
+    rows = sorted(
+        (plan.pk, plan.plan_type, plan.duration_days, str(plan.price), plan.description, plan.updated_at.isoformat())
+        for plan in plans.values()
+    )
+    return hashlib.md5(repr(rows).encode(), usedforsecurity=False).hexdigest()
+
+
+def _is_current(catalog, version, now):
+    return catalog.version == version and catalog.expires_at > now
+
+
+def get_plan_catalog():
+    """
+    Return the PlanCatalog (version stamp, ``{plan_type: Plan}``, ETag and
+    monotonic expiry). The Plan instances are shared between requests; treat
+    them as read-only.
+    """
+    global _catalog
+    version = _current_version()
+    now = time.monotonic()
+    if not _is_current(_catalog, version, now):
+        with _lock:
+            if not _is_current(_catalog, version, now):
+                plans = {plan.plan_type: plan for plan in Plan.objects.all()}
+                _catalog = PlanCatalog(version, plans, _plans_etag(plans), now + settings.PLAN_CATALOG_TTL)
+    return _catalog
+
+
+def get_plan(plan_type):
+    """Plan for ``plan_type`` or None"""
+    return get_plan_catalog().plans.get(plan_type)
+
+
+def get_plan_prices():
+    """``{plan_type: price}`` for every plan"""
+    return {plan_type: plan.price for plan_type, plan in get_plan_catalog().plans.items()}
+
+
+def bump_plan_catalog_version():
+    """Make every worker sharing this cache reload its catalog on next use"""
+    cache.set(VERSION_KEY, time.time_ns(), None)
@@ -0,0 +1,16 @@
+"""
+Invalidate the process-local Plan catalog in every worker when plans change
+"""
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .catalog import bump_plan_catalog_version
+from .models import Plan
+
+
+@receiver(post_save, sender=Plan, dispatch_uid='plans_catalog_plan_saved')
+@receiver(post_delete, sender=Plan, dispatch_uid='plans_catalog_plan_deleted')
+def invalidate_plan_catalog(sender, instance, **kwargs):
+    # Bump after commit so no worker reloads the old rows under the new version
+    transaction.on_commit(bump_plan_catalog_version)
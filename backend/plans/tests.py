@@ -0,0 +1,71 @@
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from members.models import Owner
+from . import catalog
+from .models import Plan
+
+
+class PlanCatalogTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = Owner.objects.create_user(username='plans-owner', password='plans-pass-123')
+        Plan.objects.create(plan_type='GENERAL', duration_days=30, price=Decimal('2000'))
+        Plan.objects.create(plan_type='PT', duration_days=30, price=Decimal('5000'))
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+        self.forget_catalog()
+
+    def forget_catalog(self):
+        catalog._catalog = catalog.PlanCatalog(None, {}, None, 0)
+
+    def change_price_elsewhere(self, price):
+        # Like another worker or a raw UPDATE: no signal reaches this worker's catalog or stamp
+        Plan.objects.filter(plan_type='PT').update(price=price)
+
+    @override_settings(PLAN_CATALOG_TTL=3600)
+    def test_serves_from_memory_until_the_version_moves(self):
+        self.assertEqual(catalog.get_plan_prices()['PT'], Decimal('5000'))
+        self.change_price_elsewhere(Decimal('5500'))
+        with self.assertNumQueries(0):
+            self.assertEqual(catalog.get_plan_prices()['PT'], Decimal('5000'))
+
+        catalog.bump_plan_catalog_version()
+        self.assertEqual(catalog.get_plan_prices()['PT'], Decimal('5500'))
+
+    @override_settings(PLAN_CATALOG_TTL=0)
+    def test_reloads_after_ttl_without_a_version_change(self):
+        self.assertEqual(catalog.get_plan_prices()['PT'], Decimal('5000'))
+        self.change_price_elsewhere(Decimal('5500'))
+        self.assertEqual(catalog.get_plan_prices()['PT'], Decimal('5500'))
+
+    def test_etag_follows_the_plans_not_the_worker(self):
+        etag = catalog.get_plan_catalog().etag
+        # A second worker, with its own cache and version stamp, loading the same rows
+        self.forget_catalog()
+        cache.delete(catalog.VERSION_KEY)
+        self.assertEqual(catalog.get_plan_catalog().etag, etag)
+
+        self.change_price_elsewhere(Decimal('5500'))
+        catalog.bump_plan_catalog_version()
+        self.assertNotEqual(catalog.get_plan_catalog().etag, etag)
+
+    def test_list_revalidates_with_etag(self):
+        response = self.client.get('/api/plans/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('max-age=0', response['Cache-Control'])
+
+        with self.assertNumQueries(0):
+            cached = self.client.get('/api/plans/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(cached.status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Plan.objects.filter(plan_type='PT').get().delete()
+        changed = self.client.get('/api/plans/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(changed.status_code, 200)
+        self.assertEqual([plan['plan_type'] for plan in changed.data['results']], ['GENERAL'])
@@ -1,12 +1,55 @@
-from rest_framework import viewsets
+from django.conf import settings
+from django.http import Http404
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags
+from rest_framework import status, viewsets
+from rest_framework.pagination import PageNumberPagination
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from .catalog import get_plan_catalog
 from .models import Plan
 from .serializers import PlanSerializer
 
 
 class PlanViewSet(viewsets.ReadOnlyModelViewSet):
-    """Read-only viewset for plans"""
+    """
+    Read-only viewset for plans, served from the process-local plan catalog.
+
+    Responses carry an ETag derived from the plans and may be reused by
+    clients for PLAN_CACHE_MAX_AGE seconds (default 0: revalidate every
+    time); a matching ``If-None-Match`` gets 304 Not Modified.
+    """
     queryset = Plan.objects.all()
     serializer_class = PlanSerializer
     permission_classes = [IsAuthenticated]
+    query_budget = 2
+    # The catalog is an in-memory list, which keyset pagination cannot page
+    pagination_class = PageNumberPagination
+
+    def list(self, request, *args, **kwargs):
+        catalog = get_plan_catalog()
+        return self._cached_response(request, catalog, lambda: self._list_data(catalog))
+
+    def retrieve(self, request, *args, **kwargs):
+        catalog = get_plan_catalog()
+        plan = next((plan for plan in catalog.plans.values() if str(plan.pk) == str(kwargs['pk'])), None)
+        if plan is None:
+            raise Http404
+        return self._cached_response(request, catalog, lambda: self.get_serializer(plan).data)
+
+    def _list_data(self, catalog):
+        plans = sorted(catalog.plans.values(), key=lambda plan: plan.plan_type)
+        page = self.paginate_queryset(plans)
+        if page is not None:
+            return self.get_paginated_response(self.get_serializer(page, many=True).data).data
+        return self.get_serializer(plans, many=True).data
 
+    def _cached_response(self, request, catalog, get_data):
+        etag = f'"plans-{catalog.etag}"'
+        if etag in parse_etags(request.headers.get('If-None-Match', '')):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = Response(get_data())
+        response['ETag'] = etag
+        patch_cache_control(response, private=True, max_age=settings.PLAN_CACHE_MAX_AGE)
+        return response
@@ -21,6 +21,32 @@ api.interceptors.request.use(
   }
 )
 
+// Refresh tokens are rotated: each refresh returns a new refresh token and
+// revokes the one sent. Requests failing together share a single refresh.
+let refreshRequest = null
+
+const refreshTokens = () => {
+  if (!refreshRequest) {
+    refreshRequest = axios
+      .post(
+        `${import.meta.env.VITE_API_URL || 'http://localhost:8000'}/api/auth/token/refresh/`,
+        { refresh: localStorage.getItem('refresh_token') }
+      )
+      .then((response) => {
+        const { access, refresh } = response.data
+        localStorage.setItem('access_token', access)
+        if (refresh) {
+          localStorage.setItem('refresh_token', refresh)
+        }
+        return access
+      })
+      .finally(() => {
+        refreshRequest = null
+      })
+  }
+  return refreshRequest
+}
+
 // Response interceptor to handle token refresh
 api.interceptors.response.use(
   (response) => response,
@@ -31,14 +57,7 @@ api.interceptors.response.use(
       originalRequest._retry = true
 
       try {
-        const refreshToken = localStorage.getItem('refresh_token')
-        const response = await axios.post(
-          `${import.meta.env.VITE_API_URL || 'http://localhost:8000'}/api/auth/token/refresh/`,
-          { refresh: refreshToken }
-        )
-
-        const { access } = response.data
-        localStorage.setItem('access_token', access)
+        const access = await refreshTokens()
         api.defaults.headers.common['Authorization'] = `Bearer ${access}`
         originalRequest.headers['Authorization'] = `Bearer ${access}`
 